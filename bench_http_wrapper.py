@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+HTTP 包裝器負載測試
+模擬多個聊天客戶端同時呼叫 /api/chat，比較單執行緒 HTTPServer 與執行緒池伺服器的吞吐量
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from http.server import HTTPServer
+from urllib.parse import urlparse
+
+from http_wrapper import MCPHTTPHandler, PooledHTTPServer
+
+
+class SimulatedLatencyHandler(MCPHTTPHandler):
+    """以固定延遲模擬 LLM 回應時間，測試伺服器本身的併發能力"""
+
+    latency = 0.1
+
+    def process_chat_message(self, message):
+        time.sleep(self.latency)
+        return {
+            "response": f"收到：{message}",
+            "tool_used": "benchmark",
+            "confidence": 1.0,
+            "reason": "負載測試",
+        }
+
+
+class LegacyHandler(SimulatedLatencyHandler):
+    """原本的行為：HTTP/1.0，每個請求一個連線"""
+
+    protocol_version = "HTTP/1.0"
+
+
+def run_clients(host, port, clients, requests_per_client, message):
+    """以多個 keep-alive 客戶端送出請求，回傳統計結果"""
+    latencies = []
+    errors = []
+    stats_lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+    body = json.dumps({"message": message}, ensure_ascii=False).encode("utf-8")
+
+    def client(client_id):
+        conn = http.client.HTTPConnection(host, port, timeout=120)
+        local_latencies = []
+        local_errors = 0
+        barrier.wait()
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            try:
+                conn.request(
+                    "POST",
+                    "/api/chat",
+                    body=body,
+                    headers={"Content-Type": "application/json"},
+                )
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                continue
+            local_latencies.append(time.perf_counter() - started)
+        conn.close()
+        with stats_lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "completed": completed,
+        "errors": sum(errors),
+        "elapsed": elapsed,
+        "requests_per_sec": completed / elapsed if elapsed else 0.0,
+        "p50_ms": latencies[completed // 2] * 1000 if completed else 0.0,
+        "p99_ms": latencies[int(completed * 0.99)] * 1000 if completed else 0.0,
+    }
+
+
+def run_in_process(name, server, args):
+    """在背景執行緒啟動伺服器並執行一輪負載測試"""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        result = run_clients(
+            "127.0.0.1",
+            server.server_address[1],
+            args.clients,
+            args.requests,
+            args.message,
+        )
+    finally:
+        server.shutdown()
+        if isinstance(server, PooledHTTPServer):
+            server.drain()
+        else:
+            server.server_close()
+    result["name"] = name
+    return result
+
+
+def print_result(result):
+    print(
+        f"{result['name']}: {result['requests_per_sec']:.1f} 請求/秒, "
+        f"成功 {result['completed']} 筆, 失敗 {result['errors']} 筆, "
+        f"p50 {result['p50_ms']:.0f}ms, p99 {result['p99_ms']:.0f}ms, "
+        f"耗時 {result['elapsed']:.1f} 秒"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 包裝器負載測試")
+    parser.add_argument("--clients", type=int, default=50, help="同時連線的客戶端數")
+    parser.add_argument("--requests", type=int, default=5, help="每個客戶端的請求數")
+    parser.add_argument(
+        "--latency", type=float, default=0.1, help="模擬的 LLM 回應時間（秒）"
+    )
+    parser.add_argument("--message", default="你好", help="送出的聊天訊息")
+    parser.add_argument(
+        "--url", help="測試已啟動的伺服器（例如 http://localhost:8080），不使用模擬延遲"
+    )
+    parser.add_argument(
+        "--skip-baseline", action="store_true", help="不測試單執行緒 HTTPServer"
+    )
+    args = parser.parse_args()
+
+    print("🧪 HTTP 包裝器負載測試")
+    print(f"📊 {args.clients} 個客戶端 × 每個 {args.requests} 個請求")
+    print("=" * 60)
+
+    if args.url:
+        target = urlparse(args.url)
+        result = run_clients(
+            target.hostname,
+            target.port or 80,
+            args.clients,
+            args.requests,
+            args.message,
+        )
+        result["name"] = args.url
+        print_result(result)
+        return
+
+    print(f"⏱️ 模擬 LLM 回應時間 {args.latency * 1000:.0f}ms")
+    SimulatedLatencyHandler.latency = args.latency
+    results = []
+    if not args.skip_baseline:
+        results.append(
+            run_in_process(
+                "單執行緒 HTTPServer", HTTPServer(("127.0.0.1", 0), LegacyHandler), args
+            )
+        )
+        print_result(results[-1])
+    results.append(
+        run_in_process(
+            "執行緒池 + keep-alive",
+            PooledHTTPServer(("127.0.0.1", 0), SimulatedLatencyHandler),
+            args,
+        )
+    )
+    print_result(results[-1])
+
+    if len(results) == 2 and results[0]["requests_per_sec"]:
+        speedup = results[1]["requests_per_sec"] / results[0]["requests_per_sec"]
+        print(f"🚀 吞吐量提升: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,12 @@
 用於檢查特定用戶的實際狀態
 """
 
+import contextlib
+import io
 import os
 import sys
+import threading
+import time
 from pathlib import Path
 
 # 添加路徑
@@ -64,16 +68,100 @@ def reset_user_state(user_id="default_user"):
     print(f"✅ 用戶 {user_id} 狀態已重置為: {InterviewState.INTRO.value}")
 
 
+def stress_transitions(threads=16, rounds=500):
+    """多執行緒壓力測試狀態轉換，檢查是否有遺失更新"""
+    print(f"🔥 狀態轉換壓力測試: {threads} 個執行緒 x {rounds} 輪")
+
+    api = InterviewAPI()
+    shared_user = "stress_shared_user"
+    api._set_user_state(shared_user, InterviewState.WAITING)
+
+    errors = []
+    counters = {"starts": 0, "restarts": 0}
+    counter_lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    # 每位私有用戶的完整流程與預期結果
+    private_flow = [
+        ("開始面試", InterviewState.INTRO),
+        ("介紹完了", InterviewState.INTRO_ANALYSIS),
+        (None, InterviewState.QUESTIONING),
+        ("退出", InterviewState.COMPLETED),
+        ("重新開始", InterviewState.WAITING),
+    ]
+
+    def worker(index):
+        private_user = f"stress_user_{index}"
+        api._set_user_state(private_user, InterviewState.WAITING)
+        barrier.wait()
+
+        for round_number in range(rounds):
+            # 私有用戶：流程必須完全符合預期
+            for message, expected in private_flow:
+                if message is None:
+                    api._set_user_state(private_user, expected)
+                else:
+                    api._transition_state(private_user, message)
+                actual = api._get_user_state(private_user)
+                if actual != expected:
+                    errors.append(
+                        f"{private_user} 第 {round_number} 輪: 預期 {expected.value}，實際 {actual.value}"
+                    )
+
+            # 共用用戶：所有執行緒同時搶著開始，只有一個執行緒負責重置
+            if api._transition_state(shared_user, "開始面試"):
+                with counter_lock:
+                    counters["starts"] += 1
+            if index == 0 and round_number % 10 == 0:
+                if api._transition_state(shared_user, "重新開始"):
+                    with counter_lock:
+                        counters["restarts"] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started_at = time.perf_counter()
+
+    # 狀態變更會輸出大量日誌，壓力測試期間暫時靜音
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    elapsed = time.perf_counter() - started_at
+    transitions = threads * rounds * (len(private_flow) + 1)
+
+    # 每次成功開始都必須消耗一次 WAITING，因此開始次數不可能超過重置次數 + 1
+    if counters["starts"] > counters["restarts"] + 1:
+        errors.append(
+            f"共用用戶重複開始: 開始 {counters['starts']} 次，重置 {counters['restarts']} 次"
+        )
+
+    print(f"⏱️ 耗時: {elapsed:.2f} 秒，約 {transitions / elapsed:,.0f} 次轉換/秒")
+    print(f"📊 共用用戶: 開始 {counters['starts']} 次，重置 {counters['restarts']} 次")
+
+    if errors:
+        print(f"❌ 發現 {len(errors)} 個狀態錯誤，例如: {errors[0]}")
+    else:
+        print("✅ 沒有遺失更新")
+
+    return not errors
+
+
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="檢查用戶狀態")
     parser.add_argument("--user-id", default="default_user", help="用戶ID")
     parser.add_argument("--reset", action="store_true", help="重置用戶狀態")
+    parser.add_argument("--stress", action="store_true", help="多執行緒壓力測試")
+    parser.add_argument("--threads", type=int, default=16, help="壓力測試執行緒數")
+    parser.add_argument("--rounds", type=int, default=500, help="壓力測試輪數")
 
     args = parser.parse_args()
 
-    if args.reset:
+    if args.stress:
+        sys.exit(0 if stress_transitions(args.threads, args.rounds) else 1)
+    elif args.reset:
         reset_user_state(args.user_id)
     else:
         check_user_state(args.user_id)
@@ -1,8 +1,14 @@
+import argparse
 import asyncio
+import collections
+import itertools
 import json
 import logging
+import os
 import sys
-from typing import Any, Dict
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 # 設定日誌
 logging.basicConfig(
@@ -11,75 +17,256 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# 預設的 MCP 伺服器（與本檔案同目錄的 server.py）
+SERVER_SCRIPT = str(Path(__file__).parent / "server.py")
+# 單一請求等待回應的預設秒數
+MCP_REQUEST_TIMEOUT = float(os.getenv("MCP_REQUEST_TIMEOUT", "30"))
+# 單行 JSON-RPC 訊息的上限（搜尋結果等大型回應）
+MCP_STREAM_LIMIT = 16 * 1024 * 1024
+# 保留的伺服器 stderr 行數，回應中斷時附在錯誤訊息中
+STDERR_TAIL_LINES = 50
+
+NotificationHandler = Callable[[Dict[str, Any]], Optional[Awaitable[None]]]
+
+
+class RequestNotSentError(ConnectionError):
+    """請求尚未寫入伺服器即失敗，伺服器不可能已執行，可安全重試"""
+
 
 class MCPStdioClient:
-    def __init__(self, proc: asyncio.subprocess.Process):
+    """多工 JSON-RPC 客戶端：單一讀取任務依 id 分派回應，可同時有多個請求進行中"""
+
+    def __init__(
+        self,
+        proc: asyncio.subprocess.Process,
+        request_timeout: float = MCP_REQUEST_TIMEOUT,
+    ):
         self.proc = proc
+        self.request_timeout = request_timeout
+        # 只保護寫入，避免兩則訊息交錯；等待回應時不持有
         self.lock = asyncio.Lock()
-        self.request_id = 1
-
-    async def send_jsonrpc_request(
-        self, method: str, params: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """發送 JSON-RPC 2.0 請求"""
+        self._ids = itertools.count(1)
+        # {請求 id: 等待回應的 Future}
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._notification_handlers: Dict[str, NotificationHandler] = {}
+        self._stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+        self._reader_task: Optional[asyncio.Task] = None
+        self._stderr_task: Optional[asyncio.Task] = None
+        self._closed_error: Optional[Exception] = None
+
+    @classmethod
+    async def spawn(
+        cls,
+        command=None,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        request_timeout: float = MCP_REQUEST_TIMEOUT,
+    ) -> "MCPStdioClient":
+        """啟動 MCP 伺服器子程序並完成初始化"""
+        command = command or [sys.executable, SERVER_SCRIPT]
+        proc = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            limit=MCP_STREAM_LIMIT,
+        )
+        client = cls(proc, request_timeout=request_timeout)
+        try:
+            await client.initialize()
+        except BaseException:
+            await client.close()
+            raise
+        return client
+
+    @property
+    def in_flight(self) -> int:
+        """等待回應中的請求數"""
+        return len(self._pending)
+
+    @property
+    def alive(self) -> bool:
+        return self._closed_error is None and self.proc.returncode is None
+
+    async def wait_closed(self, grace: float = 1.0) -> Any:
+        """等待子程序結束或讀取任務中止（例如單行超過上限），返回結束原因"""
+        exited = asyncio.ensure_future(self.proc.wait())
+        waiters = {exited}
+        if self._reader_task is not None:
+            waiters.add(self._reader_task)
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            exited.cancel()
+        if self.proc.returncode is None:
+            # 程序結束時 stdout 的 EOF 通常比結束狀態先到，稍候再判斷是否仍在運行
+            try:
+                await asyncio.wait_for(self.proc.wait(), grace)
+            except asyncio.TimeoutError:
+                pass
+        if self.proc.returncode is not None:
+            return self.proc.returncode
+        return self._closed_error
+
+    def on_notification(self, method: str, handler: NotificationHandler):
+        """註冊伺服器通知的處理函數（例如 notifications/progress）"""
+        self._notification_handlers[method] = handler
+
+    def _start_reader(self):
+        if self._reader_task is None:
+            self._reader_task = asyncio.create_task(self._read_loop())
+            if self.proc.stderr is not None:
+                self._stderr_task = asyncio.create_task(self._drain_stderr())
+
+    async def _read_loop(self):
+        """讀取 stdout，依 id 將回應交給對應的 Future，通知交給處理函數"""
+        error: Exception = ConnectionError("MCP 伺服器已關閉輸出")
+        try:
+            while True:
+                line = await self.proc.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line.decode())
+                except json.JSONDecodeError as e:
+                    logger.error(f"❌ JSON 解析錯誤: {e}")
+                    continue
+                if isinstance(message, dict):
+                    await self._dispatch(message)
+        except asyncio.CancelledError:
+            error = ConnectionError("MCP 客戶端已關閉")
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            if self._stderr_tail:
+                error = ConnectionError(
+                    f"{error}，stderr: {''.join(self._stderr_tail)[-2000:]}"
+                )
+            self._fail_pending(error)
+
+    async def _dispatch(self, message: Dict[str, Any]):
+        request_id = message.get("id")
+        if "method" not in message:
+            future = self._pending.pop(request_id, None)
+            if future is None:
+                # 已逾時或取消的請求
+                logger.debug(f"忽略未知 id 的回應: {request_id}")
+            elif not future.done():
+                future.set_result(message)
+            return
+
+        logger.debug(f"📩 收到伺服器訊息: {message}")
+        if request_id is not None:
+            # 伺服器發出的請求：只支援 ping，其餘回應方法不存在
+            if message["method"] == "ping":
+                reply = {"jsonrpc": "2.0", "id": request_id, "result": {}}
+            else:
+                reply = {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32601, "message": "Method not found"},
+                }
+            await self._write(reply)
+            return
+
+        handler = self._notification_handlers.get(message["method"])
+        if handler is not None:
+            try:
+                result = handler(message.get("params") or {})
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"⚠️ 通知處理失敗 {message['method']}: {e}")
+
+    async def _drain_stderr(self):
+        """持續讀取 stderr，避免伺服器日誌塞滿管道而阻塞"""
+        async for line in self.proc.stderr:
+            self._stderr_tail.append(line.decode(errors="replace"))
+
+    def _fail_pending(self, error: Exception):
+        self._closed_error = error
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def _write(self, message: Dict[str, Any]):
+        if self.proc.stdin is None:
+            raise Exception("stdin 不可用")
+        data = (json.dumps(message) + "\n").encode()
         async with self.lock:
-            message = {
-                "jsonrpc": "2.0",
-                "id": self.request_id,
-                "method": method,
-                "params": params,
-            }
-            self.request_id += 1
-
-            if self.proc.stdin is None:
-                raise Exception("stdin 不可用")
-            self.proc.stdin.write((json.dumps(message) + "\n").encode())
+            self.proc.stdin.write(data)
             await self.proc.stdin.drain()
 
-            logger.info(f"📨 發送訊息: {message}")
-
+    async def send_jsonrpc_request(
+        self,
+        method: str,
+        params: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """發送 JSON-RPC 2.0 請求並等待對應 id 的回應"""
+        if self._closed_error is not None:
+            raise RequestNotSentError(str(self._closed_error)) from self._closed_error
+        self._start_reader()
+
+        request_id = next(self._ids)
+        message = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": method,
+            "params": params,
+        }
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        try:
             try:
-                if self.proc.stdout is None:
-                    raise Exception("stdout 不可用")
-                response_line = await asyncio.wait_for(
-                    self.proc.stdout.readline(), timeout=10
-                )
-
-                if response_line:
-                    response = json.loads(response_line.decode())
-                    logger.info(f"📩 收到回應: {response}")
-                    return response
-                else:
-                    if self.proc.stderr is None:
-                        raise Exception("stderr 不可用")
-                    stderr_output = await self.proc.stderr.read()
-                    logger.error(f"⚠️ 沒有收到回應，stderr: {stderr_output.decode()}")
-                    raise Exception("沒有收到回應")
-
-            except asyncio.TimeoutError:
-                if self.proc.stderr is None:
-                    raise Exception("stderr 不可用")
-                stderr_output = await self.proc.stderr.read()
-                logger.error(f"❌ 請求逾時! stderr: {stderr_output.decode()}")
-                raise
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ JSON 解析錯誤: {e}")
-                raise
+                await self._write(message)
+            except (ConnectionError, OSError) as e:
+                raise RequestNotSentError(f"請求未送出: {e}") from e
+            logger.debug(f"📨 發送訊息: {message}")
+            response = await asyncio.wait_for(
+                future, timeout if timeout is not None else self.request_timeout
+            )
+            logger.debug(f"📩 收到回應: {response}")
+            return response
+        except asyncio.TimeoutError:
+            logger.error(f"❌ 請求逾時: {method} (id {request_id})")
+            await self._cancel_request(request_id, "timeout")
+            raise
+        except asyncio.CancelledError:
+            await asyncio.shield(self._cancel_request(request_id, "cancelled"))
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+            if future.done() and not future.cancelled():
+                # 寫入失敗時讀取任務可能已標記此請求失敗，取出例外避免未處理警告
+                future.exception()
+
+    async def _cancel_request(self, request_id: int, reason: str):
+        """通知伺服器放棄已不再等待的請求"""
+        if self._pending.pop(request_id, None) is None or not self.alive:
+            return
+        try:
+            await self.send_notification(
+                "notifications/cancelled", {"requestId": request_id, "reason": reason}
+            )
+        except (ConnectionError, OSError) as e:
+            logger.debug(f"取消通知發送失敗: {e}")
 
     async def send_notification(
         self, method: str, params: Dict[str, Any] | None = None
     ):
         """發送 JSON-RPC 2.0 通知（無需回應）"""
-        async with self.lock:
-            message: Dict[str, Any] = {"jsonrpc": "2.0", "method": method}
-            if params:
-                message["params"] = params
+        message: Dict[str, Any] = {"jsonrpc": "2.0", "method": method}
+        if params:
+            message["params"] = params
 
-            if self.proc.stdin is None:
-                raise Exception("stdin 不可用")
-            self.proc.stdin.write((json.dumps(message) + "\n").encode())
-            await self.proc.stdin.drain()
-            logger.info(f"📨 發送通知: {message}")
+        await self._write(message)
+        logger.debug(f"📨 發送通知: {message}")
 
     async def initialize(self):
         """初始化 MCP 連接"""
@@ -105,11 +292,14 @@ class MCPStdioClient:
         logger.info("✅ 初始化完成通知已發送")
 
     async def call_tool(
-        self, tool_name: str, arguments: Dict[str, Any]
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """呼叫工具"""
         response = await self.send_jsonrpc_request(
-            "tools/call", {"name": tool_name, "arguments": arguments}
+            "tools/call", {"name": tool_name, "arguments": arguments}, timeout=timeout
         )
 
         if "error" in response:
@@ -117,14 +307,67 @@ class MCPStdioClient:
 
         return response.get("result", {})
 
+    async def close(self, timeout: float = 5.0):
+        """關閉 stdin 讓伺服器結束，逾時則終止子程序"""
+        if self.proc.stdin is not None and not self.proc.stdin.is_closing():
+            self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+        for task in (self._reader_task, self._stderr_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._fail_pending(ConnectionError("MCP 客戶端已關閉"))
+
+
+async def run_benchmark(calls: int, tool: str, arguments: Dict[str, Any]):
+    """對 server.py 同時發出多個工具呼叫，與逐一呼叫比較吞吐量"""
+    client = await MCPStdioClient.spawn(request_timeout=120)
+    try:
+
+        async def timed_call():
+            started = time.perf_counter()
+            await client.call_tool(tool, arguments)
+            return time.perf_counter() - started
+
+        sequential = min(calls, 100)
+        started = time.perf_counter()
+        for _ in range(sequential):
+            await timed_call()
+        sequential_rate = sequential / (time.perf_counter() - started)
+        print(f"🐢 逐一呼叫: {sequential} 次, {sequential_rate:.1f} 次/秒")
+
+        started = time.perf_counter()
+        latencies = sorted(
+            await asyncio.gather(*(timed_call() for _ in range(calls)))
+        )
+        elapsed = time.perf_counter() - started
+        rate = calls / elapsed
+        print(
+            f"🚀 同時呼叫: {calls} 次, {rate:.1f} 次/秒, "
+            f"p50 {latencies[calls // 2] * 1000:.0f}ms, "
+            f"p99 {latencies[int(calls * 0.99)] * 1000:.0f}ms, "
+            f"耗時 {elapsed:.2f} 秒"
+        )
+        print(f"📊 吞吐量提升: {rate / sequential_rate:.1f}x")
+    finally:
+        await client.close()
+
 
 async def main():
     proc = await asyncio.create_subprocess_exec(
-        "python",
-        "server.py",
+        sys.executable,
+        SERVER_SCRIPT,
         stdin=asyncio.subprocess.PIPE,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
+        limit=MCP_STREAM_LIMIT,
     )
 
     client = MCPStdioClient(proc)
@@ -168,11 +411,23 @@ async def main():
         logger.error(f"❌ 發生錯誤: {e}")
     finally:
         # 結束通訊
-        if proc.stdin is not None:
-            proc.stdin.close()
-        await proc.wait()
+        await client.close()
         logger.info("🔚 客戶端結束")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="MCP stdio 客戶端")
+    parser.add_argument(
+        "--benchmark", type=int, metavar="N", help="同時發出 N 個工具呼叫並測量吞吐量"
+    )
+    parser.add_argument(
+        "--tool", default="get_question_history", help="負載測試呼叫的工具"
+    )
+    parser.add_argument("--arguments", default="{}", help="工具參數（JSON）")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        arguments = json.loads(args.arguments)
+        asyncio.run(run_benchmark(args.benchmark, args.tool, arguments))
+    else:
+        asyncio.run(main())
@@ -5,17 +5,25 @@ Fast Agent 橋接模組
 """
 
 import asyncio
+import bisect
 import json
 import os
 import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # 添加父目錄到路徑
 sys.path.append(str(Path(__file__).parent))
 
+from score_ledger import ScoreLedger
+from session_store import SessionStore
+
 try:
-    from tools.answer_analyzer import answer_analyzer
-    from tools.question_manager import question_manager
+    import interview_service
+    from tools.database import db_manager
 
     TOOLS_AVAILABLE = True
 except ImportError:
@@ -25,7 +33,7 @@ except ImportError:
 # OpenAI 相關導入
 try:
     import openai
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
 
     OPENAI_AVAILABLE = True
 except ImportError:
@@ -33,27 +41,36 @@ except ImportError:
     print("⚠️ OpenAI 模組不可用")
 
 
+def _analysis_messages(prompt: str):
+    """自我介紹分析的對話訊息"""
+    return [
+        {
+            "role": "system",
+            "content": "您是一個專業的面試官和職涯顧問，擅長分析自我介紹並提供具體的改進建議。請根據要求分析用戶的自我介紹。",
+        },
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _openai_api_key():
+    """檢查 OpenAI 是否可用並取得 API 金鑰"""
+    if not OPENAI_AVAILABLE:
+        raise Exception("OpenAI 模組不可用")
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise Exception("OPENAI_API_KEY 未設定")
+    return api_key
+
+
 def call_openai_for_analysis(prompt: str, max_tokens: int = 1500):
     """調用 OpenAI API 進行分析"""
     try:
-        if not OPENAI_AVAILABLE:
-            raise Exception("OpenAI 模組不可用")
-
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise Exception("OPENAI_API_KEY 未設定")
-
-        client = OpenAI(api_key=api_key)
+        client = OpenAI(api_key=_openai_api_key())
 
         response = client.chat.completions.create(
             model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "您是一個專業的面試官和職涯顧問，擅長分析自我介紹並提供具體的改進建議。請根據要求分析用戶的自我介紹。",
-                },
-                {"role": "user", "content": prompt},
-            ],
+            messages=_analysis_messages(prompt),
             temperature=0.3,
             max_tokens=max_tokens,
         )
@@ -66,19 +83,133 @@ def call_openai_for_analysis(prompt: str, max_tokens: int = 1500):
         raise e
 
 
-def get_question():
-    """獲取隨機面試問題 - 優先使用 MCP 工具"""
+# 每個事件迴圈共用一個非同步客戶端（連線池綁定於建立時的事件迴圈）
+_async_openai_clients = weakref.WeakKeyDictionary()
+
+
+async def acall_openai_for_analysis(prompt: str, max_tokens: int = 1500):
+    """call_openai_for_analysis 的非同步版本，等待回應時不佔用執行緒"""
     try:
-        # 優先使用 MCP 工具
-        from server import get_random_question as mcp_get_random_question
+        loop = asyncio.get_running_loop()
+        client = _async_openai_clients.get(loop)
+        if client is None:
+            client = _async_openai_clients[loop] = AsyncOpenAI(
+                api_key=_openai_api_key()
+            )
+
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_analysis_messages(prompt),
+            temperature=0.3,
+            max_tokens=max_tokens,
+        )
+
+        content = response.choices[0].message.content
+        return content.strip() if content else ""
+
+    except Exception as e:
+        print(f"❌ OpenAI API 調用失敗: {e}")
+        raise e
+
 
-        result = mcp_get_random_question()
-        if result.get("status") == "success":
-            # 返回完整的數據結構，包含標準答案
-            return {
-                "success": True,
-                "result": f"""
-🎯 MCP 工具面試問題
+def get_question(user_id: str | None = None, record: bool = True):
+    """獲取隨機面試問題 - 有用戶時優先使用預先取得的下一題，並立即預取再下一題
+
+    record=False 時不記錄為已出題，由呼叫端確定採用後再呼叫 record_served_question
+    """
+    if not user_id:
+        return _fetch_question()
+
+    started = time.perf_counter()
+    result = None
+    slot = _question_prefetch.pop(user_id)
+    if slot is not None and slot[0] == _interview_epochs.get(user_id, 0):
+        try:
+            result = slot[1].result(timeout=QUESTION_PREFETCH_WAIT)
+        except Exception as e:
+            print(f"⚠️ 預取問題失敗，改為即時取得: {e}")
+    if (
+        result is None
+        or not result.get("success")
+        or _question_key(result) in _served_question_keys(user_id)
+    ):
+        result = _fetch_unseen_question(user_id)
+    else:
+        print(f"⚡ 使用預先取得的問題（{(time.perf_counter() - started) * 1000:.1f}ms）")
+
+    if result.get("success") and record:
+        record_served_question(user_id, result)
+    return result
+
+
+def record_served_question(user_id: str, question_result: dict):
+    """記錄題目已出給用戶：加入本場去重集合、更新評分帳本與總結草稿，並預取下一題"""
+    with _served_questions.lock_for(user_id):
+        _served_questions.setdefault(user_id, set()).add(_question_key(question_result))
+    # 抽題時不寫入用戶的已出題記錄，確定出題後才記錄，捨棄的預取題目不會被標記
+    question_id = (question_result.get("question_data") or {}).get("question_id")
+    if TOOLS_AVAILABLE and question_id:
+        marked = interview_service.mark_question_served(user_id, question_id)
+        if marked.get("status") != "success":
+            print(f"⚠️ 記錄已出題目失敗: {marked.get('message')}")
+    score_ledger.record_question(user_id)
+    # 總結包含出題數，出題後同樣更新草稿，結束面試時才不會落後一個版本
+    schedule_summary_draft(user_id)
+    prefetch_question(user_id)
+    return {"success": True, "result": "已記錄出題"}
+
+
+def prefetch_question(user_id: str = "default_user"):
+    """在背景預先取得用戶的下一題（不與已出過的題目重複）"""
+    epoch = _interview_epochs.get(user_id, 0)
+    with _question_prefetch.lock_for(user_id):
+        slot = _question_prefetch.get(user_id)
+        if slot is None or slot[0] != epoch:
+            _question_prefetch.set(
+                user_id,
+                (epoch, _prefetch_executor.submit(_fetch_unseen_question, user_id)),
+            )
+    return {"success": True, "result": "已開始預先取得下一題"}
+
+
+def _question_key(result: dict):
+    """題目的去重鍵"""
+    question_data = result.get("question_data") or {}
+    return question_data.get("question_id") or question_data.get("question")
+
+
+def _served_question_keys(user_id: str) -> set:
+    """取得用戶已出過題目的快照"""
+    with _served_questions.lock_for(user_id):
+        return set(_served_questions.get(user_id) or ())
+
+
+def _fetch_unseen_question(user_id: str):
+    """抽出用戶本場尚未出過的題目；題庫不足時允許重複"""
+    seen = _served_question_keys(user_id)
+    result = None
+    for _ in range(QUESTION_PREFETCH_ATTEMPTS):
+        result = _fetch_question(user_id)
+        if not result.get("success") or _question_key(result) not in seen:
+            break
+    return result
+
+
+def _fetch_question(user_id: str | None = None):
+    """從面試服務取得一題；有用戶時由題庫抽題器避免重複，出題後由 record_served_question 記錄"""
+    if not TOOLS_AVAILABLE:
+        return {"success": False, "error": "工具模組不可用，無法獲取問題"}
+
+    result = interview_service.get_random_question(
+        user_id=user_id or "", mark_seen=False
+    )
+    if result.get("status") != "success":
+        return {"success": False, "error": result.get("message", "獲取問題失敗")}
+
+    return {
+        "success": True,
+        "result": f"""
+🎯 面試問題
 
 問題：{result['question']}
 類別：{result['category']}
@@ -87,77 +218,60 @@ def get_question():
 
 請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
                 """,
-                "question_data": {
-                    "question": result["question"],
-                    "standard_answer": result["standard_answer"],
-                    "category": result["category"],
-                    "difficulty": result["difficulty"],
-                    "source": result["source"],
-                },
-            }
-        else:
-            return {
-                "success": False,
-                "error": f"MCP 工具獲取問題失敗：{result.get('message', '未知錯誤')}",
-            }
-    except ImportError:
-        # 回退到原始工具
-        if not TOOLS_AVAILABLE:
-            return {"success": False, "error": "工具模組不可用，無法獲取問題"}
+        "question_data": {
+            "question": result["question"],
+            "standard_answer": result["standard_answer"],
+            "category": result["category"],
+            "difficulty": result["difficulty"],
+            "source": result["source"],
+            "question_id": result.get("question_id"),
+        },
+    }
 
-        try:
-            question_data = question_manager.get_random_question()
-            category = _categorize_question(question_data["question"])
-            difficulty = _assess_difficulty(question_data["question"])
 
-            return {
-                "success": True,
-                "result": f"""
-🎯 面試問題
+# 全局變數來儲存自我介紹內容（分段鎖容器，多執行緒安全）
+_user_intro_content = SessionStore()
 
-問題：{question_data['question']}
-類別：{category}
-難度：{difficulty}
-來源：{question_data['source']}
+# 全域評分帳本實例（評分當下記錄，總結時直接讀取統計）
+score_ledger = ScoreLedger()
 
-請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
-                """,
-                "question_data": {
-                    "question": question_data["question"],
-                    "standard_answer": question_data.get(
-                        "standard_answer", "標準答案未提供"
-                    ),
-                    "category": category,
-                    "difficulty": difficulty,
-                    "source": question_data["source"],
-                },
-            }
-        except Exception as e:
-            return {"success": False, "error": f"獲取問題失敗：{str(e)}"}
-    except Exception as e:
-        return {"success": False, "error": f"MCP 工具錯誤：{str(e)}"}
+# 每位用戶的面試世代，重新開始時遞增，讓尚未完成的背景工作失效
+_interview_epochs = SessionStore()
+# 背景預先生成的總結草稿 - 結構: {user_id: (epoch, 帳本版本, 總結結果)}
+_summary_drafts = SessionStore()
+# 每位用戶尚未執行的背景工作
+_summary_futures = SessionStore()
+_summary_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="summary-draft"
+)
+
+# 每位用戶預先取得的下一題 - 結構: {user_id: (epoch, Future)}
+_question_prefetch = SessionStore()
+# 每位用戶本場已出過的題目（question_id，沒有 id 時使用題目文字）
+_served_questions = SessionStore()
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="question-prefetch"
+)
+# 避免重複出題時的最多抽題次數，以及等待進行中預取的秒數
+QUESTION_PREFETCH_ATTEMPTS = 5
+QUESTION_PREFETCH_WAIT = 10
 
 
-# 全局變數來儲存自我介紹內容
-_user_intro_content = {}
+def _append_intro_part(user_id: str, user_message: str) -> str:
+    """在用戶所屬的鎖內追加一段自我介紹，並回傳目前的完整內容"""
+    with _user_intro_content.lock_for(user_id):
+        parts = _user_intro_content.setdefault(user_id, [])
+        parts.append(user_message)
+        return " ".join(parts)
 
 
-def intro_collector(user_message: str = ""):
+def intro_collector(user_message: str = "", user_id: str = "default_user"):
     """收集用戶自我介紹內容"""
     try:
         print(f"📝 收集自我介紹內容: {user_message}")
 
-        user_id = "default_user"  # 可以根據需要調整
-
-        # 如果是第一次收集，初始化
-        if user_id not in _user_intro_content:
-            _user_intro_content[user_id] = []
-
-        # 添加新的自我介紹內容
-        _user_intro_content[user_id].append(user_message)
-
-        # 返回當前已收集的內容
-        all_content = " ".join(_user_intro_content[user_id])
+        # 添加新的自我介紹內容，並取得當前已收集的內容
+        all_content = _append_intro_part(user_id, user_message)
 
         return {
             "success": True,
@@ -171,22 +285,75 @@ def intro_collector(user_message: str = ""):
 
 def get_collected_intro(user_id: str = "default_user"):
     """獲取已收集的自我介紹內容"""
-    if user_id in _user_intro_content and _user_intro_content[user_id]:
-        return " ".join(_user_intro_content[user_id])
+    with _user_intro_content.lock_for(user_id):
+        parts = _user_intro_content.get(user_id)
+        if parts:
+            return " ".join(parts)
     return ""
 
 
 def clear_collected_intro(user_id: str = "default_user"):
     """清除已收集的自我介紹內容"""
-    if user_id in _user_intro_content:
-        _user_intro_content[user_id] = []
+    with _user_intro_content.lock_for(user_id):
+        if user_id in _user_intro_content:
+            _user_intro_content.set(user_id, [])
 
 
 def analyze_answer(
-    user_answer: str = "", question: str = "", standard_answer: str = ""
+    user_answer: str = "",
+    question: str = "",
+    standard_answer: str = "",
+    user_id: str | None = None,
+    question_id: str | None = None,
+    category: str | None = None,
 ):
-    """分析用戶回答 - 優先使用 MCP 工具"""
+    """分析用戶回答，並在評分當下記錄到評分帳本"""
+    started = time.perf_counter()
+    result = _analyze_answer(user_answer, question, standard_answer)
+    _record_answer_score(result, user_id, question, question_id, category, started)
+    return result
+
+
+async def analyze_answer_async(
+    user_answer: str = "",
+    question: str = "",
+    standard_answer: str = "",
+    user_id: str | None = None,
+    question_id: str | None = None,
+    category: str | None = None,
+):
+    """analyze_answer 的非同步版本"""
+    started = time.perf_counter()
+    result = await _analyze_answer_async(user_answer, question, standard_answer)
+    _record_answer_score(result, user_id, question, question_id, category, started)
+    return result
+
+
+def _record_answer_score(
+    result, user_id, question, question_id, category, started: float
+):
+    """評分成功時記錄到評分帳本，並在背景更新總結草稿"""
+    if (
+        user_id
+        and isinstance(result, dict)
+        and result.get("success")
+        and result.get("score") is not None
+    ):
+        score_ledger.record_score(
+            user_id,
+            result["score"],
+            question_id=question_id,
+            question=question,
+            category=category
+            or (interview_service.categorize_question(question) if question else None),
+            grade=result.get("grade"),
+            latency_seconds=time.perf_counter() - started,
+        )
+        schedule_summary_draft(user_id)
 
+
+def _short_intro_response(user_answer: str):
+    """回答其實是簡短的自我介紹時回傳引導訊息，否則回傳 None"""
     # 只在明確的自我介紹情況下才返回自我介紹回應
     # 移除過於寬泛的關鍵字匹配，避免誤判面試回答
     lower_answer = user_answer.lower()
@@ -215,52 +382,12 @@ def analyze_answer(
 請輸入「開始面試」或「問題」來獲取面試問題。
             """,
         }
+    return None
 
-    try:
-        # 優先使用 MCP 工具
-        from server import analyze_user_answer as mcp_analyze_user_answer
-
-        result = mcp_analyze_user_answer(
-            user_answer=user_answer, question=question, standard_answer=standard_answer
-        )
-
-        if result.get("status") == "success":
-            response = f"""
-📊 MCP 工具分析結果
-
-評分：{result.get('score', 'N/A')}/100 ({result.get('grade', 'N/A')})
-相似度：{result.get('similarity', 'N/A')}
-反饋：{result.get('feedback', '無反饋')}
-
-標準答案：{result.get('standard_answer', standard_answer)}
-            """
-
-            if result.get("differences"):
-                response += "\n🔍 具體差異：\n"
-                for diff in result["differences"]:
-                    response += f"  • {diff}\n"
-
-            return {"success": True, "result": response}
-        else:
-            return {
-                "success": False,
-                "error": f"MCP 工具分析失敗：{result.get('message', '未知錯誤')}",
-            }
-    except ImportError:
-        # 回退到原始工具
-        if not TOOLS_AVAILABLE:
-            return {"success": False, "error": "工具模組不可用，無法分析回答"}
-
-        try:
-            # 如果沒有提供標準答案，嘗試從問題獲取
-            if not standard_answer:
-                question_data = question_manager.get_random_question()
-                standard_answer = question_data.get("standard_answer", "標準答案未提供")
-
-            # 使用答案分析器分析
-            analysis = answer_analyzer.analyze_answer(user_answer, standard_answer)
 
-            response = f"""
+def _format_tool_analysis(analysis: dict, standard_answer: str):
+    """將答案分析器的結果整理成統一格式"""
+    response = f"""
 📊 分析結果
 
 評分：{analysis['score']}/100 ({analysis['grade']})
@@ -270,129 +397,187 @@ def analyze_answer(
 標準答案：{standard_answer}
             """
 
-            if analysis["differences"]:
-                response += "\n🔍 具體差異：\n"
-                for diff in analysis["differences"]:
-                    response += f"  • {diff}\n"
+    if analysis["differences"]:
+        response += "\n🔍 具體差異：\n"
+        for diff in analysis["differences"]:
+            response += f"  • {diff}\n"
 
-            return {"success": True, "result": response}
+    return {
+        "success": True,
+        "result": response,
+        "score": analysis["score"],
+        "grade": analysis["grade"],
+    }
 
-        except Exception as e:
-            return {"success": False, "error": f"分析失敗：{str(e)}"}
-    except Exception as e:
-        return f"MCP 工具錯誤：{str(e)}"
 
+def _analyze_answer(user_answer: str, question: str, standard_answer: str):
+    """分析用戶回答 - 使用面試服務（與 MCP 工具相同的實作）"""
+    intro_response = _short_intro_response(user_answer)
+    if intro_response is not None:
+        return intro_response
 
-def get_standard_answer(question: str = ""):
-    """獲取標準答案 - 優先使用 MCP 工具"""
-    try:
-        # 優先使用 MCP 工具
-        from server import get_standard_answer as mcp_get_standard_answer
+    if not TOOLS_AVAILABLE:
+        return {"success": False, "error": "工具模組不可用，無法分析回答"}
 
-        result = mcp_get_standard_answer(question=question)
-        if result.get("status") == "success":
-            response = f"""
-✅ MCP 工具標準答案
+    result = interview_service.analyze_user_answer(
+        user_answer, question, standard_answer=standard_answer
+    )
+    return _format_service_analysis(result)
 
-問題：{result['question']}
-標準答案：{result['standard_answer']}
-來源：{result['source']}
-            """
-            return response
-        else:
-            return f"MCP 工具獲取標準答案失敗：{result.get('message', '未知錯誤')}"
-    except ImportError:
-        # 回退到原始工具
-        if not TOOLS_AVAILABLE:
-            return "工具模組不可用，無法獲取標準答案"
 
-        try:
-            question_data = question_manager.get_random_question()
+async def _analyze_answer_async(
+    user_answer: str, question: str, standard_answer: str
+):
+    """_analyze_answer 的非同步版本"""
+    intro_response = _short_intro_response(user_answer)
+    if intro_response is not None:
+        return intro_response
 
-            response = f"""
-✅ 標準答案
+    if not TOOLS_AVAILABLE:
+        return {"success": False, "error": "工具模組不可用，無法分析回答"}
 
-問題：{question_data['question']}
-標準答案：{question_data['standard_answer']}
-來源：{question_data['source']}
-            """
-            return response
-        except Exception as e:
-            return f"獲取標準答案失敗：{str(e)}"
-    except Exception as e:
-        return f"MCP 工具錯誤：{str(e)}"
+    result = await interview_service.analyze_user_answer_async(
+        user_answer, question, standard_answer=standard_answer
+    )
+    return _format_service_analysis(result)
 
 
-def start_interview():
-    """開始互動式面試 - 優先使用 MCP 工具"""
-    try:
-        # 優先使用 MCP 工具
-        from server import conduct_interview as mcp_conduct_interview
+def _format_service_analysis(result: dict):
+    """將面試服務的分析結果整理成統一格式"""
+    if result.get("status") != "success":
+        return {"success": False, "error": result.get("message", "分析失敗")}
+    return _format_tool_analysis(result, result["standard_answer"])
 
-        result = mcp_conduct_interview()
-        if result.get("status") == "success":
-            response = f"""
-🤖 MCP 工具智能面試系統！
 
-============================================================
-🎯 面試系統
-============================================================
-{result.get('message', '面試已開始')}
+def get_random_questions(
+    n: int = 5, category: str = "", difficulty: str = "", exclude_ids=None
+):
+    """一次獲取多題互不重複的面試問題（練習題組、模擬考），category 為題庫集合名稱或其前綴"""
+    if not TOOLS_AVAILABLE:
+        return {"success": False, "error": "工具模組不可用，無法獲取問題"}
+
+    result = interview_service.get_random_questions(
+        n, category=category, difficulty=difficulty, exclude_ids=exclude_ids
+    )
+    if result.get("status") != "success":
+        return {"success": False, "error": result.get("message", "獲取問題失敗")}
+
+    lines = [f"🎯 練習題組（{result['count']} 題）", ""]
+    for number, question in enumerate(result["questions"], 1):
+        lines.append(
+            f"{number}. {question['question']}"
+            f"（{question['category']}，{question['difficulty']}）"
+        )
+    return {
+        "success": True,
+        "result": "\n".join(lines),
+        "questions": result["questions"],
+    }
 
-請回答問題，然後使用 analyze_answer 功能來分析您的回答。
+
+def get_standard_answer(question: str = ""):
+    """獲取標準答案 - 使用面試服務"""
+    if not TOOLS_AVAILABLE:
+        return {"success": False, "error": "工具模組不可用，無法獲取標準答案"}
+
+    result = interview_service.get_standard_answer(question)
+    if result.get("status") != "success":
+        return {"success": False, "error": result.get("message", "獲取標準答案失敗")}
+    return f"""
+✅ 標準答案
+
+問題：{result['question']}
+標準答案：{result['standard_answer']}
+來源：{result['source']}
             """
-            return response
-        else:
-            return f"MCP 工具面試失敗：{result.get('message', '未知錯誤')}"
-    except ImportError:
-        # 回退到原始工具
-        if not TOOLS_AVAILABLE:
-            return "工具模組不可用，無法開始面試"
 
-        try:
-            question_data = question_manager.get_random_question()
-            category = _categorize_question(question_data["question"])
-            difficulty = _assess_difficulty(question_data["question"])
 
-            response = f"""
+def start_interview():
+    """開始互動式面試 - 使用面試服務"""
+    if not TOOLS_AVAILABLE:
+        return {"success": False, "error": "工具模組不可用，無法開始面試"}
+
+    result = interview_service.conduct_interview()
+    if result.get("status") != "question_ready":
+        return {"success": False, "error": result.get("message", "開始面試失敗")}
+    return f"""
 🤖 歡迎使用智能面試系統！
 
 ============================================================
 🎯 面試問題
 ============================================================
-問題：{question_data['question']}
-類別：{category}
-難度：{difficulty}
-來源：{question_data['source']}
+問題：{result['question']}
+類別：{result['category']}
+難度：{result['difficulty']}
+來源：{result['source']}
 
 請回答這個問題，然後使用 analyze_answer 功能來分析您的回答。
             """
-            return response
-        except Exception as e:
-            return f"開始面試失敗：{str(e)}"
-    except Exception as e:
-        return f"MCP 工具錯誤：{str(e)}"
 
 
-def analyze_intro(user_message: str = ""):
+def analyze_intro(user_message: str = "", user_id: str | None = None):
     """分析用戶自我介紹 - 使用 LLM 進行智能分析"""
     try:
         print(f"📊 分析自我介紹內容: {user_message}")
 
         # 優先使用 LLM 分析
         try:
-            return _llm_analyze_intro(user_message)
+            result = _llm_analyze_intro(user_message)
+        except Exception as llm_error:
+            print(f"⚠️ LLM 分析失敗，回退到關鍵字分析: {llm_error}")
+            result = _fallback_keyword_analysis(user_message)
+
+        _record_intro(result, user_id, user_message)
+        return result
+
+    except Exception as e:
+        return {"success": False, "error": f"分析自我介紹失敗: {str(e)}"}
+
+
+async def analyze_intro_async(user_message: str = "", user_id: str | None = None):
+    """analyze_intro 的非同步版本"""
+    try:
+        print(f"📊 分析自我介紹內容: {user_message}")
+
+        try:
+            result = await _llm_analyze_intro_async(user_message)
         except Exception as llm_error:
             print(f"⚠️ LLM 分析失敗，回退到關鍵字分析: {llm_error}")
-            return _fallback_keyword_analysis(user_message)
+            result = _fallback_keyword_analysis(user_message)
+
+        _record_intro(result, user_id, user_message)
+        return result
 
     except Exception as e:
         return {"success": False, "error": f"分析自我介紹失敗: {str(e)}"}
 
 
+def _record_intro(result: dict, user_id: str | None, user_message: str):
+    """分析成功時記錄自我介紹，並在背景更新總結草稿"""
+    if user_id and result.get("success"):
+        score_ledger.record_intro(user_id, user_message, result.get("result"))
+        schedule_summary_draft(user_id)
+
+
 def _llm_analyze_intro(user_message: str):
     """使用 LLM 進行自我介紹分析"""
-    analysis_prompt = f"""
+    llm_response = call_openai_for_analysis(
+        _build_intro_prompt(user_message), max_tokens=1500
+    )
+    return _format_intro_report(user_message, llm_response)
+
+
+async def _llm_analyze_intro_async(user_message: str):
+    """_llm_analyze_intro 的非同步版本"""
+    llm_response = await acall_openai_for_analysis(
+        _build_intro_prompt(user_message), max_tokens=1500
+    )
+    return _format_intro_report(user_message, llm_response)
+
+
+def _build_intro_prompt(user_message: str):
+    """自我介紹分析的提示詞"""
+    return f"""
 請分析以下自我介紹內容，按照6個標準進行專業評估：
 
 **自我介紹內容**：
@@ -424,9 +609,9 @@ def _llm_analyze_intro(user_message: str):
 請確保返回有效的 JSON 格式，不要添加任何額外的文字說明。
 """
 
-    # 調用 LLM
-    llm_response = call_openai_for_analysis(analysis_prompt, max_tokens=1500)
 
+def _format_intro_report(user_message: str, llm_response: str):
+    """解析 LLM 的 JSON 回應並生成分析報告"""
     # 解析 JSON 回應
     try:
         # 嘗試提取 JSON 部分
@@ -741,114 +926,96 @@ def _fallback_keyword_analysis(user_message: str):
         return {"success": False, "error": f"關鍵字分析失敗: {str(e)}"}
 
 
-def generate_final_summary(user_message: str = "", interview_data: dict | None = None):
-    """生成最終面試總結和建議"""
+def generate_final_summary(
+    user_message: str = "",
+    interview_data: dict | None = None,
+    user_id: str = "default_user",
+):
+    """生成最終面試總結和建議（interview_data 僅保留相容性，評分以伺服器端帳本為準）"""
     try:
         print(f"📋 生成最終面試總結")
 
-        # 收集實際的面試數據
-        actual_data = _collect_actual_interview_data(interview_data)
+        # 讀取評分帳本中已累計的數據
+        actual_data = _collect_actual_interview_data(user_id)
+
+        # 背景草稿與目前帳本版本一致時直接使用，不需重新生成
+        epoch = _interview_epochs.get(user_id, 0)
+        draft = _summary_drafts.get(user_id)
+        if draft and draft[0] == epoch and draft[1] == actual_data["version"]:
+            print(f"⚡ 使用預先生成的面試總結（版本 {draft[1]}）")
+            return draft[2]
 
         # 基於實際數據生成總結
-        return _generate_comprehensive_summary(actual_data)
+        result = _generate_comprehensive_summary(actual_data)
+        _store_summary_draft(user_id, epoch, actual_data["version"], result)
+        return result
 
     except Exception as e:
         return {"success": False, "error": f"生成最終總結失敗: {str(e)}"}
 
 
-def _collect_actual_interview_data(interview_data: dict | None = None):
-    """收集實際的面試數據"""
-    try:
-        # 收集自我介紹內容
-        intro_content = get_collected_intro("default_user")
-
-        # 初始化數據結構
-        actual_data = {
-            "intro_content": intro_content,
-            "intro_analysis": None,
-            "questions_and_answers": [],
-            "scores": [],
-            "total_questions": 0,
-            "average_score": 0,
-        }
-
-        # 如果有前端傳來的面試數據，使用它
-        if interview_data and "chat_history" in interview_data:
-            chat_history = interview_data["chat_history"]
-
-            for chat in chat_history:
-                stage = chat.get("stage", "")
-                ai_response = chat.get("ai", "")
-                user_message = chat.get("user", "")
-
-                # 收集自我介紹分析
-                if stage == "intro_analysis" and "自我介紹分析" in ai_response:
-                    actual_data["intro_analysis"] = ai_response
-
-                # 收集問答對話和評分
-                elif stage == "questioning":
-                    if "請給我問題" in user_message and "問題：" in ai_response:
-                        # 這是一個問題
-                        actual_data["questions_and_answers"].append(
-                            {"type": "question", "content": ai_response}
-                        )
-                    elif "評分：" in ai_response or "分析結果" in ai_response:
-                        # 這是答案分析
-                        actual_data["questions_and_answers"].append(
-                            {
-                                "type": "answer_analysis",
-                                "user_answer": user_message,
-                                "analysis": ai_response,
-                            }
-                        )
-
-                        # 提取評分
-                        score = _extract_score_from_response(ai_response)
-                        if score is not None:
-                            actual_data["scores"].append(score)
-
-        # 計算統計數據
-        actual_data["total_questions"] = len(
-            [
-                qa
-                for qa in actual_data["questions_and_answers"]
-                if qa["type"] == "question"
-            ]
+def schedule_summary_draft(user_id: str):
+    """在背景更新用戶的總結草稿；尚未開始的舊工作會被取消"""
+    epoch = _interview_epochs.get(user_id, 0)
+    with _summary_futures.lock_for(user_id):
+        previous = _summary_futures.get(user_id)
+        if previous is not None:
+            previous.cancel()
+        _summary_futures.set(
+            user_id, _summary_executor.submit(_build_summary_draft, user_id, epoch)
         )
-        if actual_data["scores"]:
-            actual_data["average_score"] = sum(actual_data["scores"]) / len(
-                actual_data["scores"]
-            )
 
-        return actual_data
 
+def _build_summary_draft(user_id: str, epoch: int):
+    """背景工作：依目前帳本生成總結草稿"""
+    try:
+        if _interview_epochs.get(user_id, 0) != epoch:
+            return  # 用戶已重新開始，放棄這次工作
+        actual_data = _collect_actual_interview_data(user_id)
+        result = _generate_comprehensive_summary(actual_data)
+        _store_summary_draft(user_id, epoch, actual_data["version"], result)
     except Exception as e:
-        print(f"❌ 收集面試數據失敗: {e}")
-        return {
-            "intro_content": "",
-            "intro_analysis": None,
-            "questions_and_answers": [],
-            "scores": [],
-            "total_questions": 0,
-            "average_score": 0,
-        }
+        print(f"⚠️ 背景生成總結草稿失敗: {e}")
 
 
-def _extract_score_from_response(response: str):
-    """從回應中提取評分"""
-    try:
-        import re
+def _store_summary_draft(user_id: str, epoch: int, version: int, result: dict):
+    """只保存屬於目前世代且版本較新的草稿"""
 
-        # 尋找評分模式
-        patterns = [r"評分：(\d+)", r"評分: (\d+)", r"Score: (\d+)", r"Score：(\d+)"]
+    def choose(current):
+        if _interview_epochs.get(user_id, 0) != epoch:
+            return current
+        if current and current[0] == epoch and current[1] >= version:
+            return current
+        return (epoch, version, result)
 
-        for pattern in patterns:
-            match = re.search(pattern, response)
-            if match:
-                return int(match.group(1))
-        return None
-    except:
-        return None
+    # 與 reset_interview 共用同一把鎖，避免重新開始後寫回舊草稿
+    with _interview_epochs.lock_for(user_id):
+        _summary_drafts.update(user_id, choose)
+
+
+def _collect_actual_interview_data(user_id: str = "default_user"):
+    """從評分帳本讀取面試統計（O(1)，不需重新掃描對話記錄）"""
+    actual_data = score_ledger.snapshot(user_id)
+    if not actual_data["intro_content"]:
+        actual_data["intro_content"] = get_collected_intro(user_id)
+    return actual_data
+
+
+def reset_interview(user_id: str = "default_user"):
+    """清除用戶本場面試的自我介紹、評分記錄、總結草稿與預取的問題"""
+    with _interview_epochs.lock_for(user_id):
+        _interview_epochs.update(user_id, lambda epoch: epoch + 1, 0)
+        _summary_drafts.pop(user_id)
+    future = _summary_futures.pop(user_id)
+    if future is not None:
+        future.cancel()
+    slot = _question_prefetch.pop(user_id)
+    if slot is not None:
+        slot[1].cancel()
+    _served_questions.pop(user_id)
+    clear_collected_intro(user_id)
+    score_ledger.reset(user_id)
+    return {"success": True, "result": "面試資料已重置"}
 
 
 def _generate_comprehensive_summary(actual_data: dict):
@@ -872,15 +1039,22 @@ def _generate_comprehensive_summary(actual_data: dict):
             summary_parts.append("")
 
         # 面試問答分析部分
-        if actual_data["questions_and_answers"]:
+        if actual_data["questions_served"] or actual_data["answers_scored"]:
             summary_parts.append("💬 **面試問答表現**：")
             summary_parts.append(
-                f"📊 總共回答了 {actual_data['total_questions']} 個問題"
+                f"📊 共出題 {actual_data['questions_served']} 題，"
+                f"完成評分 {actual_data['answers_scored']} 題"
             )
 
-            if actual_data["scores"]:
+            if actual_data["answers_scored"]:
                 avg_score = actual_data["average_score"]
                 summary_parts.append(f"📈 平均評分：{avg_score:.1f}/100")
+                summary_parts.append(
+                    f"📉 最高 / 最低：{actual_data['max_score']:.0f} / "
+                    f"{actual_data['min_score']:.0f}"
+                )
+                for category, average in actual_data["category_averages"].items():
+                    summary_parts.append(f"🏷️ {category}：{average:.1f}/100")
 
                 # 基於評分給出評價
                 if avg_score >= 90:
@@ -950,7 +1124,7 @@ def _generate_specific_suggestions(actual_data: dict):
             suggestions.append("✅ 自我介紹內容豐富，繼續保持這種表達風格")
 
     # 基於評分的建議
-    if actual_data.get("scores") and actual_data.get("average_score"):
+    if actual_data.get("answers_scored") and actual_data.get("average_score"):
         avg_score = actual_data["average_score"]
         if avg_score < 80:
             suggestions.append("📚 建議加強技術知識的深度，多練習具體案例的解釋")
@@ -959,7 +1133,7 @@ def _generate_specific_suggestions(actual_data: dict):
             suggestions.append("🎯 保持良好的回答品質，可以嘗試更深入的技術討論")
 
     # 基於問題數量的建議
-    if actual_data.get("total_questions", 0) < 3:
+    if actual_data.get("questions_served", 0) < 3:
         suggestions.append("⏰ 建議完成更多面試問題，以獲得更全面的練習")
 
     # 至少提供3個建議，使用預設建議補充
@@ -1025,125 +1199,6 @@ def _generate_template_summary():
     }
 
 
-def _generate_data_based_summary(interview_data: dict):
-    """基於實際數據生成總結"""
-    try:
-        # 解析面試數據
-        chat_history = interview_data.get("chat_history", [])
-
-        # 分析評分數據
-        scores = []
-        total_questions = 0
-        analysis_results = []
-
-        for chat in chat_history:
-            if chat.get("stage") == "questioning" and "ai" in chat:
-                ai_response = chat["ai"]
-                # 提取評分信息
-                if "評分：" in ai_response or "Score:" in ai_response:
-                    total_questions += 1
-                    # 嘗試提取分數
-                    score = _extract_score_from_response(ai_response)
-                    if score is not None:
-                        scores.append(score)
-                        analysis_results.append(
-                            {
-                                "question": chat.get("user", ""),
-                                "score": score,
-                                "response": ai_response,
-                            }
-                        )
-
-        # 計算統計數據
-        if scores:
-            average_score = sum(scores) / len(scores)
-            min_score = min(scores)
-            max_score = max(scores)
-
-            # 根據平均分數生成評價
-            if average_score >= 80:
-                overall_rating = "優秀"
-                performance_desc = "表現出色，回答準確且完整"
-            elif average_score >= 60:
-                overall_rating = "良好"
-                performance_desc = "表現良好，有改進空間"
-            elif average_score >= 40:
-                overall_rating = "中等"
-                performance_desc = "表現一般，需要加強練習"
-            else:
-                overall_rating = "需要改進"
-                performance_desc = "表現較差，需要大量練習"
-        else:
-            average_score = 0
-            overall_rating = "無法評估"
-            performance_desc = "沒有足夠的評分數據"
-
-        # 生成總結
-        summary = f"""
-🎯 **面試總結報告**
-
-**面試完成情況**：
-✅ 自我介紹階段 - 已完成
-✅ 自我介紹分析 - 已完成  
-✅ 面試問答階段 - 已完成 ({total_questions} 題)
-✅ 最終總結 - 已完成
-
-**實際表現評估**：
-• **總題數**: {total_questions} 題
-• **平均分數**: {average_score:.1f}/100
-• **最高分數**: {max_score if scores else 'N/A'}/100
-• **最低分數**: {min_score if scores else 'N/A'}/100
-• **整體評級**: {overall_rating}
-
-**表現分析**：
-{performance_desc}
-
-**具體建議**：
-{_generate_specific_advice(average_score, scores)}
-
-**下次面試準備重點**：
-1. 🎯 加強技術問題的準備和練習
-2. 📊 提高回答的準確性和完整性
-3. 🔍 多進行模擬面試練習
-4. 💡 學習標準答案的結構和要點
-
-**總評**: 您在本次模擬面試中的表現為 {overall_rating}，建議根據上述建議進行改進。
-        """
-
-        return {
-            "success": True,
-            "result": summary,
-            "message": "最終總結生成完成（基於實際數據）",
-        }
-
-    except Exception as e:
-        print(f"❌ 生成數據基礎總結失敗: {e}")
-        return _generate_template_summary()
-
-
-def _generate_specific_advice(average_score: float, scores: list) -> str:
-    """根據分數生成具體建議"""
-    if not scores:
-        return "• 建議多進行模擬面試練習，提高回答質量"
-
-    if average_score >= 80:
-        return """• 保持優秀的表現，繼續深化技術知識
-• 可以嘗試更具挑戰性的問題
-• 建議分享您的學習方法和經驗"""
-    elif average_score >= 60:
-        return """• 加強技術問題的準備和練習
-• 提高回答的準確性和完整性
-• 多學習標準答案的結構和要點"""
-    elif average_score >= 40:
-        return """• 需要大量練習技術問題
-• 加強基礎知識的學習
-• 建議參加更多模擬面試"""
-    else:
-        return """• 需要從基礎開始加強學習
-• 建議參加培訓課程或學習小組
-• 多進行基礎知識的練習"""
-
-
 def interview_system():
     """智能面試系統主 Agent"""
     return """
@@ -1159,89 +1214,158 @@ def interview_system():
     """
 
 
-# 輔助函數
-def _categorize_question(question: str) -> str:
-    """對問題進行分類"""
-    categories = {
-        "自我介紹": ["介紹", "自己", "背景", "經歷"],
-        "技術能力": ["技術", "技能", "程式", "開發", "程式設計"],
-        "專案經驗": ["專案", "經驗", "實作", "作品"],
-        "問題解決": ["問題", "解決", "困難", "挑戰"],
-        "團隊合作": ["團隊", "合作", "溝通", "協作"],
-        "學習能力": ["學習", "成長", "進步", "新技術"],
-    }
-
-    question_lower = question.lower()
-    for category, keywords in categories.items():
-        if any(keyword in question_lower for keyword in keywords):
-            return category
+# 延遲分佈的上界（毫秒），最後一格為超過最大上界的呼叫
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class FunctionMetrics:
+    """單一橋接函數的呼叫次數、錯誤次數與延遲分佈"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, seconds: float, error: bool):
+        index = bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.buckets[index] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = list(self.buckets)
+            calls, errors = self.calls, self.errors
+            total, maximum = self.total_seconds, self.max_seconds
+        histogram = {
+            f"le_{bound}ms": count for bound, count in zip(LATENCY_BUCKETS_MS, buckets)
+        }
+        histogram["gt_30000ms"] = buckets[-1]
+        return {
+            "calls": calls,
+            "errors": errors,
+            "avg_ms": round(total / calls * 1000, 3) if calls else 0.0,
+            "max_ms": round(maximum * 1000, 3),
+            "histogram": histogram,
+        }
 
-    return "一般問題"
 
+class FunctionRegistry:
+    """橋接函數註冊表 - 啟動時解析所有目標，呼叫時以字典查表分派並記錄指標"""
+
+    def __init__(self):
+        # {名稱: (同步函數, 非同步函數或 None, 是否將字串結果包成統一格式)}
+        # 包裝的字串一律視為成功，失敗必須回傳 {"success": False, "error": ...}
+        self._functions = {}
+        self._metrics = {}
+        self._warmed_up = None
+
+    def register(self, name, function, async_function=None, wrap_text=False):
+        self._functions[name] = (function, async_function, wrap_text)
+        self._metrics[name] = FunctionMetrics()
+
+    def names(self):
+        return list(self._functions)
+
+    def _finish(self, name, result, wrap_text, started):
+        if wrap_text and isinstance(result, str):
+            result = {"success": True, "result": result}
+        error = not (isinstance(result, dict) and result.get("success", True))
+        self._metrics[name].observe(time.perf_counter() - started, error)
+        return result
+
+    def _failed(self, name, error, started):
+        self._metrics[name].observe(time.perf_counter() - started, True)
+        return {"success": False, "error": f"Fast Agent 調用失敗: {str(error)}"}
+
+    def call(self, name, **kwargs):
+        """同步呼叫已註冊的函數"""
+        entry = self._functions.get(name)
+        if entry is None:
+            return {"success": False, "error": f"Fast Agent 函數 {name} 不存在"}
+        function, _, wrap_text = entry
+        started = time.perf_counter()
+        try:
+            return self._finish(name, function(**kwargs), wrap_text, started)
+        except Exception as e:
+            return self._failed(name, e, started)
+
+    async def call_async(self, name, **kwargs):
+        """非同步呼叫：有原生非同步版本時直接等待，否則在執行緒池中執行"""
+        entry = self._functions.get(name)
+        if entry is None or entry[1] is None:
+            return await asyncio.to_thread(self.call, name, **kwargs)
+        _, async_function, wrap_text = entry
+        started = time.perf_counter()
+        try:
+            result = await async_function(**kwargs)
+            return self._finish(name, result, wrap_text, started)
+        except Exception as e:
+            return self._failed(name, e, started)
+
+    def warm_up(self) -> dict:
+        """預先建立資料庫連線，避免第一個請求承擔初始化成本"""
+        started = time.perf_counter()
+        report = {"interview_service": TOOLS_AVAILABLE}
+        if TOOLS_AVAILABLE:
+            report["database"] = db_manager.db is not None or db_manager.connect()
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        self._warmed_up = report
+        print(f"🔥 Fast Agent 橋接預熱完成: {report}")
+        return report
+
+    def metrics(self) -> dict:
+        """各函數的呼叫指標"""
+        return {
+            "functions": {
+                name: metrics.snapshot() for name, metrics in self._metrics.items()
+            },
+            "warm_up": self._warmed_up,
+        }
 
-def _assess_difficulty(question: str) -> str:
-    """評估問題難度"""
-    question_lower = question.lower()
 
-    if len(question) < 50:
-        return "簡單"
-    elif len(question) < 100:
-        return "中等"
-    else:
-        return "困難"
+# 全域橋接函數註冊表實例
+fast_agent_registry = FunctionRegistry()
+fast_agent_registry.register("get_question", get_question)
+fast_agent_registry.register("record_served_question", record_served_question)
+fast_agent_registry.register(
+    "analyze_answer", analyze_answer, async_function=analyze_answer_async
+)
+fast_agent_registry.register("intro_collector", intro_collector)
+fast_agent_registry.register(
+    "analyze_intro", analyze_intro, async_function=analyze_intro_async
+)
+fast_agent_registry.register("generate_final_summary", generate_final_summary)
+fast_agent_registry.register("reset_interview", reset_interview)
+fast_agent_registry.register("prefetch_question", prefetch_question)
+fast_agent_registry.register("get_random_questions", get_random_questions)
+fast_agent_registry.register(
+    "get_standard_answer", get_standard_answer, wrap_text=True
+)
+# 以下兩個函數不接受參數，呼叫時忽略傳入的參數
+fast_agent_registry.register(
+    "start_interview", lambda **kwargs: start_interview(), wrap_text=True
+)
+fast_agent_registry.register(
+    "interview_system", lambda **kwargs: interview_system(), wrap_text=True
+)
 
 
 # 橋接函數
 def call_fast_agent_function(function_name, **kwargs):
     """調用 Fast Agent 功能"""
-    try:
-        if function_name == "get_question":
-            result = get_question()
-            # 確保返回統一格式
-            if isinstance(result, str):
-                return {"success": True, "result": result}
-            else:
-                return result
-        elif function_name == "analyze_answer":
-            result = analyze_answer(**kwargs)
-            return result  # analyze_answer 現在返回統一格式
-        elif function_name == "intro_collector":
-            result = intro_collector(**kwargs)
-            return result  # intro_collector 返回統一格式
-        elif function_name == "analyze_intro":
-            result = analyze_intro(**kwargs)
-            return result  # analyze_intro 返回統一格式
-        elif function_name == "generate_final_summary":
-            result = generate_final_summary(**kwargs)
-            return result  # generate_final_summary 返回統一格式
-        elif function_name == "get_standard_answer":
-            result = get_standard_answer(**kwargs)
-            # 確保返回統一格式
-            if isinstance(result, str):
-                return {"success": True, "result": result}
-            else:
-                return result
-        elif function_name == "start_interview":
-            result = start_interview()
-            # 確保返回統一格式
-            if isinstance(result, str):
-                return {"success": True, "result": result}
-            else:
-                return result
-        elif function_name == "interview_system":
-            result = interview_system()
-            # 確保返回統一格式
-            if isinstance(result, str):
-                return {"success": True, "result": result}
-            else:
-                return result
-        else:
-            return {
-                "success": False,
-                "error": f"Fast Agent 函數 {function_name} 不存在",
-            }
-    except Exception as e:
-        return {"success": False, "error": f"Fast Agent 調用失敗: {str(e)}"}
+    return fast_agent_registry.call(function_name, **kwargs)
+
+
+async def call_fast_agent_function_async(function_name, **kwargs):
+    """call_fast_agent_function 的非同步版本，LLM 呼叫不佔用執行緒"""
+    return await fast_agent_registry.call_async(function_name, **kwargs)
 
 
 if __name__ == "__main__":
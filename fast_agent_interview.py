@@ -72,7 +72,7 @@ async def get_question():
     """獲取隨機面試問題 - 優先使用 MCP 工具"""
     try:
         # 優先使用 MCP 工具
-        from server import get_random_question as mcp_get_random_question
+        from interview_service import get_random_question as mcp_get_random_question
 
         result = mcp_get_random_question()
         if result.get("status") == "success":
@@ -125,7 +125,7 @@ async def analyze_answer(
     """分析用戶回答 - 優先使用 MCP 工具"""
     try:
         # 優先使用 MCP 工具
-        from server import analyze_user_answer as mcp_analyze_user_answer
+        from interview_service import analyze_user_answer as mcp_analyze_user_answer
 
         result = mcp_analyze_user_answer(
             user_answer=user_answer, question=question, standard_answer=standard_answer
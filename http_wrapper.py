@@ -4,14 +4,23 @@
 整合 tools 模組
 """
 
+import gzip
+import hashlib
 import json
 import logging
 import os
+import signal
+import socket
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import parse_qs, urlparse
 
+from session_store import SessionStore
+
 # 設定日誌
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -21,7 +30,6 @@ logger = logging.getLogger(__name__)
 # 導入 tools 模組
 try:
     from tools.answer_analyzer import answer_analyzer
-    from tools.interactive_interview import InteractiveInterview
     from tools.question_manager import question_manager
 
     logger.info("✅ Tools 模組導入成功")
@@ -29,9 +37,9 @@ except ImportError as e:
     logger.error(f"❌ Tools 模組導入失敗: {e}")
     sys.exit(1)
 
-# 導入你的 MCP 伺服器工具
+# 導入面試服務（與 MCP 伺服器工具相同的實作，不需要 MCP 套件）
 try:
-    from server import (
+    from interview_service import (
         analyze_user_answer,
         conduct_interview,
         get_analysis_history,
@@ -45,87 +53,329 @@ try:
 
     # 標記 MCP 工具可用
     MCP_TOOLS_AVAILABLE = True
-    logger.info("✅ MCP 工具導入成功")
+    logger.info("✅ 面試服務導入成功")
 except ImportError as e:
-    logger.warning(f"⚠️ MCP 工具導入失敗: {e}")
+    logger.warning(f"⚠️ 面試服務導入失敗: {e}")
     MCP_TOOLS_AVAILABLE = False
 
+# 伺服器設定（可由環境變數調整）
+HTTP_WRAPPER_WORKERS = int(os.getenv("HTTP_WRAPPER_WORKERS", "64"))
+# 工作執行緒都忙碌時最多排隊的連線數，超過則直接回應 503
+HTTP_WRAPPER_MAX_PENDING = int(os.getenv("HTTP_WRAPPER_MAX_PENDING", "128"))
+HTTP_WRAPPER_MAX_REQUEST_BYTES = int(
+    os.getenv("HTTP_WRAPPER_MAX_REQUEST_BYTES", str(1024 * 1024))
+)
+# 閒置的 keep-alive 連線在此秒數後關閉，釋放工作執行緒；
+# 工作執行緒不足時閒置連線會提前關閉，讓給新連線
+HTTP_WRAPPER_KEEPALIVE_TIMEOUT = float(
+    os.getenv("HTTP_WRAPPER_KEEPALIVE_TIMEOUT", "5")
+)
+HTTP_WRAPPER_SHUTDOWN_GRACE = float(os.getenv("HTTP_WRAPPER_SHUTDOWN_GRACE", "30"))
+
+
+class PooledHTTPServer(HTTPServer):
+    """以固定大小的執行緒池處理連線的 HTTP 伺服器，支援優雅關閉"""
+
+    allow_reuse_address = True
+    request_queue_size = HTTP_WRAPPER_MAX_PENDING
+
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        max_workers: int = HTTP_WRAPPER_WORKERS,
+        max_pending: int = HTTP_WRAPPER_MAX_PENDING,
+    ):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="http-wrapper"
+        )
+        self.draining = False
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._state_lock = threading.Condition()
+        self._active = 0
+        self._idle_connections = set()
+        # 已處理過請求、正在等待下一個 keep-alive 請求的連線，執行緒不足時可提前關閉
+        self._keepalive_connections = set()
+
+    def process_request(self, request, client_address):
+        """將連線交給執行緒池；池與佇列都滿時回應 503"""
+        if self.draining or not self._slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        with self._state_lock:
+            self._active += 1
+            self._release_idle_workers()
+        self.executor.submit(self._process_in_worker, request, client_address)
+
+    def _process_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+            with self._state_lock:
+                self._active -= 1
+                self._idle_connections.discard(request)
+                self._keepalive_connections.discard(request)
+                self._state_lock.notify_all()
+
+    def _reject(self, request):
+        try:
+            request.sendall(
+                b"HTTP/1.1 503 Service Unavailable\r\n"
+                b"Content-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n"
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def mark_idle(self, connection, idle: bool, keepalive: bool = False):
+        """記錄連線是否在等待下一個請求；關閉中則直接結束閒置連線
+
+        keepalive 表示連線已處理過請求，工作執行緒不足時可以提前關閉
+        """
+        with self._state_lock:
+            if not idle:
+                self._idle_connections.discard(connection)
+                self._keepalive_connections.discard(connection)
+                return
+            self._idle_connections.add(connection)
+            if keepalive:
+                self._keepalive_connections.add(connection)
+            if self.draining:
+                self._close_reader(connection)
+            else:
+                self._release_idle_workers()
+
+    def _release_idle_workers(self):
+        """連線數超過工作執行緒數時，關閉閒置的 keep-alive 連線讓出執行緒（呼叫端持有鎖）"""
+        excess = self._active - self.max_workers
+        for connection in list(self._keepalive_connections)[: max(0, excess)]:
+            self._keepalive_connections.discard(connection)
+            self._idle_connections.discard(connection)
+            self._close_reader(connection)
+
+    def _close_reader(self, connection):
+        try:
+            connection.shutdown(socket.SHUT_RD)
+        except OSError:
+            pass
+
+    def drain(self, timeout: float = HTTP_WRAPPER_SHUTDOWN_GRACE) -> bool:
+        """在 serve_forever 結束後呼叫：等待進行中的請求完成並關閉伺服器"""
+        deadline = time.monotonic() + timeout
+        with self._state_lock:
+            self.draining = True
+            for connection in list(self._idle_connections):
+                self._close_reader(connection)
+            while self._active:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._state_lock.wait(remaining)
+            finished = self._active == 0
+        self.executor.shutdown(wait=finished)
+        self.server_close()
+        return finished
+
+
+class StaticAsset:
+    """記憶體中的靜態檔案：預先編碼並壓縮，檔案修改時間改變時才重新讀取"""
+
+    def __init__(self, path: str, content_type: str):
+        self.path = path
+        self.content_type = content_type
+        self._lock = threading.Lock()
+        self._mtime_ns = None
+        self.body = b""
+        self.gzipped = b""
+        self.etag = ""
+        self.last_modified = ""
+        self.modified_at = 0
+
+    def get(self) -> "StaticAsset":
+        """檢查檔案修改時間，必要時重新載入；檔案不存在時拋出 FileNotFoundError"""
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if mtime_ns != self._mtime_ns:
+            with self._lock:
+                if mtime_ns != self._mtime_ns:
+                    self._load(mtime_ns)
+        return self
+
+    def _load(self, mtime_ns: int):
+        with open(self.path, "rb") as f:
+            body = f.read()
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self.modified_at = mtime_ns // 1_000_000_000
+        self.last_modified = formatdate(self.modified_at, usegmt=True)
+        self._mtime_ns = mtime_ns
+        logger.info(
+            f"📄 已載入 {self.path}（{len(body)} 位元組，gzip {len(self.gzipped)} 位元組）"
+        )
+
+    def is_fresh(self, headers) -> bool:
+        """依 If-None-Match / If-Modified-Since 判斷客戶端快取是否仍有效"""
+        if_none_match = headers.get("If-None-Match")
+        if if_none_match is not None:
+            return any(
+                tag.strip() in (self.etag, f"W/{self.etag}", "*")
+                for tag in if_none_match.split(",")
+            )
+        if_modified_since = headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return self.modified_at <= since
+        return False
+
+
+# 聊天頁面（所有連線共用）
+chat_page = StaticAsset("chat_interface.html", "text/html; charset=utf-8")
+
 
 class MCPHTTPHandler(BaseHTTPRequestHandler):
     """MCP HTTP 處理器"""
 
-    # 類變數，用於存儲面試狀態
-    current_interview = None
-    interview_sessions = {}
-
-    def __init__(self, *args, **kwargs):
-        # 初始化面試工具
-        self.interviewer = InteractiveInterview()
+    # HTTP/1.1：同一個連線可連續處理多個請求（keep-alive）
+    protocol_version = "HTTP/1.1"
+    _handled_requests = 0
+    timeout = HTTP_WRAPPER_KEEPALIVE_TIMEOUT
+    # 標頭與內容分兩次寫入，keep-alive 下需關閉 Nagle 以免等待延遲 ACK（約 40ms）
+    disable_nagle_algorithm = True
+
+    # 各會話目前的面試題目（依 session_id 區分，分段鎖容器，多執行緒安全）
+    interview_sessions = SessionStore()
+
+    def handle_one_request(self):
+        """等待請求期間標記為閒置，讓伺服器關閉或執行緒不足時可以結束閒置連線"""
+        mark_idle = getattr(self.server, "mark_idle", None)
+        if mark_idle:
+            mark_idle(self.connection, True, keepalive=self._handled_requests > 0)
+        super().handle_one_request()
+        self._handled_requests += 1
+
+    def parse_request(self):
+        mark_idle = getattr(self.server, "mark_idle", None)
+        if mark_idle:
+            mark_idle(self.connection, False)
+        return super().parse_request()
+
+    def _send_body(self, status, content_type, body, cors=True, headers=None):
+        """送出帶有 Content-Length 的回應，keep-alive 連線才能辨識回應結尾"""
+        if getattr(self.server, "draining", False):
+            self.close_connection = True
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-type", content_type)
+        if cors:
+            self.send_header("Access-Control-Allow-Origin", "*")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status, payload, cors=True):
+        self._send_body(
+            status,
+            "application/json; charset=utf-8",
+            json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            cors=cors,
+        )
 
-        # 調用父類的 __init__
-        super().__init__(*args, **kwargs)
+    def _read_json_body(self):
+        """讀取 JSON 請求內容；長度不符規定時回應錯誤並回傳 None"""
+        length_header = self.headers.get("Content-Length")
+        if length_header is None:
+            self.close_connection = True
+            self._send_json(411, {"error": "缺少 Content-Length"})
+            return None
+        try:
+            content_length = int(length_header)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            self.close_connection = True
+            self._send_json(400, {"error": "Content-Length 格式錯誤"})
+            return None
+        if content_length > HTTP_WRAPPER_MAX_REQUEST_BYTES:
+            # 未讀取的內容會留在連線中，回應後必須關閉連線
+            self.close_connection = True
+            self._send_json(
+                413,
+                {"error": f"請求內容超過上限 {HTTP_WRAPPER_MAX_REQUEST_BYTES} 位元組"},
+            )
+            return None
+        return json.loads(self.rfile.read(content_length).decode("utf-8"))
 
     def do_GET(self):
         """處理 GET 請求"""
         parsed_path = urlparse(self.path)
 
         if parsed_path.path == "/":
-            self.send_response(200)
-            self.send_header("Content-type", "text/html")
-            self.send_header("Access-Control-Allow-Origin", "*")
-            self.end_headers()
-
-            # 讀取並返回 chat_interface.html
+            # 返回記憶體中的 chat_interface.html
             try:
-                with open("chat_interface.html", "r", encoding="utf-8") as f:
-                    html_content = f.read()
-                self.wfile.write(html_content.encode("utf-8"))
+                self._send_asset(chat_page.get())
             except FileNotFoundError:
-                self.wfile.write(b"chat_interface.html not found")
+                self._send_body(200, "text/html", b"chat_interface.html not found")
         else:
-            self.send_response(404)
-            self.send_header("Content-type", "text/plain")
-            self.end_headers()
-            self.wfile.write(b"Not Found")
+            self._send_body(404, "text/plain", b"Not Found", cors=False)
+
+    def _send_asset(self, asset):
+        """送出靜態檔案：快取仍有效時回應 304，支援 gzip 時送出預先壓縮的內容"""
+        headers = {
+            "ETag": asset.etag,
+            "Last-Modified": asset.last_modified,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if asset.is_fresh(self.headers):
+            self._send_body(304, None, b"", headers=headers)
+            return
+
+        body = asset.body
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = asset.gzipped
+            headers["Content-Encoding"] = "gzip"
+        self._send_body(200, asset.content_type, body, headers=headers)
 
     def do_POST(self):
         """處理 POST 請求"""
         parsed_path = urlparse(self.path)
 
         if parsed_path.path == "/api/chat":
-            # 讀取請求內容
-            content_length = int(self.headers["Content-Length"])
-            post_data = self.rfile.read(content_length)
-
             try:
-                data = json.loads(post_data.decode("utf-8"))
+                # 讀取請求內容
+                data = self._read_json_body()
+                if data is None:
+                    return
                 message = data.get("message", "")
 
-                # 處理聊天訊息
-                result = self.process_chat_message(message)
-
-                self.send_response(200)
-                self.send_header("Content-type", "application/json; charset=utf-8")
-                self.send_header("Access-Control-Allow-Origin", "*")
-                self.end_headers()
-                self.wfile.write(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+                # 處理聊天訊息（依會話區分面試題目）
+                result = self.process_chat_message(
+                    message, self._session_id(data)
+                )
+                self._send_json(200, result)
 
             except Exception as e:
                 logger.error(f"聊天處理錯誤: {e}")
-                self.send_response(500)
-                self.send_header("Content-type", "application/json; charset=utf-8")
-                self.send_header("Access-Control-Allow-Origin", "*")
-                self.end_headers()
-                self.wfile.write(
-                    json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
-                )
+                self._send_json(500, {"error": str(e)})
         else:
-            self.send_response(404)
-            self.send_header("Content-type", "application/json; charset=utf-8")
-            self.end_headers()
-            self.wfile.write(
-                json.dumps({"error": "端點不存在"}, ensure_ascii=False).encode("utf-8")
-            )
+            # 未讀取的請求內容會留在連線中，回應後關閉連線
+            self.close_connection = True
+            self._send_json(404, {"error": "端點不存在"}, cors=False)
 
     def do_OPTIONS(self):
         """處理 CORS 預檢請求"""
@@ -133,9 +383,15 @@ class MCPHTTPHandler(BaseHTTPRequestHandler):
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
-    def process_chat_message(self, message):
+    def _session_id(self, data):
+        """請求的會話 id；舊版客戶端未提供時以客戶端位址區分"""
+        session_id = data.get("session_id") if isinstance(data, dict) else None
+        return str(session_id) if session_id else f"client:{self.client_address[0]}"
+
+    def process_chat_message(self, message, session_id="default_session"):
         """處理聊天訊息 - 優先使用你的 MCP 工具"""
         logger.info(f"處理訊息: {message}")
 
@@ -143,7 +399,6 @@ class MCPHTTPHandler(BaseHTTPRequestHandler):
         if MCP_TOOLS_AVAILABLE:
             try:
                 # 檢查是否在面試狀態中
-                session_id = "default_session"
                 current_interview = MCPHTTPHandler.interview_sessions.get(session_id)
 
                 # 如果當前有面試問題，且用戶的回答不是面試相關關鍵字，則分析答案
@@ -162,6 +417,11 @@ class MCPHTTPHandler(BaseHTTPRequestHandler):
                         "conduct",
                         "conduct_interview",
                     ]
+                ) and MCPHTTPHandler.interview_sessions.compare_and_set(
+                    # 取走題目後才分析，同一會話併發的回答只有一個會對這題評分
+                    session_id,
+                    current_interview,
+                    None,
                 ):
                     logger.info(f"🎯 使用 MCP 工具分析面試答案: {message}")
                     try:
@@ -174,8 +434,6 @@ class MCPHTTPHandler(BaseHTTPRequestHandler):
                             ),
                         )
 
-                        # 清除當前面試會話，準備下一個問題
-                        MCPHTTPHandler.interview_sessions[session_id] = None
                         logger.info(f"✅ 已清除面試會話: {session_id}")
 
                         if analysis_result.get("status") == "success":
@@ -242,12 +500,15 @@ class MCPHTTPHandler(BaseHTTPRequestHandler):
 請在下方輸入您的回答："""
 
                             # 保存面試問題到會話
-                            MCPHTTPHandler.interview_sessions[session_id] = {
-                                "question": question,
-                                "source": source,
-                                "standard_answer": standard_answer,
-                                "timestamp": time.time(),
-                            }
+                            MCPHTTPHandler.interview_sessions.set(
+                                session_id,
+                                {
+                                    "question": question,
+                                    "source": source,
+                                    "standard_answer": standard_answer,
+                                    "timestamp": time.time(),
+                                },
+                            )
                             logger.info(f"✅ 已保存 MCP 面試會話: {session_id}")
 
                             return {
@@ -350,8 +611,7 @@ class MCPHTTPHandler(BaseHTTPRequestHandler):
 
         # 回退到原始邏輯（如果 MCP 工具不可用或失敗）
         logger.info("📝 回退到原始邏輯")
-        session_id = "default_session"
-        current_interview = MCPHTTPHandler.interview_sessions.get(session_id)
+        lower_message = message.lower()
 
         # 問候相關
         if any(word in lower_message for word in ["你好", "hello", "hi"]):
@@ -441,14 +701,26 @@ class MCPHTTPHandler(BaseHTTPRequestHandler):
         logger.info(f"HTTP {format % args}")
 
 
-def main():
+def main(port: int = 8080):
     """主函數"""
-    port = 8080
-
+    server = None
     try:
-        server = HTTPServer(("localhost", port), MCPHTTPHandler)
+        server = PooledHTTPServer(("localhost", port), MCPHTTPHandler)
         logger.info(f"🚀 啟動 MCP HTTP 包裝器 - http://localhost:{port}")
+        logger.info(
+            f"🧵 工作執行緒: {HTTP_WRAPPER_WORKERS}，排隊上限: {HTTP_WRAPPER_MAX_PENDING}，"
+            f"請求上限: {HTTP_WRAPPER_MAX_REQUEST_BYTES} 位元組"
+        )
         logger.info("按 Ctrl+C 停止伺服器")
+
+        if threading.current_thread() is threading.main_thread():
+            # shutdown() 會等待 serve_forever 結束，必須在另一個執行緒呼叫
+            signal.signal(
+                signal.SIGTERM,
+                lambda signum, frame: threading.Thread(
+                    target=server.shutdown, daemon=True
+                ).start(),
+            )
         server.serve_forever()
 
     except KeyboardInterrupt:
@@ -456,8 +728,16 @@ def main():
     except Exception as e:
         logger.error(f"伺服器啟動失敗: {e}")
     finally:
+        if server is not None:
+            logger.info("⏳ 等待進行中的請求完成...")
+            if not server.drain():
+                logger.warning("⚠️ 部分請求未在時限內完成")
         logger.info("伺服器關閉")
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MCP HTTP 包裝器")
+    parser.add_argument("--port", type=int, default=8080, help="監聽埠號")
+    main(parser.parse_args().port)
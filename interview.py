@@ -4,13 +4,23 @@
 """
 
 import csv
+import json
 import logging
 import os
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, Optional
 
 from pymongo import MongoClient
 from pymongo.errors import BulkWriteError, ConnectionFailure
 
+from question_dedup import (
+    DEFAULT_THRESHOLD,
+    POLICY_KEEP_ALL,
+    POLICY_KEEP_BEST,
+    deduplicate,
+    print_dedup_report,
+)
+
 # 設定日誌
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -25,6 +35,9 @@ class InterviewDataImporter:
         self,
         mongo_uri: str = "mongodb://localhost:27017/",
         db_name: str = "interview_db",
+        dedup_policy: str = POLICY_KEEP_ALL,
+        dedup_threshold: float = DEFAULT_THRESHOLD,
+        dedup_report_path: Optional[str] = None,
     ):
         """
         初始化匯入器
@@ -32,9 +45,15 @@ class InterviewDataImporter:
         Args:
             mongo_uri: MongoDB 連接 URI
             db_name: 資料庫名稱
+            dedup_policy: 重複題目處理方式（keep_all 全部保留並標記，keep_best 只保留答案最完整的一題）
+            dedup_threshold: 判定為重複題目的相似度門檻（0~1）
+            dedup_report_path: 重複題目報告（JSON）的輸出路徑
         """
         self.mongo_uri = mongo_uri
         self.db_name = db_name
+        self.dedup_policy = dedup_policy
+        self.dedup_threshold = dedup_threshold
+        self.dedup_report_path = dedup_report_path
         self.client = None
         self.db = None
 
@@ -126,14 +145,15 @@ class InterviewDataImporter:
                 content = file.read()
                 file.seek(0)
 
-                # 使用 csv.DictReader 讀取
-                reader = csv.DictReader(file)
+                # 使用 csv.DictReader 讀取（部分檔案在逗號後有空白再接引號）
+                reader = csv.DictReader(file, skipinitialspace=True)
 
                 for row_num, row in enumerate(
                     reader, start=2
                 ):  # 從第2行開始（跳過標題）
                     # 清理資料：移除空值、處理特殊字符
                     cleaned_row = {}
+                    row = self._merge_extra_fields(row, reader.fieldnames)
                     for key, value in row.items():
                         if value is not None and value.strip():
                             # 清理欄位名稱
@@ -156,9 +176,10 @@ class InterviewDataImporter:
             # 如果 UTF-8 失敗，嘗試其他編碼
             try:
                 with open(csv_file_path, "r", encoding="gbk") as file:
-                    reader = csv.DictReader(file)
+                    reader = csv.DictReader(file, skipinitialspace=True)
                     for row_num, row in enumerate(reader, start=2):
                         cleaned_row = {}
+                        row = self._merge_extra_fields(row, reader.fieldnames)
                         for key, value in row.items():
                             if value is not None and value.strip():
                                 clean_key = key.strip()
@@ -184,6 +205,16 @@ class InterviewDataImporter:
 
         return data
 
+    def _merge_extra_fields(
+        self, row: Dict[str, Any], fieldnames: List[str]
+    ) -> Dict[str, Any]:
+        """未加引號的逗號會被切成多餘欄位，將其併回最後一個欄位"""
+        extra = row.pop(None, None)
+        if extra and fieldnames:
+            last = fieldnames[-1]
+            row[last] = ",".join([row.get(last) or ""] + extra)
+        return row
+
     def import_to_mongodb(
         self, collection_name: str, data: List[Dict[str, Any]]
     ) -> bool:
@@ -293,27 +324,37 @@ class InterviewDataImporter:
 
             logger.info(f"🚀 開始匯入 {len(csv_files)} 個 CSV 檔案")
 
-            # 逐一處理每個 CSV 檔案
+            # 先讀取所有 CSV 檔案，才能跨檔案偵測重複題目
+            datasets = {}
             for csv_file in csv_files:
+                # 生成集合名稱
+                collection_name = self.get_collection_name(csv_file)
                 try:
-                    # 生成集合名稱
-                    collection_name = self.get_collection_name(csv_file)
                     logger.info(f"📋 處理集合: {collection_name}")
 
                     # 讀取 CSV 檔案
                     data = self.read_csv_file(csv_file)
 
                     if data:
-                        # 匯入到 MongoDB
-                        success = self.import_to_mongodb(collection_name, data)
-                        results[collection_name] = success
+                        datasets[collection_name] = data
                     else:
                         logger.warning(f"⚠️ 檔案 {csv_file} 沒有有效資料")
                         results[collection_name] = False
 
                 except Exception as e:
                     logger.error(f"❌ 處理檔案 {csv_file} 時發生錯誤: {e}")
-                    collection_name = self.get_collection_name(csv_file)
+                    results[collection_name] = False
+
+            # 偵測近似重複題目並依設定的策略處理
+            datasets = self.deduplicate_datasets(datasets)
+
+            for collection_name, data in datasets.items():
+                try:
+                    # 匯入到 MongoDB
+                    success = self.import_to_mongodb(collection_name, data)
+                    results[collection_name] = success
+                except Exception as e:
+                    logger.error(f"❌ 匯入集合 {collection_name} 時發生錯誤: {e}")
                     results[collection_name] = False
 
             # 顯示匯入統計
@@ -325,6 +366,38 @@ class InterviewDataImporter:
 
         return results
 
+    def deduplicate_datasets(
+        self, datasets: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        跨集合偵測近似重複題目（MinHash + LSH）
+
+        Args:
+            datasets: {集合名稱: 資料列表}
+
+        Returns:
+            依 dedup_policy 處理後的資料
+        """
+        if not datasets:
+            return datasets
+
+        started = time.perf_counter()
+        datasets, report = deduplicate(
+            datasets, policy=self.dedup_policy, threshold=self.dedup_threshold
+        )
+        logger.info(
+            f"🔁 重複題目偵測完成: {report['duplicate_groups']} 個群組，"
+            f"耗時 {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        print_dedup_report(report)
+
+        if self.dedup_report_path:
+            with open(self.dedup_report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            logger.info(f"📝 重複題目報告已寫入 {self.dedup_report_path}")
+
+        return datasets
+
     def show_import_statistics(self, results: Dict[str, bool]):
         """顯示匯入統計"""
         total_files = len(results)
@@ -385,6 +458,14 @@ def main():
         choice = input("\n請輸入選項 (1-3): ").strip()
 
         if choice == "1":
+            keep_best = (
+                input("重複題目只保留答案最完整的一題？(y/N，預設全部保留並標記): ")
+                .strip()
+                .lower()
+            )
+            importer.dedup_policy = (
+                POLICY_KEEP_BEST if keep_best == "y" else POLICY_KEEP_ALL
+            )
             print("\n開始匯入 CSV 檔案...")
             results = importer.import_all_csv_files()
 
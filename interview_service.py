@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+面試服務層
+題庫抽題、搜尋與答案分析的共用實作，只依賴 tools 模組，不需要 MCP 套件。
+server.py 的 MCP 工具與 fast_agent_bridge 都呼叫這裡的函數，回傳相同的狀態字典。
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from tools.answer_analyzer import answer_analyzer
+from tools.question_manager import DIFFICULTY_LEVELS, question_manager
+from tools.question_search import question_search
+
+logger = logging.getLogger(__name__)
+
+# 單次批次抽題的題數上限
+MAX_QUESTION_BATCH = 100
+
+# 問題分類的關鍵字
+QUESTION_CATEGORIES = {
+    "自我介紹": ["介紹", "自己", "背景", "經歷"],
+    "技術能力": ["技術", "技能", "程式", "開發", "程式設計"],
+    "專案經驗": ["專案", "經驗", "實作", "作品"],
+    "問題解決": ["問題", "解決", "困難", "挑戰"],
+    "團隊合作": ["團隊", "合作", "溝通", "協作"],
+    "學習能力": ["學習", "成長", "進步", "新技術"],
+}
+
+
+def categorize_question(question: str) -> str:
+    """對問題進行分類"""
+    question_lower = question.lower()
+    for category, keywords in QUESTION_CATEGORIES.items():
+        if any(keyword in question_lower for keyword in keywords):
+            return category
+
+    return "一般問題"
+
+
+def assess_difficulty(question: str) -> str:
+    """評估問題難度"""
+    return question_manager.assess_difficulty(question)
+
+
+def get_random_question(
+    user_id: str = "", category: str = "", mark_seen: bool = True
+) -> Dict[str, Any]:
+    """從 MongoDB 獲取隨機面試問題，指定 user_id 時同一用戶不會重複抽到已出過的題目
+
+    mark_seen=False 時只抽題不記錄（預取），出題後再呼叫 mark_question_served
+    """
+    try:
+        question_data = question_manager.get_random_question(
+            user_id=user_id or None, category=category or None, mark_seen=mark_seen
+        )
+        return {
+            "status": "success",
+            "question": question_data["question"],
+            "source": question_data["source"],
+            "category": categorize_question(question_data["question"]),
+            "difficulty": assess_difficulty(question_data["question"]),
+            "standard_answer": question_data["standard_answer"],
+            "question_id": question_data.get("question_id"),
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"獲取問題失敗: {str(e)}"}
+
+
+def mark_question_served(user_id: str, question_id: str) -> Dict[str, Any]:
+    """將題目記錄為用戶已出過，之後不再抽到（直到該範圍的題目全部出過）"""
+    try:
+        if not question_manager.mark_question_seen(user_id, question_id):
+            return {"status": "error", "message": f"找不到題目 {question_id}"}
+        return {"status": "success", "question_id": question_id}
+    except Exception as e:
+        return {"status": "error", "message": f"記錄出題失敗: {str(e)}"}
+
+
+def get_random_questions(
+    n: int = 5,
+    category: str = "",
+    difficulty: str = "",
+    exclude_ids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """一次獲取 n 題互不重複的面試問題（練習題組、模擬考），可限定類別、難度並排除已出過的題目
+
+    category 為題庫集合名稱或其前綴，不是回傳題目中依關鍵字判斷的 category 欄位；
+    沒有對應集合時回傳錯誤
+    """
+    try:
+        n = int(n)
+        if not 1 <= n <= MAX_QUESTION_BATCH:
+            return {
+                "status": "error",
+                "message": f"題數必須介於 1 到 {MAX_QUESTION_BATCH} 之間",
+            }
+        if difficulty and difficulty not in DIFFICULTY_LEVELS:
+            return {
+                "status": "error",
+                "message": f"難度必須是 {'、'.join(DIFFICULTY_LEVELS)} 之一",
+            }
+        questions = question_manager.get_random_questions(
+            n,
+            category=category or None,
+            difficulty=difficulty or None,
+            exclude_ids=exclude_ids or (),
+        )
+        return {
+            "status": "success",
+            "requested": n,
+            "count": len(questions),
+            "questions": [
+                {
+                    "question": data["question"],
+                    "source": data["source"],
+                    "category": categorize_question(data["question"]),
+                    "difficulty": assess_difficulty(data["question"]),
+                    "standard_answer": data["standard_answer"],
+                    "question_id": data.get("question_id"),
+                }
+                for data in questions
+            ],
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"批次獲取問題失敗: {str(e)}"}
+
+
+def get_question_by_category(category: str, user_id: str = "") -> Dict[str, Any]:
+    """根據類別（題庫集合名稱或其前綴）獲取面試問題"""
+    try:
+        question_data = question_manager.get_question_by_category(
+            category, user_id=user_id or None
+        )
+        return {
+            "status": "success",
+            "question": question_data["question"],
+            "source": question_data["source"],
+            "category": category,
+            "standard_answer": question_data["standard_answer"],
+            "question_id": question_data.get("question_id"),
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"獲取問題失敗: {str(e)}"}
+
+
+def search_questions(query: str, category: str = "", limit: int = 10) -> Dict[str, Any]:
+    """全文搜尋題庫中的問題與答案（BM25 排序，支援中英文），category 為集合名稱或其前綴"""
+    try:
+        if not query.strip():
+            return {"status": "error", "message": "請提供搜尋關鍵字"}
+        result = question_search.search(query, category=category or None, limit=limit)
+        return {"status": "success", **result}
+    except Exception as e:
+        return {"status": "error", "message": f"搜尋問題失敗: {str(e)}"}
+
+
+def get_question_by_difficulty(difficulty: str) -> Dict[str, Any]:
+    """根據難度獲取面試問題"""
+    try:
+        question_data = question_manager.get_question_by_difficulty(difficulty)
+        return {
+            "status": "success",
+            "question": question_data["question"],
+            "source": question_data["source"],
+            "difficulty": difficulty,
+            "standard_answer": question_data["standard_answer"],
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"獲取問題失敗: {str(e)}"}
+
+
+def conduct_interview() -> Dict[str, Any]:
+    """進行完整的互動式面試流程"""
+    try:
+        question_data = question_manager.get_random_question()
+
+        # 返回問題供客戶端顯示
+        return {
+            "status": "question_ready",
+            "question": question_data["question"],
+            "source": question_data["source"],
+            "category": categorize_question(question_data["question"]),
+            "difficulty": assess_difficulty(question_data["question"]),
+            "message": "面試問題已準備好，請回答以下問題：",
+            "instruction": (
+                f"問題：{question_data['question']}\n"
+                f"來源：{question_data['source']}\n\n請輸入您的回答："
+            ),
+        }
+
+    except Exception as e:
+        return {"status": "error", "message": f"面試初始化失敗: {str(e)}"}
+
+
+def _answer_analysis_result(
+    analysis: Dict[str, Any], user_answer: str, question: str, standard_answer: str
+) -> Dict[str, Any]:
+    """答案分析器結果的統一格式"""
+    return {
+        "status": "success",
+        "score": analysis.get("score", 0),
+        "grade": analysis.get("grade", "未知"),
+        "similarity": analysis.get("similarity", 0),
+        "feedback": analysis.get("feedback", "無反饋"),
+        "differences": analysis.get("differences", []),
+        "user_answer": user_answer,
+        "question": question,
+        "standard_answer": standard_answer,
+    }
+
+
+def _fallback_standard_answer() -> str:
+    """未提供標準答案時從題庫取一題的答案"""
+    question_data = question_manager.get_random_question()
+    return question_data.get("standard_answer", "標準答案未提供")
+
+
+def analyze_user_answer(
+    user_answer: str, question: str, standard_answer: str = ""
+) -> Dict[str, Any]:
+    """分析用戶回答與標準答案的差異"""
+    try:
+        if not standard_answer:
+            standard_answer = _fallback_standard_answer()
+
+        analysis = answer_analyzer.analyze_answer(user_answer, standard_answer)
+        return _answer_analysis_result(
+            analysis, user_answer, question, standard_answer
+        )
+
+    except Exception as e:
+        return {"status": "error", "message": f"分析失敗: {str(e)}"}
+
+
+async def analyze_user_answer_async(
+    user_answer: str, question: str, standard_answer: str = ""
+) -> Dict[str, Any]:
+    """analyze_user_answer 的非同步版本（等待 LLM 時不佔用執行緒）"""
+    try:
+        if not standard_answer:
+            # 資料庫查詢在執行緒池進行
+            standard_answer = await asyncio.to_thread(_fallback_standard_answer)
+
+        analysis = await answer_analyzer.analyze_answer_async(
+            user_answer, standard_answer, question
+        )
+        return _answer_analysis_result(
+            analysis, user_answer, question, standard_answer
+        )
+
+    except Exception as e:
+        return {"status": "error", "message": f"分析失敗: {str(e)}"}
+
+
+def get_standard_answer(question: str = "", category: str = "") -> Dict[str, Any]:
+    """獲取標準答案和解釋"""
+    try:
+        # 如果沒有提供問題，獲取隨機問題
+        if not question:
+            question_data = question_manager.get_random_question()
+            question = question_data.get("question", "")
+            standard_answer = question_data.get("standard_answer", "標準答案未提供")
+            source = question_data.get("source", "未知來源")
+        else:
+            # 這裡可以實現根據問題獲取標準答案的邏輯
+            # 暫時返回預設值
+            standard_answer = "標準答案將根據問題提供"
+            source = "未知來源"
+
+        return {
+            "status": "success",
+            "question": question,
+            "standard_answer": standard_answer,
+            "source": source,
+            "explanation": "詳細解釋將在這裡提供",
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"獲取標準答案失敗: {str(e)}"}
+
+
+def provide_answer_with_context(question: str, user_answer: str = "") -> Dict[str, Any]:
+    """提供帶上下文的答案"""
+    try:
+        question_data = question_manager.get_random_question()
+        standard_answer = question_data.get("standard_answer", "標準答案未提供")
+
+        # 如果有用戶答案，進行分析
+        if user_answer:
+            analysis = answer_analyzer.analyze_answer(user_answer, standard_answer)
+            context = f"您的答案評分：{analysis.get('score', 0)}/100"
+        else:
+            context = "請提供您的答案以獲得分析"
+
+        return {
+            "status": "success",
+            "question": question,
+            "context": context,
+            "answer": standard_answer,
+            "user_answer": user_answer,
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"提供答案失敗: {str(e)}"}
+
+
+def get_question_history() -> Dict[str, Any]:
+    """獲取問題歷史"""
+    return {"status": "success", "history": ["問題1", "問題2", "問題3"]}
+
+
+def get_analysis_history() -> Dict[str, Any]:
+    """獲取分析歷史"""
+    return {"status": "success", "history": ["分析1", "分析2", "分析3"]}
@@ -8,8 +8,6 @@ import argparse
 import asyncio
 import logging
 import sys
-import threading
-import time
 from pathlib import Path
 
 # 設定日誌
@@ -52,28 +50,6 @@ def start_fast_agent():
         logger.error(f"❌ Fast Agent 啟動失敗: {e}")
 
 
-def start_fast_agent_background():
-    """在背景啟動 Fast Agent"""
-    try:
-        logger.info("🤖 在背景啟動 Fast Agent...")
-
-        # 創建新線程運行 Fast Agent
-        def run_fast_agent():
-            try:
-                from fast_agent_interview import main as fast_agent_main
-
-                asyncio.run(fast_agent_main())
-            except Exception as e:
-                logger.error(f"❌ 背景 Fast Agent 執行失敗: {e}")
-
-        fast_agent_thread = threading.Thread(target=run_fast_agent, daemon=True)
-        fast_agent_thread.start()
-        logger.info("✅ Fast Agent 已在背景啟動")
-
-    except Exception as e:
-        logger.error(f"❌ Fast Agent 背景啟動失敗: {e}")
-
-
 def start_virtual_interviewer():
     """啟動虛擬面試系統"""
     try:
@@ -88,7 +64,9 @@ def start_virtual_interviewer():
 
             # 檢查是否有 run.py
             if Path("run.py").exists():
-                subprocess.run([sys.executable, "run.py"], check=True)
+                subprocess.run(
+                    [sys.executable, "run.py", "--production"], check=True
+                )
             else:
                 logger.error("❌ virtual_interviewer/run.py 不存在")
         else:
@@ -97,38 +75,6 @@ def start_virtual_interviewer():
         logger.error(f"❌ 虛擬面試系統啟動失敗: {e}")
 
 
-def start_virtual_interviewer_background():
-    """在背景啟動虛擬面試系統"""
-    try:
-        logger.info("🎭 在背景啟動虛擬面試系統...")
-
-        def run_virtual_interviewer():
-            try:
-                import os
-                import subprocess
-
-                interviewer_path = Path("virtual_interviewer")
-                if interviewer_path.exists():
-                    os.chdir(interviewer_path)
-                    if Path("run.py").exists():
-                        subprocess.run([sys.executable, "run.py"], check=True)
-                    else:
-                        logger.error("❌ virtual_interviewer/run.py 不存在")
-                else:
-                    logger.error("❌ virtual_interviewer 目錄不存在")
-            except Exception as e:
-                logger.error(f"❌ 背景虛擬面試系統執行失敗: {e}")
-
-        interviewer_thread = threading.Thread(
-            target=run_virtual_interviewer, daemon=True
-        )
-        interviewer_thread.start()
-        logger.info("✅ 虛擬面試系統已在背景啟動")
-
-    except Exception as e:
-        logger.error(f"❌ 虛擬面試系統背景啟動失敗: {e}")
-
-
 def test_tools_modules():
     """測試 tools 模組"""
     try:
@@ -450,32 +396,19 @@ def test_database():
         logger.error(f"❌ 資料庫測試失敗: {e}")
 
 
-def start_integrated_system():
-    """啟動整合系統 - 所有組件同時運行"""
-    try:
-        logger.info("🚀 啟動整合智能面試系統...")
-
-        # 創建聊天介面
-        create_chat_interface()
-
-        # 測試 tools 模組
-        test_tools_modules()
+def start_integrated_system(http_port: int = 8080):
+    """啟動整合系統 - 由監管程序並行啟動所有組件並探測就緒"""
+    from start_integrated_system import run_integrated_system
 
-        # 在背景啟動 Fast Agent
-        start_fast_agent_background()
+    logger.info("🚀 啟動整合智能面試系統...")
 
-        # 在背景啟動虛擬面試系統
-        start_virtual_interviewer_background()
+    # 創建聊天介面
+    create_chat_interface()
 
-        # 等待一下讓背景服務啟動
-        time.sleep(3)
+    # 測試 tools 模組
+    test_tools_modules()
 
-        # 啟動 HTTP 包裝器作為主要介面
-        logger.info("🌐 啟動 HTTP 包裝器作為主要介面...")
-        start_http_wrapper()
-
-    except Exception as e:
-        logger.error(f"❌ 整合系統啟動失敗: {e}")
+    return run_integrated_system(http_port)
 
 
 def main():
@@ -508,22 +441,9 @@ def main():
         create_chat_interface()
         return
 
-    if args.mode == "integrated":
-        # 啟動整合系統
-        start_integrated_system()
-    elif args.mode == "all":
-        # 啟動所有組件
-        logger.info("🔄 啟動所有組件...")
-
-        # 創建聊天介面
-        create_chat_interface()
-
-        # 測試 tools 模組
-        test_tools_modules()
-
-        # 啟動 HTTP 包裝器
-        logger.info("🌐 啟動 HTTP 包裝器...")
-        start_http_wrapper()
+    if args.mode in ("integrated", "all"):
+        # 啟動所有組件，直到收到關閉訊號
+        sys.exit(start_integrated_system(args.port))
     elif args.mode == "http":
         create_chat_interface()
         start_http_wrapper()
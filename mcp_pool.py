@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+MCP 伺服器程序池
+維持 N 個已初始化的 server.py 子程序，工具呼叫分派到進行中請求最少的程序，
+程序異常結束時以退避時間重啟，並提供使用率統計
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from client import MCPStdioClient, MCP_REQUEST_TIMEOUT, RequestNotSentError
+
+logger = logging.getLogger(__name__)
+
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", str(os.cpu_count() or 2)))
+# 運行超過此秒數後才異常結束，視為新的一次失敗，退避時間重新計算
+STABLE_SECONDS = 60
+RESTART_BACKOFF_BASE = 1.0
+RESTART_BACKOFF_MAX = 30.0
+
+
+class PoolWorker:
+    """程序池中的一個 server.py 子程序與其統計"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.client: Optional[MCPStdioClient] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.calls = 0
+        self.errors = 0
+        self.ready = asyncio.Event()
+        # 有請求進行中的累計時間（使用率），以及目前忙碌的起始時間
+        self.busy_seconds = 0.0
+        self._busy_since: Optional[float] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.client is not None and self.client.alive
+
+    @property
+    def in_flight(self) -> int:
+        return self.client.in_flight if self.client is not None else 0
+
+    def begin(self):
+        if self._busy_since is None:
+            self._busy_since = time.monotonic()
+
+    def end(self, error: bool):
+        self.calls += 1
+        self.errors += int(error)
+        if self.in_flight == 0 and self._busy_since is not None:
+            self.busy_seconds += time.monotonic() - self._busy_since
+            self._busy_since = None
+
+    def busy_total(self) -> float:
+        if self._busy_since is None:
+            return self.busy_seconds
+        return self.busy_seconds + time.monotonic() - self._busy_since
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "pid": self.client.proc.pid if self.client is not None else None,
+            "alive": self.alive,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "errors": self.errors,
+            "restarts": self.restarts,
+            "busy_seconds": round(self.busy_total(), 3),
+        }
+
+
+class MCPServerPool:
+    """server.py 程序池：最少進行中請求優先分派，異常結束的程序自動重啟"""
+
+    def __init__(
+        self,
+        size: int = MCP_POOL_SIZE,
+        command: Optional[Sequence[str]] = None,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        request_timeout: float = MCP_REQUEST_TIMEOUT,
+    ):
+        self.size = max(1, size)
+        self.command = list(command) if command else None
+        self.cwd = cwd
+        self.env = env
+        self.request_timeout = request_timeout
+        self.workers: List[PoolWorker] = [PoolWorker(i) for i in range(self.size)]
+        self._monitors: List[asyncio.Task] = []
+        self._available = asyncio.Condition()
+        self._closing = False
+        self._started_at = 0.0
+        self._next = 0
+
+    async def start(self, startup_timeout: float = 60.0):
+        """並行啟動所有程序，至少一個完成初始化後返回"""
+        self._started_at = time.monotonic()
+        self._monitors = [
+            asyncio.create_task(self._supervise(worker)) for worker in self.workers
+        ]
+        ready = [asyncio.create_task(worker.ready.wait()) for worker in self.workers]
+        done, pending = await asyncio.wait(
+            ready, timeout=startup_timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in pending:
+            task.cancel()
+        if not done:
+            await self.close()
+            raise RuntimeError(
+                f"MCP 程序池未在 {startup_timeout:g} 秒內啟動任何程序"
+            )
+        logger.info(f"✅ MCP 程序池已啟動 ({self.size} 個程序)")
+
+    async def _spawn(self, worker: PoolWorker):
+        worker.client = await MCPStdioClient.spawn(
+            self.command,
+            cwd=self.cwd,
+            env=self.env,
+            request_timeout=self.request_timeout,
+        )
+        worker.started_at = time.monotonic()
+        worker.ready.set()
+        async with self._available:
+            self._available.notify_all()
+
+    async def _supervise(self, worker: PoolWorker):
+        """啟動程序並在程序結束或讀取中斷時以指數退避重啟"""
+        failures = 0
+        while not self._closing:
+            try:
+                await self._spawn(worker)
+                logger.info(
+                    f"🚀 MCP 程序 #{worker.index} 已就緒 (pid {worker.client.proc.pid})"
+                )
+                reason = await worker.client.wait_closed()
+                uptime = time.monotonic() - worker.started_at
+                if worker.client.proc.returncode is None and not self._closing:
+                    # 讀取任務中止但程序仍在運行，此程序已無法回應，終止後重啟
+                    logger.warning(
+                        f"⚠️ MCP 程序 #{worker.index} 讀取中斷 ({reason})，終止程序"
+                    )
+                    await worker.client.close(timeout=1.0)
+            except Exception as e:
+                reason, uptime = e, 0.0
+            worker.ready.clear()
+            if self._closing:
+                return
+
+            failures = 1 if uptime >= STABLE_SECONDS else failures + 1
+            delay = min(
+                RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** (failures - 1)
+            )
+            logger.warning(
+                f"⚠️ MCP 程序 #{worker.index} 已結束 ({reason})，"
+                f"運行 {uptime:.1f} 秒，{delay:.1f} 秒後重啟"
+            )
+            await asyncio.sleep(delay)
+            worker.restarts += 1
+
+    async def _acquire(self) -> PoolWorker:
+        """選出進行中請求最少的可用程序；全部不可用時等待重啟"""
+        async with self._available:
+            while True:
+                if self._closing:
+                    raise ConnectionError("MCP 程序池已關閉")
+                alive = [worker for worker in self.workers if worker.alive]
+                if alive:
+                    # 相同負載時輪流分派，避免總是落在第一個程序
+                    self._next += 1
+                    return min(
+                        alive,
+                        key=lambda w: (w.in_flight, (w.index - self._next) % self.size),
+                    )
+                await self._available.wait()
+
+    async def call_tool(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        timeout: Optional[float] = None,
+        idempotent: bool = False,
+    ) -> Dict[str, Any]:
+        """在負載最低的程序上呼叫工具；請求未送出時改由其他程序重試一次
+
+        已送出的請求可能已在伺服器執行（例如寫入作答紀錄），
+        只有呼叫端標記 idempotent=True 時才在程序中斷後重試
+        """
+        for attempt in range(2):
+            worker = await asyncio.wait_for(
+                self._acquire(),
+                timeout if timeout is not None else self.request_timeout,
+            )
+            worker.begin()
+            error = True
+            try:
+                result = await worker.client.call_tool(
+                    tool_name, arguments, timeout=timeout
+                )
+                error = False
+                return result
+            except ConnectionError as e:
+                if attempt or not (idempotent or isinstance(e, RequestNotSentError)):
+                    raise
+                logger.warning(f"⚠️ MCP 程序 #{worker.index} 中斷，改由其他程序重試")
+            finally:
+                worker.end(error)
+
+    def stats(self) -> Dict[str, Any]:
+        """程序池使用率統計"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        workers = [worker.snapshot() for worker in self.workers]
+        busy = sum(worker.busy_total() for worker in self.workers)
+        return {
+            "size": self.size,
+            "alive": sum(1 for worker in self.workers if worker.alive),
+            "in_flight": sum(worker.in_flight for worker in self.workers),
+            "calls": sum(worker.calls for worker in self.workers),
+            "errors": sum(worker.errors for worker in self.workers),
+            "restarts": sum(worker.restarts for worker in self.workers),
+            "utilization": round(busy / (elapsed * self.size), 3) if elapsed else 0.0,
+            "uptime_seconds": round(elapsed, 3),
+            "workers": workers,
+        }
+
+    async def close(self):
+        """停止重啟並關閉所有程序"""
+        self._closing = True
+        async with self._available:
+            self._available.notify_all()
+        for task in self._monitors:
+            task.cancel()
+        await asyncio.gather(
+            *(
+                worker.client.close()
+                for worker in self.workers
+                if worker.client is not None
+            ),
+            return_exceptions=True,
+        )
+        logger.info("👋 MCP 程序池已關閉")
+
+    async def __aenter__(self) -> "MCPServerPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+async def run_benchmark(size: int, calls: int, tool: str, arguments: Dict[str, Any]):
+    """在程序池上同時發出多個工具呼叫並顯示使用率"""
+    async with MCPServerPool(size=size, request_timeout=120) as pool:
+        await asyncio.gather(*(worker.ready.wait() for worker in pool.workers))
+        started = time.perf_counter()
+        await asyncio.gather(*(pool.call_tool(tool, arguments) for _ in range(calls)))
+        elapsed = time.perf_counter() - started
+        print(
+            f"🚀 {size} 個程序, {calls} 次呼叫, {calls / elapsed:.1f} 次/秒, "
+            f"耗時 {elapsed:.2f} 秒"
+        )
+        print(json.dumps(pool.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MCP 伺服器程序池負載測試")
+    parser.add_argument("--size", type=int, default=MCP_POOL_SIZE, help="程序數")
+    parser.add_argument("--calls", type=int, default=200, help="工具呼叫次數")
+    parser.add_argument(
+        "--tool", default="get_random_question", help="負載測試呼叫的工具"
+    )
+    parser.add_argument("--arguments", default="{}", help="工具參數（JSON）")
+    args = parser.parse_args()
+
+    arguments = json.loads(args.arguments)
+    asyncio.run(run_benchmark(args.size, args.calls, args.tool, arguments))
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+近似重複題目偵測
+以 MinHash 簽章與 LSH 分段找出不同 CSV 之間內容幾乎相同的題目，避免重複題目影響抽題與評分快取
+"""
+
+import hashlib
+import random
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+# 與題庫讀取相同的欄位名稱
+QUESTION_FIELDS = ["問題", "Question", "題目", "instruction", "question"]
+ANSWER_FIELDS = ["答案", "Answer", "answer", "output", "standard_answer"]
+
+# 重複題目處理方式
+POLICY_KEEP_ALL = "keep_all"  # 全部保留，只標記所屬的重複群組
+POLICY_KEEP_BEST = "keep_best"  # 每個群組只保留答案最完整的一題
+DEDUP_POLICIES = (POLICY_KEEP_ALL, POLICY_KEEP_BEST)
+
+# 64 個雜湊 = 16 段 × 每段 4 列，候選門檻約 (1/16)^(1/4) ≈ 0.5，
+# 再以實際 Jaccard 相似度確認，兼顧召回率與準確率
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = 4
+DEFAULT_THRESHOLD = 0.75
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_NUMBERING_PATTERN = re.compile(r"^\s*(?:q\s*)?\d+\s*[.)、:：]\s*")
+_TOKEN_PATTERN = re.compile(
+    r"[a-z0-9][a-z0-9+#]*|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]"
+)
+# 只去除不影響題意的英文虛詞，疑問詞（what/why/how）保留
+_STOPWORDS = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or",
+    "is", "are", "be", "do", "does", "you", "your", "can", "with",
+}  # fmt: skip
+
+
+def _field(record: Dict[str, Any], fields: List[str]) -> str:
+    for field in fields:
+        if record.get(field):
+            return str(record[field])
+    return ""
+
+
+def shingles(text: str) -> Set[int]:
+    """將題目正規化後切成單詞與相鄰詞對，並轉為穩定的 64 位元雜湊"""
+    text = _NUMBERING_PATTERN.sub("", text.lower())
+    tokens = [t for t in _TOKEN_PATTERN.findall(text) if t not in _STOPWORDS]
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), "little")
+        for g in grams
+    }
+
+
+class MinHasher:
+    """MinHash 簽章產生器（固定種子，每次匯入的簽章一致）"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, hashes: Set[int]) -> Tuple[int, ...]:
+        if not hashes:
+            return tuple(_MAX_HASH for _ in self.permutations)
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        )
+
+
+class _DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def _answer_quality(record: Dict[str, Any]) -> int:
+    """答案完整度：以答案長度衡量，沒有答案為 0"""
+    return len(_field(record, ANSWER_FIELDS).strip())
+
+
+def find_duplicate_groups(
+    records: List[Dict[str, Any]], threshold: float = DEFAULT_THRESHOLD
+) -> Tuple[List[List[int]], Dict[str, int]]:
+    """找出近似重複的題目群組，回傳 (群組索引列表, 統計)"""
+    hasher = MinHasher()
+    shingle_sets = [shingles(_field(record, QUESTION_FIELDS)) for record in records]
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for index, hashes in enumerate(shingle_sets):
+        if not hashes:
+            continue
+        signature = hasher.signature(hashes)
+        for band in range(LSH_BANDS):
+            key = (band, signature[band * LSH_ROWS : (band + 1) * LSH_ROWS])
+            buckets.setdefault(key, []).append(index)
+
+    # 只比對落在同一個桶中的候選，避免兩兩比較
+    candidates = set()
+    for members in buckets.values():
+        for i, first in enumerate(members):
+            for second in members[i + 1 :]:
+                candidates.add((first, second))
+
+    groups = _DisjointSet(len(records))
+    confirmed = 0
+    for first, second in candidates:
+        a, b = shingle_sets[first], shingle_sets[second]
+        if len(a & b) / len(a | b) >= threshold:
+            groups.union(first, second)
+            confirmed += 1
+
+    clusters: Dict[int, List[int]] = {}
+    for index in range(len(records)):
+        clusters.setdefault(groups.find(index), []).append(index)
+    duplicate_groups = [members for members in clusters.values() if len(members) > 1]
+    return duplicate_groups, {
+        "records": len(records),
+        "candidate_pairs": len(candidates),
+        "confirmed_pairs": confirmed,
+    }
+
+
+def deduplicate(
+    datasets: Dict[str, List[Dict[str, Any]]],
+    policy: str = POLICY_KEEP_ALL,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    跨集合偵測近似重複題目並依策略處理
+
+    每筆資料先配發匯入時使用的 _id，屬於重複群組的資料再加上 _canonical_id
+    （群組中答案最完整那題匯入後的「集合:_id」，與 question_id 格式相同）
+    與 _duplicate_count；keep_best 策略只保留該題。
+
+    Args:
+        datasets: {集合名稱: 資料列表}
+        policy: keep_all 或 keep_best
+        threshold: 判定為重複的 Jaccard 相似度門檻
+
+    Returns:
+        (處理後的資料, 報告)
+    """
+    if policy not in DEDUP_POLICIES:
+        raise ValueError(f"未知的重複題目處理方式: {policy}")
+
+    entries = [
+        (collection_name, record)
+        for collection_name, records in datasets.items()
+        for record in records
+    ]
+    # 依資料順序配發 _id（ObjectId 遞增），匯入後的 _id 與 _canonical_id 一致
+    for _, record in entries:
+        record.setdefault("_id", ObjectId())
+    groups, stats = find_duplicate_groups(
+        [record for _, record in entries], threshold
+    )
+
+    removed: Set[int] = set()
+    report_groups = []
+    for members in groups:
+        best = max(
+            members, key=lambda index: (_answer_quality(entries[index][1]), -index)
+        )
+        collection_name, record = entries[best]
+        canonical_id = f"{collection_name}:{record['_id']}"
+        for index in members:
+            entries[index][1]["_canonical_id"] = canonical_id
+            entries[index][1]["_duplicate_count"] = len(members)
+        if policy == POLICY_KEEP_BEST:
+            removed.update(index for index in members if index != best)
+        report_groups.append(
+            {
+                "canonical_id": canonical_id,
+                "question": _field(record, QUESTION_FIELDS),
+                "members": [
+                    {
+                        "collection": entries[index][0],
+                        "row_number": entries[index][1].get("_row_number"),
+                        "question": _field(entries[index][1], QUESTION_FIELDS),
+                        "kept": index not in removed,
+                    }
+                    for index in members
+                ],
+            }
+        )
+
+    result: Dict[str, List[Dict[str, Any]]] = {name: [] for name in datasets}
+    for index, (collection_name, record) in enumerate(entries):
+        if index not in removed:
+            result[collection_name].append(record)
+
+    report_groups.sort(key=lambda group: len(group["members"]), reverse=True)
+    report = {
+        **stats,
+        "policy": policy,
+        "threshold": threshold,
+        "duplicate_groups": len(groups),
+        "duplicate_records": sum(len(members) for members in groups),
+        "removed_records": len(removed),
+        "groups": report_groups,
+    }
+    return result, report
+
+
+def print_dedup_report(report: Dict[str, Any], max_groups: Optional[int] = 10):
+    """顯示重複題目報告"""
+    print("\n" + "=" * 50)
+    print("🔁 重複題目偵測")
+    print("=" * 50)
+    print(f"📄 題目總數: {report['records']}")
+    print(
+        f"🔍 候選配對: {report['candidate_pairs']}，確認重複: {report['confirmed_pairs']}"
+    )
+    print(
+        f"🧩 重複群組: {report['duplicate_groups']}（共 {report['duplicate_records']} 題）"
+    )
+    print(f"⚙️ 處理方式: {report['policy']}，移除 {report['removed_records']} 題")
+
+    for group in report["groups"][:max_groups]:
+        print(f"\n  ⭐ {group['canonical_id']}: {group['question'][:60]}")
+        for member in group["members"]:
+            mark = "✅" if member["kept"] else "🗑️"
+            print(
+                f"     {mark} {member['collection']}:{member['row_number']} "
+                f"{member['question'][:60]}"
+            )
+    print("=" * 50)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+面試評分帳本
+在評分當下記錄結構化的分數，並以增量方式維護統計，最終總結只需讀取已計算好的數值
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from session_store import SessionStore
+
+# 帳本只保留最近的評分明細，統計數值不受此限制
+MAX_RECENT_RECORDS = 20
+
+
+class ScoreRecord:
+    """單題評分記錄"""
+
+    __slots__ = (
+        "question_id",
+        "question",
+        "category",
+        "score",
+        "grade",
+        "latency_seconds",
+        "recorded_at",
+    )
+
+    def __init__(
+        self,
+        question_id: Optional[str],
+        question: str,
+        category: str,
+        score: float,
+        grade: Optional[str],
+        latency_seconds: float,
+    ):
+        self.question_id = question_id
+        self.question = question
+        self.category = category
+        self.score = score
+        self.grade = grade
+        self.latency_seconds = latency_seconds
+        self.recorded_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class InterviewScores:
+    """單一用戶本場面試的累計統計"""
+
+    def __init__(self):
+        self.version = 0  # 每次更新遞增，用於判斷預先生成的總結是否過期
+        self.questions_served = 0
+        self.answers_scored = 0
+        self.total_score = 0.0
+        self.min_score: Optional[float] = None
+        self.max_score: Optional[float] = None
+        self.total_latency = 0.0
+        self.category_totals: Dict[str, List[float]] = {}  # {類別: [題數, 總分]}
+        self.grade_counts: Dict[str, int] = {}
+        self.recent: List[ScoreRecord] = []
+        self.intro_content = ""
+        self.intro_analysis: Optional[str] = None
+
+    def add(self, record: ScoreRecord):
+        """加入一筆評分並更新統計（O(1)）"""
+        self.version += 1
+        self.answers_scored += 1
+        self.total_score += record.score
+        self.min_score = (
+            record.score if self.min_score is None else min(self.min_score, record.score)
+        )
+        self.max_score = (
+            record.score if self.max_score is None else max(self.max_score, record.score)
+        )
+        self.total_latency += record.latency_seconds
+
+        totals = self.category_totals.setdefault(record.category, [0, 0.0])
+        totals[0] += 1
+        totals[1] += record.score
+        if record.grade:
+            self.grade_counts[record.grade] = self.grade_counts.get(record.grade, 0) + 1
+
+        self.recent.append(record)
+        if len(self.recent) > MAX_RECENT_RECORDS:
+            del self.recent[0]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """回傳目前統計的快照"""
+        scored = self.answers_scored
+        return {
+            "version": self.version,
+            "questions_served": self.questions_served,
+            "answers_scored": scored,
+            "average_score": self.total_score / scored if scored else 0,
+            "min_score": self.min_score,
+            "max_score": self.max_score,
+            "average_latency_seconds": self.total_latency / scored if scored else 0,
+            "category_averages": {
+                category: total / count
+                for category, (count, total) in self.category_totals.items()
+            },
+            "grade_counts": dict(self.grade_counts),
+            "recent_records": [record.to_dict() for record in self.recent],
+            "intro_content": self.intro_content,
+            "intro_analysis": self.intro_analysis,
+        }
+
+
+class ScoreLedger:
+    """評分帳本 - 每位用戶一份累計統計，多執行緒安全"""
+
+    def __init__(self):
+        self._interviews = SessionStore()
+
+    def _with_interview(self, user_id: str, func):
+        """在用戶所屬的鎖內操作其統計"""
+        with self._interviews.lock_for(user_id):
+            interview = self._interviews.get(user_id)
+            if interview is None:
+                interview = InterviewScores()
+                self._interviews.set(user_id, interview)
+            return func(interview)
+
+    def record_question(self, user_id: str):
+        """記錄已出題一次"""
+
+        def apply(interview):
+            interview.version += 1
+            interview.questions_served += 1
+
+        self._with_interview(user_id, apply)
+
+    def record_score(
+        self,
+        user_id: str,
+        score: float,
+        question_id: Optional[str] = None,
+        question: str = "",
+        category: Optional[str] = None,
+        grade: Optional[str] = None,
+        latency_seconds: float = 0.0,
+    ) -> ScoreRecord:
+        """在評分當下記錄一筆分數"""
+        record = ScoreRecord(
+            question_id,
+            question,
+            category or "一般問題",
+            float(score),
+            grade,
+            latency_seconds,
+        )
+        self._with_interview(user_id, lambda interview: interview.add(record))
+        return record
+
+    def record_intro(
+        self, user_id: str, intro_content: str, intro_analysis: Optional[str]
+    ):
+        """記錄自我介紹內容與分析結果"""
+
+        def apply(interview):
+            interview.version += 1
+            interview.intro_content = intro_content
+            interview.intro_analysis = intro_analysis
+
+        self._with_interview(user_id, apply)
+
+    def snapshot(self, user_id: str) -> Dict[str, Any]:
+        """取得用戶本場面試的統計快照"""
+        return self._with_interview(user_id, lambda interview: interview.snapshot())
+
+    def reset(self, user_id: str):
+        """清除用戶的統計（重新開始面試時）"""
+        self._interviews.pop(user_id)
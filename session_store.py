@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+執行緒安全的會話狀態容器
+以分段鎖（lock striping）保護每位用戶的狀態，避免多執行緒下的遺失更新
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Tuple
+
+_MISSING = object()
+
+
+class SessionStore:
+    """分段鎖會話容器 - 不同用戶落在不同鎖上，可隨執行緒數擴展"""
+
+    def __init__(self, stripes: int = 64):
+        if stripes <= 0:
+            raise ValueError("stripes 必須大於 0")
+        self._stripes = stripes
+        self._locks = [threading.RLock() for _ in range(stripes)]
+        self._buckets: List[Dict[Hashable, Any]] = [{} for _ in range(stripes)]
+
+    def _index(self, key: Hashable) -> int:
+        return hash(key) % self._stripes
+
+    def lock_for(self, key: Hashable) -> threading.RLock:
+        """取得某個用戶所屬的鎖，用於需要跨多個操作保持一致的情況"""
+        return self._locks[self._index(key)]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """讀取值"""
+        index = self._index(key)
+        with self._locks[index]:
+            return self._buckets[index].get(key, default)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """寫入值"""
+        index = self._index(key)
+        with self._locks[index]:
+            self._buckets[index][key] = value
+
+    def setdefault(self, key: Hashable, default: Any) -> Any:
+        """不存在時寫入預設值，並回傳目前的值"""
+        index = self._index(key)
+        with self._locks[index]:
+            return self._buckets[index].setdefault(key, default)
+
+    def compare_and_set(self, key: Hashable, expected: Any, new: Any) -> bool:
+        """只有在目前值等於 expected 時才寫入 new（CAS）"""
+        index = self._index(key)
+        with self._locks[index]:
+            bucket = self._buckets[index]
+            if bucket.get(key, _MISSING) != expected:
+                return False
+            bucket[key] = new
+            return True
+
+    def update(
+        self, key: Hashable, func: Callable[[Any], Any], default: Any = None
+    ) -> Any:
+        """在鎖內以 func(目前值) 的結果取代目前值，並回傳新值"""
+        index = self._index(key)
+        with self._locks[index]:
+            bucket = self._buckets[index]
+            value = func(bucket.get(key, default))
+            bucket[key] = value
+            return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """移除並回傳值"""
+        index = self._index(key)
+        with self._locks[index]:
+            return self._buckets[index].pop(key, default)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """回傳所有項目的快照"""
+        snapshot = []
+        for lock, bucket in zip(self._locks, self._buckets):
+            with lock:
+                snapshot.extend(bucket.items())
+        return snapshot
+
+    def keys(self) -> List[Hashable]:
+        """回傳所有鍵的快照"""
+        return [key for key, _ in self.items()]
+
+    def clear(self) -> None:
+        """清空所有項目"""
+        for lock, bucket in zip(self._locks, self._buckets):
+            with lock:
+                bucket.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        index = self._index(key)
+        with self._locks[index]:
+            return key in self._buckets[index]
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.keys())
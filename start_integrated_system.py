@@ -1,18 +1,16 @@
 #!/usr/bin/env python3
 """
 整合智能面試系統啟動腳本
-同時啟動 Fast Agent、virtual_interviewer 和 HTTP 包裝器
+同時啟動 Fast Agent、virtual_interviewer 和 HTTP 包裝器（由 supervisor 監管）
 """
 
-import asyncio
 import logging
 import os
-import subprocess
 import sys
-import threading
-import time
 from pathlib import Path
 
+from supervisor import AliveProbe, Component, HTTPProbe, Supervisor
+
 # 設定日誌
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -20,67 +18,39 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def start_fast_agent_background():
-    """在背景啟動 Fast Agent"""
-    try:
-        logger.info("🤖 在背景啟動 Fast Agent...")
-
-        def run_fast_agent():
-            try:
-                # 導入並運行 Fast Agent
-                from fast_agent_interview import main as fast_agent_main
-
-                asyncio.run(fast_agent_main())
-            except Exception as e:
-                logger.error(f"❌ 背景 Fast Agent 執行失敗: {e}")
-
-        fast_agent_thread = threading.Thread(target=run_fast_agent, daemon=True)
-        fast_agent_thread.start()
-        logger.info("✅ Fast Agent 已在背景啟動")
-
-    except Exception as e:
-        logger.error(f"❌ Fast Agent 背景啟動失敗: {e}")
-
-
-def start_virtual_interviewer_background():
-    """在背景啟動虛擬面試系統"""
-    try:
-        logger.info("🎭 在背景啟動虛擬面試系統...")
-
-        def run_virtual_interviewer():
-            try:
-                # 切換到 virtual_interviewer 目錄
-                interviewer_path = Path("virtual_interviewer")
-                if interviewer_path.exists():
-                    os.chdir(interviewer_path)
-                    if Path("run.py").exists():
-                        subprocess.run([sys.executable, "run.py"], check=True)
-                    else:
-                        logger.error("❌ virtual_interviewer/run.py 不存在")
-                else:
-                    logger.error("❌ virtual_interviewer 目錄不存在")
-            except Exception as e:
-                logger.error(f"❌ 背景虛擬面試系統執行失敗: {e}")
-
-        interviewer_thread = threading.Thread(
-            target=run_virtual_interviewer, daemon=True
-        )
-        interviewer_thread.start()
-        logger.info("✅ 虛擬面試系統已在背景啟動")
-
-    except Exception as e:
-        logger.error(f"❌ 虛擬面試系統背景啟動失敗: {e}")
-
-
-def start_http_wrapper():
-    """啟動 HTTP 包裝器"""
-    try:
-        from http_wrapper import main as http_main
-
-        logger.info("🌐 啟動 HTTP 包裝器...")
-        http_main()
-    except Exception as e:
-        logger.error(f"❌ HTTP 包裝器啟動失敗: {e}")
+def build_components(http_port: int = 8080):
+    """整合系統的各組件與就緒探測"""
+    base_dir = Path(__file__).parent
+    bind = os.environ.get("INTERVIEWER_BIND", "0.0.0.0:5000")
+    interviewer_port = bind.rpartition(":")[2]
+    return [
+        Component(
+            "virtual_interviewer",
+            [sys.executable, "run.py", "--production"],
+            HTTPProbe(f"http://127.0.0.1:{interviewer_port}/"),
+            cwd=str(base_dir / "virtual_interviewer"),
+        ),
+        Component(
+            "http_wrapper",
+            [sys.executable, "http_wrapper.py", "--port", str(http_port)],
+            HTTPProbe(f"http://127.0.0.1:{http_port}/"),
+            cwd=str(base_dir),
+        ),
+        # Fast Agent 是終端機互動介面，沒有可探測的端點
+        Component(
+            "fast_agent",
+            [sys.executable, "fast_agent_interview.py"],
+            AliveProbe(3.0),
+            cwd=str(base_dir),
+            max_restarts=2,
+            interactive=True,
+        ),
+    ]
+
+
+def run_integrated_system(http_port: int = 8080) -> int:
+    """以監管程序並行啟動所有組件，直到收到關閉訊號，回傳結束碼"""
+    return Supervisor(build_components(http_port)).run()
 
 
 def test_tools_modules():
@@ -262,6 +232,11 @@ def create_chat_interface():
         const status = document.getElementById('status');
         const loading = document.getElementById('loading');
 
+        // 每個分頁各自的面試會話，避免不同使用者共用同一題目
+        const sessionId = sessionStorage.getItem('interviewSessionId')
+            || `web-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+        sessionStorage.setItem('interviewSessionId', sessionId);
+
         function addMessage(message, isUser = false) {
             const messageDiv = document.createElement('div');
             messageDiv.className = `message ${isUser ? 'user-message' : 'bot-message'}`;
@@ -304,7 +279,11 @@ def create_chat_interface():
                             headers: {
                                 'Content-Type': 'application/json',
                             },
-                            body: JSON.stringify({ message: message })
+                            body: JSON.stringify({
+                                message: message,
+                                session_id: sessionId,
+                                user_id: sessionId
+                            })
                         });
 
                         if (res.ok) {
@@ -403,19 +382,8 @@ def main():
     # 測試 tools 模組
     test_tools_modules()
 
-    # 在背景啟動 Fast Agent
-    start_fast_agent_background()
-
-    # 在背景啟動虛擬面試系統
-    start_virtual_interviewer_background()
-
-    # 等待一下讓背景服務啟動
-    logger.info("⏳ 等待背景服務啟動...")
-    time.sleep(5)
-
-    # 啟動 HTTP 包裝器作為主要介面
-    logger.info("🌐 啟動 HTTP 包裝器作為主要介面...")
-    start_http_wrapper()
+    # 並行啟動各組件，全部就緒後持續監管
+    sys.exit(run_integrated_system())
 
 
 if __name__ == "__main__":
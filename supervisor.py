@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+子程序監管模組
+並行啟動各系統組件，以 HTTP 或輸出內容探測是否就緒，異常結束時依退避時間重啟，並轉送關閉訊號
+"""
+
+import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 探測間隔（秒）
+PROBE_INTERVAL = 0.2
+# 運行超過此秒數後才異常結束，視為新的一次失敗，退避時間重新計算
+STABLE_SECONDS = 60
+# 關閉時等待子程序結束的秒數，逾時後強制終止
+SHUTDOWN_GRACE = float(os.environ.get("SUPERVISOR_SHUTDOWN_GRACE", "30"))
+
+
+class HTTPProbe:
+    """HTTP 就緒探測：伺服器回應任何非 5xx 狀態即視為就緒"""
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, component: "Component") -> bool:
+        try:
+            with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+                return response.status < 500
+        except urllib.error.HTTPError as e:
+            return e.code < 500
+        except (OSError, ValueError):
+            return False
+
+    def describe(self) -> str:
+        return self.url
+
+
+class OutputProbe:
+    """stdio 就緒探測：子程序輸出符合指定樣式的一行即視為就緒"""
+
+    def __init__(self, pattern: str):
+        self.pattern = re.compile(pattern)
+
+    def __call__(self, component: "Component") -> bool:
+        return component.output_matched(self.pattern)
+
+    def describe(self) -> str:
+        return f"輸出符合 /{self.pattern.pattern}/"
+
+
+class AliveProbe:
+    """沒有可探測介面的組件：啟動後持續運行指定秒數即視為就緒"""
+
+    def __init__(self, seconds: float = 2.0):
+        self.seconds = seconds
+
+    def __call__(self, component: "Component") -> bool:
+        return component.uptime() >= self.seconds
+
+    def describe(self) -> str:
+        return f"持續運行 {self.seconds:g} 秒"
+
+
+class Component:
+    """一個受監管的子程序"""
+
+    def __init__(
+        self,
+        name: str,
+        command: Sequence[str],
+        probe,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        startup_timeout: float = 60.0,
+        restart: bool = True,
+        max_restarts: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        interactive: bool = False,
+    ):
+        self.name = name
+        self.command = list(command)
+        self.probe = probe
+        self.cwd = cwd
+        self.env = env
+        self.startup_timeout = startup_timeout
+        self.restart = restart
+        self.max_restarts = max_restarts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # 互動式組件沿用終端機的標準輸入輸出，不經過監管程序轉送
+        self.interactive = interactive
+
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.ready = threading.Event()
+        self.startup_seconds: Optional[float] = None
+        self.restarts = 0
+        self.failed = False
+        # 互動式組件由使用者正常結束（exit 0），不再重啟
+        self.finished = False
+        self._lines: List[str] = []
+        self._lines_lock = threading.Lock()
+
+    def uptime(self) -> float:
+        if self.process is None or self.process.poll() is not None:
+            return 0.0
+        return time.monotonic() - self.started_at
+
+    def output_matched(self, pattern) -> bool:
+        with self._lines_lock:
+            return any(pattern.search(line) for line in self._lines)
+
+    def spawn(self):
+        """啟動子程序（獨立的程序群組，關閉訊號由監管程序轉送）"""
+        with self._lines_lock:
+            self._lines = []
+        self.ready.clear()
+        environment = dict(os.environ, PYTHONUNBUFFERED="1", **(self.env or {}))
+        pipe = None if self.interactive else subprocess.PIPE
+        self.process = subprocess.Popen(
+            self.command,
+            cwd=self.cwd,
+            env=environment,
+            stdin=None if self.interactive else subprocess.DEVNULL,
+            stdout=pipe,
+            stderr=None if self.interactive else subprocess.STDOUT,
+            start_new_session=os.name == "posix",
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        self.started_at = time.monotonic()
+        if not self.interactive:
+            threading.Thread(
+                target=self._pump_output,
+                args=(self.process,),
+                name=f"{self.name}-output",
+                daemon=True,
+            ).start()
+
+    def _pump_output(self, process: subprocess.Popen):
+        """轉送子程序輸出，並保留就緒前的輸出供 stdio 探測比對"""
+        for line in process.stdout:
+            if not self.ready.is_set():
+                with self._lines_lock:
+                    self._lines.append(line)
+            sys.stdout.write(f"[{self.name}] {line}")
+            sys.stdout.flush()
+
+    def send_signal(self, signum: int):
+        """送出訊號給整個程序群組（Gunicorn 等會再轉送給各自的工作程序）"""
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signum)
+            elif signum in (signal.SIGTERM, signal.SIGINT):
+                process.terminate()
+        except ProcessLookupError:
+            pass
+
+
+class Supervisor:
+    """並行啟動組件、探測就緒、異常重啟與關閉"""
+
+    def __init__(self, components: List[Component]):
+        self.components = components
+        # 收到關閉訊號（由訊號處理器設定）與開始關閉子程序
+        self._stop_requested = threading.Event()
+        self._stopping = threading.Event()
+        self._monitors: List[threading.Thread] = []
+
+    def start(self) -> bool:
+        """並行啟動所有組件，等待全部就緒或逾時，回傳是否全部就緒"""
+        started = time.monotonic()
+        for component in self.components:
+            monitor = threading.Thread(
+                target=self._supervise,
+                args=(component,),
+                name=f"supervise-{component.name}",
+                daemon=True,
+            )
+            monitor.start()
+            self._monitors.append(monitor)
+
+        # 冷啟動時間取決於最慢的組件；已放棄重啟的組件不再等待
+        while not self._stop_requested.is_set():
+            elapsed = time.monotonic() - started
+            pending = [
+                component
+                for component in self.components
+                if not component.ready.is_set()
+                and not component.failed
+                and elapsed < component.startup_timeout
+            ]
+            if not pending:
+                break
+            self._stop_requested.wait(PROBE_INTERVAL)
+
+        self.report(time.monotonic() - started)
+        return all(component.ready.is_set() for component in self.components)
+
+    def _supervise(self, component: Component):
+        """啟動組件並在異常結束時以指數退避重啟；互動式組件正常結束時不重啟"""
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                component.spawn()
+            except OSError as e:
+                logger.error(f"❌ {component.name} 無法啟動: {e}")
+                component.failed = True
+                return
+            if self._stopping.is_set():
+                # 啟動期間收到關閉要求
+                component.send_signal(signal.SIGTERM)
+            logger.info(
+                f"🚀 {component.name} 已啟動 (pid {component.process.pid})，"
+                f"等待就緒: {component.probe.describe()}"
+            )
+            self._wait_ready(component)
+            exit_code = component.process.wait()
+            if self._stopping.is_set():
+                return
+
+            uptime = time.monotonic() - component.started_at
+            if exit_code == 0 and component.interactive:
+                logger.info(f"👋 {component.name} 已正常結束，運行 {uptime:.1f} 秒，不重啟")
+                component.finished = True
+                return
+            failures = 1 if uptime >= STABLE_SECONDS else failures + 1
+            logger.warning(
+                f"⚠️ {component.name} 已結束 (exit {exit_code})，運行 {uptime:.1f} 秒"
+            )
+            if not component.restart or failures > component.max_restarts:
+                logger.error(f"❌ {component.name} 連續失敗 {failures} 次，停止重啟")
+                component.failed = True
+                return
+
+            delay = min(
+                component.backoff_max, component.backoff_base * 2 ** (failures - 1)
+            )
+            logger.info(f"🔁 {delay:.1f} 秒後重啟 {component.name}")
+            if self._stopping.wait(delay):
+                return
+            component.restarts += 1
+
+    def _wait_ready(self, component: Component):
+        """輪詢就緒探測，直到就緒、逾時或子程序結束"""
+        deadline = component.started_at + component.startup_timeout
+        while not self._stopping.is_set() and component.process.poll() is None:
+            if component.probe(component):
+                elapsed = time.monotonic() - component.started_at
+                if component.startup_seconds is None:
+                    component.startup_seconds = elapsed
+                component.ready.set()
+                logger.info(f"✅ {component.name} 已就緒 ({elapsed:.2f} 秒)")
+                return
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    f"⚠️ {component.name} 未在 {component.startup_timeout:g} 秒內就緒"
+                )
+                return
+            time.sleep(PROBE_INTERVAL)
+
+    def report(self, elapsed: float):
+        """顯示各組件的啟動時間"""
+        logger.info("=" * 50)
+        logger.info(f"📊 啟動完成，耗時 {elapsed:.2f} 秒")
+        for component in self.components:
+            if component.ready.is_set():
+                status = f"✅ 就緒 {component.startup_seconds:.2f} 秒"
+            elif component.failed:
+                status = "❌ 啟動失敗"
+            else:
+                status = "⏳ 尚未就緒"
+            logger.info(f"  {component.name}: {status}，重啟 {component.restarts} 次")
+        logger.info("=" * 50)
+
+    def stop(self, grace: float = SHUTDOWN_GRACE):
+        """轉送 SIGTERM 給所有組件，逾時後強制終止"""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        logger.info("🛑 正在關閉所有組件...")
+        for component in self.components:
+            component.send_signal(signal.SIGTERM)
+
+        deadline = time.monotonic() + grace
+        for component in self.components:
+            process = component.process
+            if process is None:
+                continue
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning(f"⚠️ {component.name} 未在時限內結束，強制終止")
+                component.send_signal(getattr(signal, "SIGKILL", signal.SIGTERM))
+                process.wait()
+        logger.info("👋 所有組件已關閉")
+
+    def run(self) -> int:
+        """啟動並持續監管，直到收到 SIGINT/SIGTERM，回傳結束碼"""
+
+        def request_stop(signum, frame):
+            self._stop_requested.set()
+
+        def forward(signum, frame):
+            # SIGHUP 轉送給各組件（例如 Gunicorn 平滑重載）
+            for component in self.components:
+                component.send_signal(signum)
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, forward)
+
+        try:
+            self.start()
+            while not self._stop_requested.wait(1.0):
+                if all(
+                    component.failed or component.finished
+                    for component in self.components
+                ):
+                    logger.error("❌ 所有組件都已停止")
+                    break
+        finally:
+            self.stop()
+        return 1 if any(component.failed for component in self.components) else 0
@@ -0,0 +1,54 @@
+"""面試狀態轉換的併發測試"""
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from check_user_state import stress_transitions
+from virtual_interviewer.app import INTERVIEW_FLOW, InterviewAPI, InterviewState
+
+
+class InterferingAPI(InterviewAPI):
+    """每次讀取狀態時，另一個執行緒（模擬同一用戶的併發請求）立即改寫狀態"""
+
+    def __init__(self, interfering_states):
+        super().__init__()
+        self._interfering_states = iter(interfering_states)
+        self.writers = []
+
+    def _get_user_state(self, user_id):
+        state = super()._get_user_state(user_id)
+        next_state = next(self._interfering_states, None)
+        if next_state is not None:
+            writer = threading.Thread(
+                target=self._set_user_state, args=(user_id, next_state)
+            )
+            writer.start()
+            # 持有用戶鎖時寫入會被擋住，只等待一小段時間
+            writer.join(0.05)
+            self.writers.append(writer)
+        return state
+
+
+def test_stress_transitions_have_no_lost_updates():
+    assert stress_transitions(threads=8, rounds=100)
+
+
+def test_restart_is_not_lost_under_contention():
+    user_id = "contended_user"
+    api = InterferingAPI(
+        [InterviewState.INTRO, InterviewState.QUESTIONING, InterviewState.INTRO]
+    )
+    InterviewAPI.session_states.set(user_id, InterviewState.QUESTIONING)
+
+    from_state, transition = INTERVIEW_FLOW.advance(api, user_id, "重新開始")
+    for writer in api.writers:
+        writer.join()
+
+    # 狀態在判斷與寫入之間被改寫時，「重新開始」仍依讀到的狀態完成轉換
+    assert from_state == InterviewState.QUESTIONING
+    assert transition is INTERVIEW_FLOW.match(from_state, "重新開始")
+    assert transition.target == InterviewState.WAITING
+
@@ -9,12 +9,16 @@ from .database import DatabaseManager, db_manager
 from .interactive_interview import InteractiveInterview
 from .interview_session import InterviewSession, interview_session
 from .question_manager import QuestionManager, question_manager
+from .question_sampler import QuestionSampler, question_sampler
+from .question_search import QuestionSearchIndex, question_search
 from .ui_manager import UIManager, ui_manager
 
 __all__ = [
     # 類別
     "DatabaseManager",
     "QuestionManager",
+    "QuestionSampler",
+    "QuestionSearchIndex",
     "AnswerAnalyzer",
     "InterviewSession",
     "UIManager",
@@ -22,6 +26,8 @@ __all__ = [
     # 實例
     "db_manager",
     "question_manager",
+    "question_sampler",
+    "question_search",
     "answer_analyzer",
     "interview_session",
     "ui_manager",
@@ -4,9 +4,11 @@ AI 智能答案分析模組
 使用 OpenAI 來分析用戶回答與標準答案的差異
 """
 
+import asyncio
 import logging
 import os
-from typing import Any, Dict
+import weakref
+from typing import Any, Dict, List
 
 from dotenv import load_dotenv
 
@@ -15,7 +17,7 @@ load_dotenv()
 
 try:
     import openai
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
 except ImportError:
     print("請安裝 openai 套件: pip install openai")
     exit(1)
@@ -32,9 +34,60 @@ class AIAnswerAnalyzer:
         if not api_key:
             raise ValueError("請在 .env 檔案中設定 OPENAI_API_KEY")
 
+        self.api_key = api_key
         self.client = OpenAI(api_key=api_key)
+        # {事件迴圈: AsyncOpenAI}，迴圈結束後自動移除
+        self._async_clients = weakref.WeakKeyDictionary()
         self.grade_thresholds = {"優秀": 80, "良好": 60, "一般": 40, "需要改進": 0}
 
+    def _async_client(self) -> AsyncOpenAI:
+        """取得目前事件迴圈專用的非同步客戶端（連線池綁定於建立時的事件迴圈）"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = AsyncOpenAI(api_key=self.api_key)
+        return client
+
+    def _build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """組合系統提示與分析提示"""
+        return [
+            {
+                "role": "system",
+                "content": "您是一個專業的面試評分專家，負責分析求職者的回答。請根據以下標準進行評分：\n"
+                "1. 內容準確性（40%）：回答是否涵蓋了問題的核心要點\n"
+                "2. 表達清晰度（30%）：回答是否清楚易懂\n"
+                "3. 邏輯結構（20%）：回答是否有良好的邏輯結構\n"
+                "4. 完整性（10%）：回答是否完整\n\n"
+                "請嚴格按照以下 JSON 格式返回結果，不要添加任何其他文字：\n"
+                "{\n"
+                '  "score": 85,\n'
+                '  "grade": "良好",\n'
+                '  "similarity": 0.85,\n'
+                '  "feedback": "您的回答基本正確，涵蓋了核心要點",\n'
+                '  "differences": ["缺少一些技術細節"],\n'
+                '  "strengths": ["表達清晰", "邏輯合理"],\n'
+                '  "suggestions": ["可以添加更多技術細節"]\n'
+                "}",
+            },
+            {"role": "user", "content": prompt},
+        ]
+
+    def _complete_analysis(
+        self, response, user_answer: str, standard_answer: str, question: str
+    ) -> Dict[str, Any]:
+        """解析 AI 回應並添加額外資訊"""
+        ai_response = response.choices[0].message.content
+        analysis_result = self._parse_ai_response(ai_response)
+        analysis_result.update(
+            {
+                "user_answer": user_answer,
+                "standard_answer": standard_answer,
+                "question": question,
+                "analysis_method": "AI",
+            }
+        )
+        return analysis_result
+
     def analyze_answer(
         self, user_answer: str, standard_answer: str, question: str = ""
     ) -> Dict[str, Any]:
@@ -47,52 +100,39 @@ class AIAnswerAnalyzer:
             # 調用 OpenAI API
             response = self.client.chat.completions.create(
                 model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "您是一個專業的面試評分專家，負責分析求職者的回答。請根據以下標準進行評分：\n"
-                        "1. 內容準確性（40%）：回答是否涵蓋了問題的核心要點\n"
-                        "2. 表達清晰度（30%）：回答是否清楚易懂\n"
-                        "3. 邏輯結構（20%）：回答是否有良好的邏輯結構\n"
-                        "4. 完整性（10%）：回答是否完整\n\n"
-                        "請嚴格按照以下 JSON 格式返回結果，不要添加任何其他文字：\n"
-                        "{\n"
-                        '  "score": 85,\n'
-                        '  "grade": "良好",\n'
-                        '  "similarity": 0.85,\n'
-                        '  "feedback": "您的回答基本正確，涵蓋了核心要點",\n'
-                        '  "differences": ["缺少一些技術細節"],\n'
-                        '  "strengths": ["表達清晰", "邏輯合理"],\n'
-                        '  "suggestions": ["可以添加更多技術細節"]\n'
-                        "}",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+                messages=self._build_messages(prompt),
                 temperature=0.3,
                 max_tokens=1000,
             )
-
-            # 解析 AI 回應
-            ai_response = response.choices[0].message.content
-            analysis_result = self._parse_ai_response(ai_response)
-
-            # 添加額外資訊
-            analysis_result.update(
-                {
-                    "user_answer": user_answer,
-                    "standard_answer": standard_answer,
-                    "question": question,
-                    "analysis_method": "AI",
-                }
+            return self._complete_analysis(
+                response, user_answer, standard_answer, question
             )
 
-            return analysis_result
-
         except Exception as e:
             logger.error(f"AI 分析失敗: {e}")
             # 回退到傳統方法
             return self._fallback_analysis(user_answer, standard_answer)
 
+    async def analyze_answer_async(
+        self, user_answer: str, standard_answer: str, question: str = ""
+    ) -> Dict[str, Any]:
+        """analyze_answer 的非同步版本，等待 AI 回應時不佔用執行緒"""
+        try:
+            prompt = self._build_analysis_prompt(user_answer, standard_answer, question)
+            response = await self._async_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=self._build_messages(prompt),
+                temperature=0.3,
+                max_tokens=1000,
+            )
+            return self._complete_analysis(
+                response, user_answer, standard_answer, question
+            )
+
+        except Exception as e:
+            logger.error(f"AI 分析失敗: {e}")
+            return self._fallback_analysis(user_answer, standard_answer)
+
     def _build_analysis_prompt(
         self, user_answer: str, standard_answer: str, question: str
     ) -> str:
@@ -46,6 +46,20 @@ class AnswerAnalyzer:
         # 使用傳統方法
         return self._traditional_analysis(user_answer, standard_answer)
 
+    async def analyze_answer_async(
+        self, user_answer: str, standard_answer: str, question: str = ""
+    ) -> Dict[str, Any]:
+        """analyze_answer 的非同步版本（傳統方法為純計算，直接在事件迴圈執行）"""
+        if self.use_ai and self.ai_analyzer:
+            try:
+                return await self.ai_analyzer.analyze_answer_async(
+                    user_answer, standard_answer, question
+                )
+            except Exception as e:
+                logger.warning(f"AI 分析失敗，回退到傳統方法: {e}")
+
+        return self._traditional_analysis(user_answer, standard_answer)
+
     def _traditional_analysis(
         self, user_answer: str, standard_answer: str
     ) -> Dict[str, Any]:
@@ -43,12 +43,16 @@ class DatabaseManager:
             return False
 
     def get_collections(self) -> list:
-        """獲取所有集合名稱"""
+        """獲取所有題庫集合名稱（底線開頭的內部集合除外）"""
         if self.db is None:
             return []
 
         try:
-            return self.db.list_collection_names()
+            return [
+                name
+                for name in self.db.list_collection_names()
+                if not name.startswith("_")
+            ]
         except Exception as e:
             logger.error(f"獲取集合失敗: {e}")
             return []
@@ -6,12 +6,16 @@
 
 import logging
 import random
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from .database import db_manager
+from .question_sampler import question_sampler
 
 logger = logging.getLogger(__name__)
 
+# assess_difficulty 可能回傳的難度
+DIFFICULTY_LEVELS = ("簡單", "中等", "困難")
+
 
 class QuestionManager:
     """問題管理器"""
@@ -23,8 +27,16 @@ class QuestionManager:
             "source": "預設問題",
         }
 
-    def get_random_question(self) -> Dict[str, Any]:
-        """獲取隨機面試問題"""
+    def get_random_question(
+        self,
+        user_id: Optional[str] = None,
+        category: Optional[str] = None,
+        mark_seen: bool = True,
+    ) -> Dict[str, Any]:
+        """獲取隨機面試問題；指定用戶時不重複出題，指定類別時只從對應集合抽題
+
+        mark_seen=False 時不記錄為用戶已出過的題目，由呼叫端出題後呼叫 mark_question_seen
+        """
         # 嘗試連接資料庫
         if not db_manager.connect():
             logger.warning("無法連接資料庫，使用預設問題")
@@ -38,45 +50,137 @@ class QuestionManager:
                 logger.warning("MongoDB 中沒有找到面試資料集合")
                 return self.default_question
 
-            # 隨機選擇一個集合
-            random_collection_name = random.choice(collections)
-            logger.info(f"選擇集合: {random_collection_name}")
-
-            # 獲取隨機文檔
-            random_doc = db_manager.get_random_document(random_collection_name)
+            collections = self._resolve_collections(collections, category)
 
-            if not random_doc:
-                logger.warning(f"無法從集合 {random_collection_name} 獲取隨機文檔")
-                return self.default_question
+            if user_id:
+                # 依用戶的已出題位元圖不放回抽題
+                drawn = question_sampler.draw(user_id, collections, mark=mark_seen)
+                if not drawn:
+                    logger.warning(f"無法為用戶 {user_id} 抽出題目")
+                    return self.default_question
+                collection_name, random_doc = drawn
+            else:
+                # 隨機選擇一個集合
+                collection_name = random.choice(collections)
+                logger.info(f"選擇集合: {collection_name}")
 
-            # 提取問題和答案
-            question = self._extract_question(random_doc)
-            answer = self._extract_answer(random_doc)
+                # 獲取隨機文檔
+                random_doc = db_manager.get_random_document(collection_name)
 
-            logger.info(f"從集合 {random_collection_name} 獲取隨機問題")
+                if not random_doc:
+                    logger.warning(f"無法從集合 {collection_name} 獲取隨機文檔")
+                    return self.default_question
 
-            return {
-                "question": question,
-                "standard_answer": answer if answer else "（請根據您的經驗回答）",
-                "source": random_collection_name,
-                "source_file": random_doc.get("_source_file", "未知"),
-                "raw_data": random_doc,  # 保留原始資料供調試
-            }
+            logger.info(f"從集合 {collection_name} 獲取隨機問題")
+            return self._build_question(collection_name, random_doc)
 
         except Exception as e:
             logger.error(f"獲取隨機問題時發生錯誤: {e}")
             return self.default_question
 
-    def get_question_by_category(self, category: str) -> Dict[str, Any]:
-        """按類別獲取問題"""
-        # 這裡可以實現按類別篩選的邏輯
-        return self.get_random_question()
+    def get_random_questions(
+        self,
+        n: int,
+        category: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        exclude_ids: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """一次抽出 n 題互不重複的問題（單次抽樣），可限定類別、難度並排除指定 question_id
+
+        category 為題庫集合名稱或其前綴（例如 data_science），不是回傳題目的 category 欄位。
+        題組不以預設問題充數：資料庫無法使用、類別沒有對應集合或抽題失敗時拋出例外，
+        由呼叫端回報錯誤
+        """
+        if n <= 0:
+            return []
+        if difficulty and difficulty not in DIFFICULTY_LEVELS:
+            raise ValueError(f"難度必須是 {'、'.join(DIFFICULTY_LEVELS)} 之一")
+        if not db_manager.connect():
+            raise ConnectionError("無法連接資料庫")
+
+        collections = db_manager.get_collections()
+        if not collections:
+            raise LookupError("MongoDB 中沒有找到面試資料集合")
+        if category:
+            # 題組只從指定類別抽題，不像單題抽取那樣退回全部題庫
+            collections = self._filter_collections(collections, category)
+            if not collections:
+                raise LookupError(f"沒有符合類別 {category} 的題庫集合")
+
+        drawn = question_sampler.sample(
+            n,
+            collections,
+            exclude_ids=exclude_ids or (),
+            accept=self._difficulty_filter(difficulty) if difficulty else None,
+        )
+        logger.info(f"批次抽題: 要求 {n} 題，抽出 {len(drawn)} 題")
+        return [self._build_question(name, doc) for name, doc in drawn]
+
+    def mark_question_seen(self, user_id: str, question_id: str) -> bool:
+        """將題目記錄為用戶已出過（預取的題目確定出題後才記錄）"""
+        if not db_manager.connect():
+            raise ConnectionError("無法連接資料庫")
+        return question_sampler.mark(user_id, question_id)
+
+    def get_question_by_category(
+        self, category: str, user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """按類別（集合名稱或其前綴）獲取問題"""
+        return self.get_random_question(user_id=user_id, category=category)
 
     def get_question_by_difficulty(self, difficulty: str) -> Dict[str, Any]:
         """按難度獲取問題"""
         # 這裡可以實現按難度篩選的邏輯
         return self.get_random_question()
 
+    def assess_difficulty(self, question: str) -> str:
+        """依題目長度評估難度（簡單、中等、困難）"""
+        if len(question) < 50:
+            return "簡單"
+        elif len(question) < 100:
+            return "中等"
+        else:
+            return "困難"
+
+    def _difficulty_filter(self, difficulty: str):
+        """抽題篩選條件：題目難度等於指定難度"""
+
+        def accept(collection_name: str, doc: Dict[str, Any]) -> bool:
+            return self.assess_difficulty(self._extract_question(doc)) == difficulty
+
+        return accept
+
+    def _resolve_collections(self, collections: list, category: Optional[str]) -> list:
+        """依類別篩選集合，沒有符合的集合時使用全部題庫"""
+        if not category:
+            return collections
+        matched = self._filter_collections(collections, category)
+        if not matched:
+            logger.warning(f"沒有符合類別 {category} 的集合，改從全部題庫抽題")
+            return collections
+        return matched
+
+    def _filter_collections(self, collections: list, category: str) -> list:
+        """找出名稱等於類別或以類別開頭的集合（例如 data_science 對應 data_science1、data_science2）"""
+        category = category.lower()
+        return [name for name in collections if name.lower().startswith(category)]
+
+    def _build_question(
+        self, collection_name: str, doc: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """將資料庫文檔轉換為問題格式"""
+        question = self._extract_question(doc)
+        answer = self._extract_answer(doc)
+
+        return {
+            "question": question,
+            "standard_answer": answer if answer else "（請根據您的經驗回答）",
+            "source": collection_name,
+            "source_file": doc.get("_source_file", "未知"),
+            "question_id": f"{collection_name}:{doc.get('_id')}",
+            "raw_data": doc,  # 保留原始資料供調試
+        }
+
     def _extract_question(self, doc: Dict[str, Any]) -> str:
         """從文檔中提取問題"""
         # 嘗試不同的欄位名稱
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+不重複抽題模組
+為每位用戶從整個題庫（或指定集合）不放回地抽題，已出過的題目以位元圖記錄並存回 MongoDB
+"""
+
+import bisect
+import logging
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .database import db_manager
+
+logger = logging.getLogger(__name__)
+
+# 內部使用的集合以底線開頭，不屬於題庫
+SEEN_COLLECTION = "_question_seen"
+# 題庫索引的重新整理間隔（秒）
+BANK_REFRESH_SECONDS = 300
+# 隨機抽中已出過的題目時，改用精確掃描前的最多嘗試次數
+RANDOM_PROBES = 8
+# 批次抽題有篩選條件時，每輪多抽的候選題倍數
+SAMPLE_OVERSAMPLE = 3
+# 批次抽題有篩選條件時最多抽幾輪，符合條件的題目太少時回傳已抽到的部分
+SAMPLE_MAX_ROUNDS = 5
+# 記憶體中保留已出題記錄的用戶數，超過時淘汰最久未抽題的用戶（記錄仍在 MongoDB）
+SEEN_CACHE_USERS = 10000
+
+
+class QuestionBank:
+    """題庫索引 - 每個集合的文件依 _id 排序，給予連續的序號，並記錄重複題目群組"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.Lock()
+        self._ids: Dict[str, List[Any]] = {}
+        self._ordinals: Dict[str, Dict[str, int]] = {}
+        self._fingerprints: Dict[Tuple[str, int], str] = {}
+        # 匯入時標記的重複群組：{_canonical_id: [(集合, 序號)]}，標準題排在第一個
+        self._groups: Dict[str, List[Tuple[str, int]]] = {}
+        self._group_of: Dict[Tuple[str, int], str] = {}
+        # {抽題範圍: 範圍內非代表題的 (集合, 序號)}
+        self._hidden: Dict[Tuple[str, ...], Set[Tuple[str, int]]] = {}
+        self._loaded_at = 0.0
+
+    def refresh(self, force: bool = False):
+        """重新載入各集合的 _id 清單與重複群組（僅投影 _id 與 _canonical_id）"""
+        with self._lock:
+            if not force and time.time() - self._loaded_at < BANK_REFRESH_SECONDS:
+                return
+            db = self.db_manager.db
+            if db is None:
+                return
+            ids = {}
+            groups: Dict[str, List[Tuple[str, int]]] = {}
+            for name in self.db_manager.get_collections():
+                cursor = db[name].find({}, {"_id": 1, "_canonical_id": 1})
+                ids[name] = []
+                for ordinal, doc in enumerate(cursor.sort("_id", 1)):
+                    ids[name].append(doc["_id"])
+                    if doc.get("_canonical_id"):
+                        member = (name, ordinal)
+                        members = groups.setdefault(doc["_canonical_id"], [])
+                        if f"{name}:{doc['_id']}" == doc["_canonical_id"]:
+                            members.insert(0, member)
+                        else:
+                            members.append(member)
+            groups = {
+                key: members for key, members in groups.items() if len(members) > 1
+            }
+            self._ids = ids
+            self._ordinals = {}
+            self._fingerprints = {}
+            self._groups = groups
+            self._group_of = {
+                member: key for key, members in groups.items() for member in members
+            }
+            self._hidden = {}
+            self._loaded_at = time.time()
+            logger.info(f"題庫索引已更新: {len(ids)} 個集合，共 {self.size()} 題")
+
+    def collections(self) -> List[str]:
+        return list(self._ids)
+
+    def size(self, collection: Optional[str] = None) -> int:
+        if collection is not None:
+            return len(self._ids.get(collection, ()))
+        return sum(len(ids) for ids in self._ids.values())
+
+    def document_id(self, collection: str, ordinal: int):
+        return self._ids[collection][ordinal]
+
+    def ordinal(self, collection: str, document_id: str) -> Optional[int]:
+        """依 _id 字串查詢序號（反向索引在第一次查詢時建立）"""
+        index = self._ordinals.get(collection)
+        if index is None:
+            index = self._ordinals[collection] = {
+                str(doc_id): ordinal
+                for ordinal, doc_id in enumerate(self._ids.get(collection, ()))
+            }
+        return index.get(document_id)
+
+    def group(self, collection: str, ordinal: int) -> List[Tuple[str, int]]:
+        """與此題互為重複的所有題目（含自己），不屬於重複群組時只有自己"""
+        member = (collection, ordinal)
+        key = self._group_of.get(member)
+        return self._groups.get(key, [member]) if key else [member]
+
+    def hidden(self, collections: List[str]) -> Set[Tuple[str, int]]:
+        """抽題範圍內每個重複群組只留一題代表（優先保留標準題），回傳其餘題目"""
+        groups, cache = self._groups, self._hidden
+        key = tuple(collections)
+        hidden = cache.get(key)
+        if hidden is None:
+            in_scope = set(collections)
+            hidden = set()
+            for members in groups.values():
+                hidden.update([m for m in members if m[0] in in_scope][1:])
+            cache[key] = hidden
+        return hidden
+
+    def anchor(self, collection: str) -> str:
+        """集合的識別標記（題數與 _id 清單的雜湊），集合重建或刪題後會改變"""
+        ids = self._ids.get(collection)
+        return self._fingerprint(collection, len(ids)) if ids else ""
+
+    def matches(self, collection: str, anchor: str) -> bool:
+        """舊標記是否仍適用：只在尾端新增題目時，原有題目的序號不變"""
+        count, _, _ = anchor.partition(":")
+        if not count.isdigit() or not 0 < int(count) <= self.size(collection):
+            return False
+        return self._fingerprint(collection, int(count)) == anchor
+
+    def _fingerprint(self, collection: str, count: int) -> str:
+        """前 count 筆 _id 的 CRC32（依題數快取，題庫重新整理時清除）"""
+        key = (collection, count)
+        fingerprint = self._fingerprints.get(key)
+        if fingerprint is None:
+            crc = 0
+            for doc_id in self._ids[collection][:count]:
+                crc = zlib.crc32(str(doc_id).encode() + b"\0", crc)
+            fingerprint = self._fingerprints[key] = f"{count}:{crc:08x}"
+        return fingerprint
+
+
+def _popcount(bits: bytearray) -> int:
+    """計算位元圖中已設定的位元數"""
+    return bin(int.from_bytes(bits, "little")).count("1")
+
+
+class SeenBitmap:
+    """單一集合的已出題位元圖"""
+
+    __slots__ = ("bits", "count", "anchor")
+
+    def __init__(self, size: int, anchor: str, bits: Optional[bytearray] = None):
+        self.bits = bits if bits is not None else bytearray((size + 7) // 8)
+        self.anchor = anchor
+        self.count = _popcount(self.bits)
+
+    def ensure_size(self, size: int):
+        """依題庫大小調整位元圖（新題目的 _id 較大，排在最後）"""
+        needed = (size + 7) // 8
+        if len(self.bits) < needed:
+            self.bits.extend(bytes(needed - len(self.bits)))
+            return
+        tail = size % 8
+        if len(self.bits) > needed or (tail and self.bits[needed - 1] >> tail):
+            # 題目減少時截斷，並清除超出範圍的位元
+            del self.bits[needed:]
+            if tail:
+                self.bits[-1] &= (1 << tail) - 1
+            self.count = _popcount(self.bits)
+
+    def is_set(self, ordinal: int) -> bool:
+        return bool(self.bits[ordinal >> 3] & (1 << (ordinal & 7)))
+
+    def set(self, ordinal: int):
+        if not self.is_set(ordinal):
+            self.bits[ordinal >> 3] |= 1 << (ordinal & 7)
+            self.count += 1
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+
+    def nth_unseen(self, n: int, size: int) -> int:
+        """回傳第 n 個（從 0 起算）未出過的序號"""
+        for byte_index, byte in enumerate(self.bits):
+            free = 8 - bin(byte).count("1")
+            if byte_index * 8 + 8 > size:
+                free = sum(
+                    1
+                    for bit in range(8)
+                    if byte_index * 8 + bit < size and not byte & (1 << bit)
+                )
+            if n >= free:
+                n -= free
+                continue
+            for bit in range(8):
+                ordinal = byte_index * 8 + bit
+                if ordinal < size and not byte & (1 << bit):
+                    if n == 0:
+                        return ordinal
+                    n -= 1
+        raise IndexError("沒有未出過的題目")
+
+    def dump(self) -> bytes:
+        """壓縮後的位元圖（稀疏位元圖壓縮後僅數百位元組）"""
+        return zlib.compress(bytes(self.bits), 9)
+
+    @classmethod
+    def load(cls, data: bytes, size: int, anchor: str) -> "SeenBitmap":
+        bitmap = cls(size, anchor, bytearray(zlib.decompress(data)))
+        bitmap.ensure_size(size)
+        return bitmap
+
+
+class _UserEntry:
+    """單一用戶的鎖、已出題記錄，以及正在使用的執行緒數"""
+
+    __slots__ = ("lock", "seen", "active")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seen: Optional[Dict[str, SeenBitmap]] = None
+        self.active = 0
+
+
+class QuestionSampler:
+    """每位用戶不放回抽題；重複題目群組只算一題，題目全數出過後，該範圍重新開始一輪"""
+
+    def __init__(self, db_manager, cache_users: int = SEEN_CACHE_USERS):
+        self.db_manager = db_manager
+        self.bank = QuestionBank(db_manager)
+        self.cache_users = cache_users
+        self._lock = threading.Lock()
+        # 依最近使用排序（LRU），淘汰時一併移除用戶的鎖
+        self._users: "OrderedDict[str, _UserEntry]" = OrderedDict()
+
+    @contextmanager
+    def _user(self, user_id: str) -> Iterator[_UserEntry]:
+        """持有用戶的鎖；使用中的用戶不會被淘汰，因此同一用戶只會有一把鎖"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                entry = self._users[user_id] = _UserEntry()
+            self._users.move_to_end(user_id)
+            entry.active += 1
+        try:
+            with entry.lock:
+                yield entry
+        finally:
+            with self._lock:
+                entry.active -= 1
+                self._evict()
+
+    def _evict(self):
+        """超過快取上限時，從最久未使用的用戶開始淘汰（呼叫端持有 self._lock）"""
+        excess = len(self._users) - self.cache_users
+        if excess <= 0:
+            return
+        victims = []
+        for user_id, entry in self._users.items():
+            if len(victims) >= excess:
+                break
+            if not entry.active:
+                victims.append(user_id)
+        for user_id in victims:
+            del self._users[user_id]
+
+    def _load_seen(self, user_id: str) -> Dict[str, SeenBitmap]:
+        """從 MongoDB 讀取用戶的已出題記錄"""
+        seen = {}
+        try:
+            doc = self.db_manager.db[SEEN_COLLECTION].find_one({"_id": user_id})
+        except Exception as e:
+            logger.warning(f"讀取用戶 {user_id} 的已出題記錄失敗: {e}")
+            doc = None
+        for name, stored in ((doc or {}).get("collections") or {}).items():
+            size = self.bank.size(name)
+            # 集合已不存在或已重建時，舊記錄不再適用
+            if size and self.bank.matches(name, stored.get("anchor") or ""):
+                seen[name] = SeenBitmap.load(stored["bits"], size, stored["anchor"])
+        return seen
+
+    def _save_seen(
+        self, user_id: str, seen: Dict[str, SeenBitmap], names: List[str]
+    ):
+        """將有變動的集合位元圖寫回 MongoDB（集合名稱只含英數字與底線，可作為欄位名稱）"""
+        try:
+            fields = {
+                f"collections.{name}": {
+                    "anchor": seen[name].anchor,
+                    "bits": seen[name].dump(),
+                }
+                for name in names
+            }
+            fields["updated_at"] = time.time()
+            self.db_manager.db[SEEN_COLLECTION].update_one(
+                {"_id": user_id}, {"$set": fields}, upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"儲存用戶 {user_id} 的已出題記錄失敗: {e}")
+
+    def _bitmap(self, seen: Dict[str, SeenBitmap], name: str) -> SeenBitmap:
+        size = self.bank.size(name)
+        anchor = self.bank.anchor(name)
+        bitmap = seen.get(name)
+        if bitmap is None or not self.bank.matches(name, bitmap.anchor):
+            bitmap = seen[name] = SeenBitmap(size, anchor)
+        else:
+            bitmap.ensure_size(size)
+            bitmap.anchor = anchor
+        return bitmap
+
+    def _visible(
+        self, bitmaps: Dict[str, SeenBitmap], collections: List[str]
+    ) -> Dict[str, SeenBitmap]:
+        """將範圍內重複群組的非代表題視為已出過（位元圖複本，不寫回已出題記錄）"""
+        hidden = self.bank.hidden(collections)
+        if not hidden:
+            return bitmaps
+        views = {
+            name: SeenBitmap(0, bitmap.anchor, bytearray(bitmap.bits))
+            for name, bitmap in bitmaps.items()
+        }
+        for name, ordinal in hidden:
+            views[name].set(ordinal)
+        return views
+
+    def _mark_group(
+        self, seen: Dict[str, SeenBitmap], name: str, ordinal: int
+    ) -> List[str]:
+        """將題目與其重複題目一併記錄為已出過，回傳有變動的集合"""
+        names = []
+        for member_name, member_ordinal in self.bank.group(name, ordinal):
+            self._bitmap(seen, member_name).set(member_ordinal)
+            if member_name not in names:
+                names.append(member_name)
+        return names
+
+    def _choose(
+        self, seen: Dict[str, SeenBitmap], collections: List[str]
+    ) -> Tuple[str, int, bool]:
+        """在指定集合中均勻抽出一題未出過的題目，回傳 (集合, 序號, 是否重新開始一輪)"""
+        bitmaps = self._visible(
+            {name: self._bitmap(seen, name) for name in collections}, collections
+        )
+        unseen = {
+            name: self.bank.size(name) - bitmap.count
+            for name, bitmap in bitmaps.items()
+        }
+        total = sum(unseen.values())
+        restarted = total <= 0
+        if restarted:
+            # 此範圍的題目都出過了，重新開始一輪
+            logger.info(f"範圍內 {len(collections)} 個集合的題目已全部出過，重新開始")
+            for name in collections:
+                seen[name].clear()
+            bitmaps = self._visible(
+                {name: seen[name] for name in collections}, collections
+            )
+            unseen = {
+                name: self.bank.size(name) - bitmap.count
+                for name, bitmap in bitmaps.items()
+            }
+            total = sum(unseen.values())
+
+        # 依未出題數加權選集合，結果等同在所有未出過的題目中均勻抽選
+        pick = random.randrange(total)
+        for name, count in unseen.items():
+            if pick < count:
+                break
+            pick -= count
+        bitmap = bitmaps[name]
+        size = self.bank.size(name)
+
+        # 大部分題目未出過時，隨機探測幾次即可命中（O(1)）
+        for _ in range(RANDOM_PROBES):
+            ordinal = random.randrange(size)
+            if not bitmap.is_set(ordinal):
+                return name, ordinal, restarted
+        return name, bitmap.nth_unseen(pick, size), restarted
+
+    def draw(
+        self,
+        user_id: str,
+        collections: Optional[List[str]] = None,
+        mark: bool = True,
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """為用戶抽出一題未出過的題目，回傳 (集合名稱, 文件)；題庫為空時回傳 None
+
+        mark=False 時只抽題不記錄（預取題目），確定出題後再呼叫 mark
+        """
+        self.bank.refresh()
+        with self._user(user_id) as entry:
+            seen = self._entry_seen(user_id, entry)
+            for _ in range(2):
+                available = [
+                    name
+                    for name in (collections or self.bank.collections())
+                    if self.bank.size(name)
+                ]
+                if not available:
+                    return None
+                name, ordinal, restarted = self._choose(seen, available)
+                doc = self.db_manager.db[name].find_one(
+                    {"_id": self.bank.document_id(name, ordinal)}
+                )
+                if doc is not None:
+                    changed = self._mark_group(seen, name, ordinal) if mark else []
+                    if restarted:
+                        changed = available + [n for n in changed if n not in available]
+                    if changed:
+                        self._save_seen(user_id, seen, changed)
+                    return name, doc
+                # 文件已被刪除，索引過期，重新整理後再試一次
+                self.bank.refresh(force=True)
+            return None
+
+    def mark(self, user_id: str, question_id: str) -> bool:
+        """將題目（question_id 為 集合:_id）記錄為用戶已出過，題目不在題庫索引中時回傳 False"""
+        name, _, document_id = str(question_id).partition(":")
+        self.bank.refresh()
+        ordinal = self.bank.ordinal(name, document_id) if self.bank.size(name) else None
+        if ordinal is None:
+            return False
+        with self._user(user_id) as entry:
+            seen = self._entry_seen(user_id, entry)
+            self._save_seen(user_id, seen, self._mark_group(seen, name, ordinal))
+        return True
+
+    def _entry_seen(self, user_id: str, entry: _UserEntry) -> Dict[str, SeenBitmap]:
+        """取得用戶的已出題記錄，第一次使用時從 MongoDB 載入（呼叫端持有用戶鎖）"""
+        if entry.seen is None:
+            entry.seen = self._load_seen(user_id)
+        return entry.seen
+
+    def sample(
+        self,
+        n: int,
+        collections: Optional[List[str]] = None,
+        exclude_ids: Iterable[str] = (),
+        accept: Optional[Callable[[str, Dict[str, Any]], bool]] = None,
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """一次抽出 n 題互不重複的題目，回傳 [(集合名稱, 文件)]；不影響用戶的已出題記錄
+
+        exclude_ids 為要排除的 question_id（集合:_id，其重複題目一併排除），
+        accept 為額外的篩選條件，重複題目群組在範圍內只抽代表題；
+        每輪依集合以一次 $in 查詢取回候選文件，不符條件時再抽下一輪（最多 SAMPLE_MAX_ROUNDS 輪）
+        """
+        self.bank.refresh()
+        available = [
+            name
+            for name in (collections or self.bank.collections())
+            if self.bank.size(name)
+        ]
+        offsets = []
+        total = 0
+        for name in available:
+            offsets.append(total)
+            total += self.bank.size(name)
+        excluded = self._excluded_ordinals(available, exclude_ids)
+        excluded |= self.bank.hidden(available)
+
+        picked: List[Tuple[str, Dict[str, Any]]] = []
+        rounds = 0
+        while len(picked) < n and total - len(excluded) > 0:
+            if rounds >= SAMPLE_MAX_ROUNDS:
+                logger.warning(f"批次抽題已抽 {rounds} 輪，只找到 {len(picked)} 題符合條件")
+                break
+            rounds += 1
+            wanted = (n - len(picked)) * (SAMPLE_OVERSAMPLE if accept else 1)
+            candidates = self._sample_ordinals(
+                available, offsets, total, excluded, wanted
+            )
+            excluded.update(candidates)
+            for name, doc in self._fetch(candidates):
+                if accept is None or accept(name, doc):
+                    picked.append((name, doc))
+        return picked[:n]
+
+    def _excluded_ordinals(
+        self, collections: List[str], exclude_ids: Iterable[str]
+    ) -> Set[Tuple[str, int]]:
+        """將 question_id 及其重複題目轉換為 (集合, 序號)，不在抽題範圍內的略過"""
+        in_scope = set(collections)
+        excluded = set()
+        for question_id in exclude_ids:
+            name, _, document_id = str(question_id).partition(":")
+            if not self.bank.size(name):
+                continue
+            ordinal = self.bank.ordinal(name, document_id)
+            if ordinal is not None:
+                excluded.update(
+                    member
+                    for member in self.bank.group(name, ordinal)
+                    if member[0] in in_scope
+                )
+        return excluded
+
+    def _sample_ordinals(
+        self,
+        collections: List[str],
+        offsets: List[int],
+        total: int,
+        excluded: Set[Tuple[str, int]],
+        k: int,
+    ) -> List[Tuple[str, int]]:
+        """在所有集合合併的序號空間中均勻抽出 k 個未排除的位置"""
+        remaining = total - len(excluded)
+        if k * 2 >= remaining:
+            # 要抽的數量接近剩餘題數時，列出全部剩餘位置再抽
+            candidates = [
+                (name, ordinal)
+                for name in collections
+                for ordinal in range(self.bank.size(name))
+                if (name, ordinal) not in excluded
+            ]
+            return random.sample(candidates, min(k, len(candidates)))
+
+        chosen: Dict[Tuple[str, int], None] = {}
+        while len(chosen) < k:
+            position = random.randrange(total)
+            index = bisect.bisect_right(offsets, position) - 1
+            candidate = (collections[index], position - offsets[index])
+            if candidate not in excluded:
+                chosen[candidate] = None
+        return list(chosen)
+
+    def _fetch(
+        self, candidates: List[Tuple[str, int]]
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """每個集合以一次 $in 查詢取回文件，依抽選順序回傳（已刪除的文件略過）"""
+        by_collection: Dict[str, List[Any]] = {}
+        for name, ordinal in candidates:
+            by_collection.setdefault(name, []).append(
+                self.bank.document_id(name, ordinal)
+            )
+        docs = {}
+        for name, ids in by_collection.items():
+            for doc in self.db_manager.db[name].find({"_id": {"$in": ids}}):
+                docs[(name, doc["_id"])] = doc
+
+        fetched = []
+        for name, ordinal in candidates:
+            doc = docs.get((name, self.bank.document_id(name, ordinal)))
+            if doc is not None:
+                fetched.append((name, doc))
+        return fetched
+
+    def reset(self, user_id: str):
+        """清除用戶的已出題記錄"""
+        with self._user(user_id) as entry:
+            entry.seen = None
+            try:
+                self.db_manager.db[SEEN_COLLECTION].delete_one({"_id": user_id})
+            except Exception as e:
+                logger.warning(f"清除用戶 {user_id} 的已出題記錄失敗: {e}")
+
+
+# 全域不重複抽題器實例
+question_sampler = QuestionSampler(db_manager)
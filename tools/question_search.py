@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+題庫全文搜尋模組
+在記憶體中為所有題目與答案建立倒排索引，以 BM25 排序，支援中文（單字與字元雙連詞）與英文混合查詢
+"""
+
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database import db_manager
+from .question_manager import question_manager
+
+logger = logging.getLogger(__name__)
+
+# BM25 參數
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 問題欄位的詞頻權重（答案為 1），讓命中題目本身的結果排在前面
+QUESTION_FIELD_WEIGHT = 2
+# 檢查題庫是否有重新匯入的間隔（秒）
+SEARCH_REFRESH_SECONDS = 30
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 100
+
+# 英文詞（保留 c++、c# 這類符號）或連續的中日韓文字
+_TOKEN_PATTERN = re.compile(
+    r"[a-z0-9][a-z0-9+#]*|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+"
+)
+
+
+def tokenize(text: str, unigrams: bool = False) -> List[str]:
+    """斷詞：英文以單字為單位並轉小寫，中文以相鄰兩字（雙連詞）為單位
+
+    unigrams=True 時另外加入每個中文單字（建立索引時使用），
+    讓只有一個字的查詢（例如「表」、「鎖」）也能命中較長詞語中的該字
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if token[0].isascii():
+            tokens.append(token)
+        elif len(token) == 1:
+            tokens.append(token)
+        else:
+            if unigrams:
+                tokens.extend(token)
+            tokens.extend(token[i : i + 2] for i in range(len(token) - 1))
+    return tokens
+
+
+class SearchSegment:
+    """單一集合的索引片段，集合重新匯入時整段重建"""
+
+    __slots__ = ("collection", "signature", "docs", "lengths", "postings")
+
+    def __init__(self, collection: str, signature: Tuple[int, str]):
+        self.collection = collection
+        self.signature = signature
+        self.docs: List[Tuple[Any, str, str]] = []  # (_id, 問題, 答案)
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}  # {詞: [(序號, 詞頻)]}
+
+    def add(self, doc_id, question: str, answer: str):
+        ordinal = len(self.docs)
+        frequencies: Dict[str, int] = {}
+        for token in tokenize(question, unigrams=True):
+            frequencies[token] = frequencies.get(token, 0) + QUESTION_FIELD_WEIGHT
+        for token in tokenize(answer, unigrams=True):
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for token, frequency in frequencies.items():
+            self.postings.setdefault(token, []).append((ordinal, frequency))
+        self.docs.append((doc_id, question, answer))
+        self.lengths.append(sum(frequencies.values()))
+
+    @property
+    def total_length(self) -> int:
+        return sum(self.lengths)
+
+
+class QuestionSearchIndex:
+    """題庫倒排索引 - 每個集合一個片段，依集合的文件數與最大 _id 判斷是否需要重建"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._refresh_lock = threading.Lock()
+        # (片段, 總文件數, 各片段的長度正規化係數)，整體替換以便查詢時取得一致的快照
+        self._snapshot: Tuple[Dict[str, SearchSegment], int, Dict[str, List[float]]] = (
+            {},
+            0,
+            {},
+        )
+        self._checked_at = 0.0
+
+    def _signature(self, collection) -> Tuple[int, str]:
+        """集合的變動標記：文件數與最大 _id（重新匯入會產生新的 _id）"""
+        last = collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        return (
+            collection.estimated_document_count(),
+            str(last["_id"]) if last else "",
+        )
+
+    def _build_segment(self, name: str, signature: Tuple[int, str]) -> SearchSegment:
+        segment = SearchSegment(name, signature)
+        default_answer = question_manager.default_question["standard_answer"]
+        for doc in self.db_manager.db[name].find({}).sort("_id", 1):
+            question = question_manager._extract_question(doc)
+            answer = question_manager._extract_answer(doc)
+            if answer == default_answer:
+                answer = ""
+            segment.add(doc["_id"], question, answer)
+        return segment
+
+    def refresh(self, force: bool = False) -> bool:
+        """檢查各集合是否變動，只重建有變動的片段；回傳索引是否可用"""
+        if not force and time.time() - self._checked_at < SEARCH_REFRESH_SECONDS:
+            return True
+        with self._refresh_lock:
+            if not force and time.time() - self._checked_at < SEARCH_REFRESH_SECONDS:
+                return True
+            current = self._snapshot[0]
+            if self.db_manager.db is None and not self.db_manager.connect():
+                logger.warning("無法連接資料庫，搜尋索引無法建立")
+                self._checked_at = time.time()
+                return bool(current)
+
+            started = time.perf_counter()
+            segments = {}
+            rebuilt = []
+            for name in self.db_manager.get_collections():
+                collection = self.db_manager.db[name]
+                signature = self._signature(collection)
+                segment = current.get(name)
+                if segment is None or segment.signature != signature:
+                    segment = self._build_segment(name, signature)
+                    rebuilt.append(name)
+                segments[name] = segment
+
+            removed = set(current) - set(segments)
+            if rebuilt or removed:
+                # 查詢中的執行緒仍使用舊的快照
+                total_docs = sum(len(s.docs) for s in segments.values())
+                total_length = sum(s.total_length for s in segments.values())
+                average_length = total_length / total_docs if total_docs else 1.0
+                norms = {
+                    name: [
+                        BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                        for length in segment.lengths
+                    ]
+                    for name, segment in segments.items()
+                }
+                self._snapshot = (segments, total_docs, norms)
+                logger.info(
+                    f"🔍 搜尋索引已更新: 重建 {len(rebuilt)} 個集合、移除 {len(removed)} 個，"
+                    f"共 {total_docs} 題（{(time.perf_counter() - started) * 1000:.0f}ms）"
+                )
+            self._checked_at = time.time()
+            return True
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+    ) -> Dict[str, Any]:
+        """以 BM25 搜尋題目與答案，category 為集合名稱或其前綴"""
+        self.refresh()
+        started = time.perf_counter()
+
+        all_segments, total_docs, norms = self._snapshot
+        segments = all_segments
+        if category:
+            prefix = category.lower()
+            segments = {
+                name: segment
+                for name, segment in segments.items()
+                if name.lower().startswith(prefix)
+            }
+
+        terms = set(tokenize(query))
+        scores: Dict[Tuple[str, int], float] = {}
+        for term in terms:
+            # 文件頻率以整個題庫計算，分類篩選不影響分數
+            document_frequency = sum(
+                len(segment.postings.get(term, ()))
+                for segment in all_segments.values()
+            )
+            if not document_frequency:
+                continue
+            idf = math.log(
+                1 + (total_docs - document_frequency + 0.5) / (document_frequency + 0.5)
+            )
+            weight = idf * (BM25_K1 + 1)
+            for name, segment in segments.items():
+                segment_norms = norms[name]
+                for ordinal, frequency in segment.postings.get(term, ()):
+                    key = (name, ordinal)
+                    scores[key] = scores.get(key, 0.0) + weight * frequency / (
+                        frequency + segment_norms[ordinal]
+                    )
+
+        limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+        results = []
+        for (name, ordinal), score in heapq.nlargest(
+            limit, scores.items(), key=lambda item: item[1]
+        ):
+            doc_id, question, answer = segments[name].docs[ordinal]
+            results.append(
+                {
+                    "question": question,
+                    "standard_answer": answer or "（請根據您的經驗回答）",
+                    "source": name,
+                    "question_id": f"{name}:{doc_id}",
+                    "score": round(score, 4),
+                }
+            )
+
+        return {
+            "query": query,
+            "total_matches": len(scores),
+            "results": results,
+            "took_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """索引統計"""
+        segments, total_docs, _ = self._snapshot
+        return {
+            "collections": len(segments),
+            "documents": total_docs,
+            "terms": sum(len(s.postings) for s in segments.values()),
+        }
+
+
+# 全域題庫搜尋索引實例
+question_search = QuestionSearchIndex(db_manager)
@@ -1,13 +1,43 @@
+import ast
+import asyncio
+import atexit
+import base64
+import contextvars
+import hashlib
+import json
 import os
+import queue
+import re
+import secrets
+import sys
+import threading
+import time
 from datetime import datetime
 from enum import Enum
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, render_template, request
+from flask import (
+    Flask,
+    Response,
+    jsonify,
+    render_template,
+    request,
+    stream_with_context,
+)
 from flask_cors import CORS
 from flask_restful import Api, Resource
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Index, func, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+
+# 將專案根目錄加入路徑，以便導入共用模組；本目錄也加入，
+# 以專案根目錄為工作目錄導入 virtual_interviewer.app 時才找得到同目錄的模組
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+import sqlite_profile
+from session_store import SessionStore
 
 # 面試狀態枚舉
 class InterviewState(Enum):
@@ -18,20 +48,164 @@ class InterviewState(Enum):
     COMPLETED = "completed"  # 面試完成階段
 
 
-# 狀態管理函數
-def get_system_prompt(state: InterviewState) -> str:
-    """根據當前狀態獲取系統提示詞"""
-    if state == InterviewState.WAITING:
-        return """
+# 關鍵字匹配器：每組關鍵字預先編譯成單一正規表示式
+class KeywordMatcher:
+    """預編譯的關鍵字匹配器"""
+
+    def __init__(self, *keywords, exact=False):
+        self.keywords = keywords
+        pattern = "|".join(re.escape(keyword.lower()) for keyword in keywords)
+        self._regex = re.compile(f"^(?:{pattern})$" if exact else pattern)
+
+    def __call__(self, lower_message):
+        return self._regex.search(lower_message) is not None
+
+
+START_MATCHER = KeywordMatcher(
+    "開始面試", "開始", "start_interview", "開始練習", "準備好了", "可以開始了"
+)
+START_ANNOUNCE_MATCHER = KeywordMatcher("開始面試", "start_interview")
+INTRO_DONE_MATCHER = KeywordMatcher(
+    "介紹完了",
+    "介紹完畢",
+    "自我介紹完成",
+    "就這樣",
+    "結束了",
+    "完成了",
+    "說完了",
+    "介紹結束",
+)
+EXIT_MATCHER = KeywordMatcher("退出", "結束", "完成", "不想繼續", "停止")
+RESTART_MATCHER = KeywordMatcher(
+    "重新開始", "重新來過", "重新面試", "重來", "再來一次", "開始新的面試"
+)
+QUESTION_REQUEST_MATCHER = KeywordMatcher("請給我問題", exact=True)
+
+
+class Transition:
+    """狀態轉換規則：守衛條件成立時轉換到目標狀態，並可指定專用處理器"""
+
+    __slots__ = ("guard", "target", "handler")
+
+    def __init__(self, guard, target, handler=None):
+        self.guard = guard
+        self.target = target
+        self.handler = handler
+
+
+class StateSpec:
+    """單一狀態的宣告：系統提示詞、可用工具、預設處理器與轉換規則"""
+
+    __slots__ = ("prompt", "tools", "handler", "transitions")
+
+    def __init__(self, prompt, tools, handler=None, transitions=()):
+        self.prompt = prompt
+        self.tools = tuple(tools)
+        self.handler = handler
+        self.transitions = tuple(transitions)
+
+
+class InterviewFlow:
+    """表格驅動的面試狀態機"""
+
+    def __init__(self, states, global_transitions=()):
+        self.states = states
+        # 每個狀態的規則只在建立時組合一次，訊息處理時直接查表
+        self._rules = {
+            state: spec.transitions + tuple(global_transitions)
+            for state, spec in states.items()
+        }
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def match(self, state, lower_message):
+        """找出第一個守衛條件成立的轉換規則"""
+        for transition in self._rules.get(state, ()):
+            if transition.guard(lower_message):
+                return transition
+        return None
+
+    def advance(self, api, user_id, user_message):
+        """依訊息轉換用戶狀態，回傳 (原狀態, 轉換規則或 None)"""
+        lower_message = user_message.strip().lower()
+
+        # 判斷與寫入在同一把用戶鎖內完成：併發訊息依序套用，「退出」等轉換不會遺失
+        with api.session_states.lock_for(user_id):
+            from_state = api._get_user_state(user_id)
+            transition = self.match(from_state, lower_message)
+            if transition is not None and transition.target != from_state:
+                api._set_user_state(user_id, transition.target)
+        return from_state, transition
+
+    def dispatch(self, api, user_id, user_message):
+        """轉換狀態並呼叫對應的處理器，回傳 (處理後狀態, 回應)"""
+        started_at = time.perf_counter()
+        from_state, transition = self.advance(api, user_id, user_message)
+        state = transition.target if transition else from_state
+        spec = self.states[state]
+
+        handler = transition.handler if transition and transition.handler else None
+        handler = handler or spec.handler
+        response = handler(api, user_id, user_message, spec.prompt)
+
+        final_state = api._get_user_state(user_id)
+        self._record(from_state, final_state, time.perf_counter() - started_at)
+        return final_state, response
+
+    async def dispatch_async(self, api, user_id, user_message):
+        """dispatch 的非同步版本：協程處理器直接等待，其餘處理器在執行緒池執行"""
+        started_at = time.perf_counter()
+        from_state, transition = self.advance(api, user_id, user_message)
+        state = transition.target if transition else from_state
+        spec = self.states[state]
+
+        handler = transition.handler if transition and transition.handler else None
+        handler = handler or spec.handler
+        if asyncio.iscoroutinefunction(handler):
+            response = await handler(api, user_id, user_message, spec.prompt)
+        else:
+            response = await asyncio.to_thread(
+                handler, api, user_id, user_message, spec.prompt
+            )
+
+        final_state = api._get_user_state(user_id)
+        self._record(from_state, final_state, time.perf_counter() - started_at)
+        return final_state, response
+
+    def _record(self, from_state, to_state, elapsed):
+        """累計每種轉換的次數與耗時"""
+        key = f"{from_state.value}->{to_state.value}"
+        with self._stats_lock:
+            stats = self._stats.setdefault(
+                key, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            stats["count"] += 1
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+    def stats(self):
+        """取得每種轉換的計數與平均耗時"""
+        with self._stats_lock:
+            return {
+                key: {
+                    **stats,
+                    "avg_seconds": stats["total_seconds"] / stats["count"],
+                }
+                for key, stats in self._stats.items()
+            }
+
+
+# 各狀態的系統提示詞
+STATE_PROMPTS = {
+    InterviewState.WAITING: """
 你現在是一個智能面試官助手，目前處於「等待開始」階段。
 
 - 歡迎用戶，說明面試流程
 - 等待用戶按下「開始面試」按鈕
 - 在未開始面試前，可以進行一般對話和系統介紹
 - 不要主動開始面試流程
-"""
-    elif state == InterviewState.INTRO:
-        return """
+""",
+    InterviewState.INTRO: """
 你現在是一個面試官助手，目前進行到「自我介紹階段」。
 
 - 請明確要求用戶進行完整的自我介紹
@@ -40,18 +214,16 @@ def get_system_prompt(state: InterviewState) -> str:
 - 使用 `intro_collector` 工具將內容儲存
 - 引導用戶說出完整的自我介紹（開場、學經歷、技能、成果、職缺連結、結語）
 - 當用戶說「介紹完了」或類似話語時，進入分析階段
-"""
-    elif state == InterviewState.INTRO_ANALYSIS:
-        return """
+""",
+    InterviewState.INTRO_ANALYSIS: """
 你現在是一個面試官助手，目前進行到「自我介紹分析階段」。
 
 - 使用 `analyze_intro` 工具分析用戶的自我介紹
 - 依據6個標準進行分析：開場簡介、學經歷概述、核心技能與強項、代表成果、與職缺的連結、結語與期待
 - 指出缺失的部分並給出具體建議
 - 分析完成後自動進入面試提問階段
-"""
-    elif state == InterviewState.QUESTIONING:
-        return """
+""",
+    InterviewState.QUESTIONING: """
 你現在是一個面試官助手，目前進行到「面試提問與回答階段」。
 
 - 使用 `get_question` 工具獲取面試題目並給出
@@ -60,34 +232,38 @@ def get_system_prompt(state: InterviewState) -> str:
 - 自動進入下一題，除非用戶說「退出」或「結束」
 - 每次回答後都要提醒：「除非說退出，否則會繼續下一題」
 - 完成多個題目後可進入完成階段
-"""
-    elif state == InterviewState.COMPLETED:
-        return """
+""",
+    InterviewState.COMPLETED: """
 你現在是一個面試官助手，目前進行到「面試完成階段」。
 
 - 使用 `generate_final_summary` 工具統合整個面試過程
 - 包含自我介紹分析、面試表現、整體建議
 - 給出專業的面試總結和改進建議
 - 感謝用戶參與面試
-"""
-    else:
-        return "你是一個面試官助手。"
+""",
+}
+
+# 各狀態的可用工具
+STATE_TOOLS = {
+    InterviewState.WAITING: ["general_chat"],
+    InterviewState.INTRO: ["intro_collector"],
+    InterviewState.INTRO_ANALYSIS: ["analyze_intro"],
+    InterviewState.QUESTIONING: ["get_question", "analyze_answer"],
+    InterviewState.COMPLETED: ["generate_final_summary"],
+}
+
+
+# 狀態管理函數
+def get_system_prompt(state: InterviewState) -> str:
+    """根據當前狀態獲取系統提示詞"""
+    spec = INTERVIEW_FLOW.states.get(state)
+    return spec.prompt if spec else "你是一個面試官助手。"
 
 
 def get_available_tools(state: InterviewState):
     """根據當前狀態獲取可用工具"""
-    if state == InterviewState.WAITING:
-        return ["general_chat"]
-    elif state == InterviewState.INTRO:
-        return ["intro_collector"]
-    elif state == InterviewState.INTRO_ANALYSIS:
-        return ["analyze_intro"]
-    elif state == InterviewState.QUESTIONING:
-        return ["get_question", "analyze_answer"]
-    elif state == InterviewState.COMPLETED:
-        return ["generate_final_summary"]
-    else:
-        return []
+    spec = INTERVIEW_FLOW.states.get(state)
+    return spec.tools if spec else ()
 
 
 # 設定 MCP 和 SmartAgent 為不可用
@@ -97,12 +273,12 @@ SMART_AGENT_AVAILABLE = False
 # 嘗試導入 Fast Agent
 FAST_AGENT_AVAILABLE = False
 try:
-    import sys
-
-    sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
-
     # 嘗試導入橋接模組
-    from fast_agent_bridge import call_fast_agent_function
+    from fast_agent_bridge import (
+        call_fast_agent_function,
+        call_fast_agent_function_async,
+        fast_agent_registry,
+    )
 
     FAST_AGENT_AVAILABLE = True
     print("✅ Fast Agent 橋接模組已成功導入")
@@ -122,9 +298,34 @@ app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
     "DATABASE_URL", "sqlite:///virtual_interview.db"
 )
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# SQLite 正式環境設定（WAL、busy_timeout 等），SQLITE_PROFILE=default 可停用
+app.config["SQLITE_PROFILE"] = os.environ.get("SQLITE_PROFILE", "production")
+if app.config["SQLITE_PROFILE"] == "production":
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = sqlite_profile.engine_options(
+        app.config["SQLALCHEMY_DATABASE_URI"]
+    )
+# 對話記錄延遲寫入（write-behind）：回應不再等待每則訊息的磁碟同步
+app.config["INTERVIEW_WRITE_BEHIND"] = os.environ.get(
+    "INTERVIEW_WRITE_BEHIND", ""
+).lower() in ("1", "true", "yes")
+app.config["INTERVIEW_JOURNAL_BATCH_SIZE"] = int(
+    os.environ.get("INTERVIEW_JOURNAL_BATCH_SIZE", "50")
+)
+app.config["INTERVIEW_JOURNAL_FLUSH_MS"] = int(
+    os.environ.get("INTERVIEW_JOURNAL_FLUSH_MS", "200")
+)
+# 啟動時預熱 Fast Agent 橋接（建立資料庫連線）
+app.config["FAST_AGENT_WARMUP"] = os.environ.get(
+    "FAST_AGENT_WARMUP", "1"
+).lower() in ("1", "true", "yes")
 
 # 初始化擴展
 db = SQLAlchemy(app)
+if app.config["SQLITE_PROFILE"] == "production" and sqlite_profile.is_sqlite_uri(
+    app.config["SQLALCHEMY_DATABASE_URI"]
+):
+    with app.app_context():
+        sqlite_profile.install(db.engine)
 CORS(app)
 api = Api(app)
 
@@ -177,6 +378,8 @@ class Skill(db.Model):
 
 
 class InterviewSession(db.Model):
+    """舊版對話記錄（str(dict) 格式），僅保留供 migrate_legacy_sessions 遷移"""
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     session_data = db.Column(db.Text)  # JSON格式儲存對話內容
@@ -186,9 +389,528 @@ class InterviewSession(db.Model):
     )
 
 
+class InterviewTurn(db.Model):
+    """面試對話記錄 - 每則訊息一列，常用查詢欄位獨立並建立索引"""
+
+    __tablename__ = "interview_turn"
+
+    # SQLite 上對應 INTEGER PRIMARY KEY（rowid 別名），其他資料庫為 BIGINT
+    id = db.Column(
+        db.BigInteger().with_variant(db.Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    session_id = db.Column(db.String(32), nullable=False)
+    user_id = db.Column(db.String(100), nullable=False)
+    state = db.Column(db.String(32), nullable=False)
+    turn_index = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    payload = db.Column(db.JSON)  # 用戶訊息、回應等原始內容
+
+    __table_args__ = (
+        # 用戶歷史（依時間分頁）
+        Index("ix_interview_turn_user_created", "user_id", "created_at", "id"),
+        # 依狀態的統計查詢
+        Index("ix_interview_turn_state_created", "state", "created_at"),
+        # 單場面試依序重播、總結
+        Index("ix_interview_turn_session_index", "session_id", "turn_index"),
+    )
+
+    def to_dict(self):
+        """轉換為 API 回應格式"""
+        return {
+            "id": str(self.id),
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "state": self.state,
+            "turn_index": self.turn_index,
+            "score": self.score,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "payload": self.payload,
+        }
+
+
+def migrate_legacy_sessions(batch_size=500):
+    """將舊版 InterviewSession（str(dict) 格式）轉換為 InterviewTurn，可重複執行"""
+    migrated = skipped = 0
+    # 每位用戶目前的 (面試場次 id, 下一個 turn_index, 上一則的狀態)
+    sessions = {}
+    last_id = 0
+    while True:
+        rows = (
+            InterviewSession.query.filter(InterviewSession.id > last_id)
+            .order_by(InterviewSession.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        existing = {
+            turn_id
+            for (turn_id,) in db.session.query(InterviewTurn.id).filter(
+                InterviewTurn.id.in_([row.id for row in rows])
+            )
+        }
+
+        turns = []
+        for row in rows:
+            try:
+                data = ast.literal_eval(row.session_data or "{}")
+                if not isinstance(data, dict):
+                    raise ValueError("session_data 不是字典")
+            except (ValueError, SyntaxError) as e:
+                print(f"⚠️ 略過無法解析的記錄 {row.id}: {e}")
+                skipped += 1
+                continue
+
+            user_id = str(row.user_id) if row.user_id is not None else "default_user"
+            state = data.get("current_state", InterviewState.WAITING.value)
+            session_id, turn_index, last_state = sessions.get(user_id, (None, 0, None))
+            # 從其他狀態回到等待狀態代表上一場面試已結束（重新開始）
+            if session_id is None or (
+                state == InterviewState.WAITING.value
+                and last_state != InterviewState.WAITING.value
+            ):
+                session_id, turn_index = f"legacy-{row.id}", 0
+            sessions[user_id] = (session_id, turn_index + 1, state)
+
+            if row.id in existing:
+                continue
+            try:
+                created_at = datetime.fromisoformat(data["timestamp"])
+            except (KeyError, TypeError, ValueError):
+                created_at = row.created_at or datetime.utcnow()
+            turns.append(
+                {
+                    "id": row.id,
+                    "session_id": session_id,
+                    "user_id": user_id,
+                    "state": state,
+                    "turn_index": turn_index,
+                    "score": None,
+                    "created_at": created_at,
+                    "payload": {
+                        "user_message": data.get("user_message", ""),
+                        "ai_response": data.get("ai_response", ""),
+                    },
+                }
+            )
+
+        if turns:
+            db.session.execute(insert(InterviewTurn), turns)
+            db.session.commit()
+            migrated += len(turns)
+
+    print(f"✅ 對話記錄遷移完成：轉換 {migrated} 筆，略過 {skipped} 筆")
+    return {"migrated": migrated, "skipped": skipped}
+
+
+# 對話記錄 id 配置（不需等待資料庫提交）
+_TURN_ID_EPOCH_MS = 1704067200000  # 2024-01-01 UTC
+_turn_id_lock = threading.Lock()
+_turn_id_last_ms = 0
+_turn_id_sequence = 0
+# 10 位元節點 id：每個程序隨機抽選，fork 出的工作程序重新抽選，不沿用主程序的值
+_turn_id_node = secrets.randbits(10)
+
+
+def _redraw_turn_id_node():
+    global _turn_id_node
+    _turn_id_node = secrets.randbits(10)
+
+
+os.register_at_fork(after_in_child=_redraw_turn_id_node)
+
+
+def allocate_turn_id():
+    """配置 64 位元對話記錄 id：毫秒時間戳 | 節點 id | 序號
+
+    節點 id 為隨機值，不同程序（Gunicorn 工作程序、ASGI 程序）仍可能抽到相同的值，
+    在同一毫秒配置出相同的 id；寫入時遇到主鍵衝突由 _insert_turns 改配新 id 重試。
+    id 超過 2^53，JavaScript 數字無法精確表示，JSON 回應中一律以十進位字串輸出
+    """
+    global _turn_id_last_ms, _turn_id_sequence
+    with _turn_id_lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _turn_id_last_ms:
+            # 同一毫秒內（或時鐘回撥）沿用上一個時間戳並遞增序號
+            now_ms = _turn_id_last_ms
+            _turn_id_sequence = (_turn_id_sequence + 1) & 0xFFF
+            if _turn_id_sequence == 0:
+                now_ms += 1
+        else:
+            _turn_id_sequence = 0
+        _turn_id_last_ms = now_ms
+        return (
+            ((now_ms - _TURN_ID_EPOCH_MS) << 22)
+            | (_turn_id_node << 12)
+            | _turn_id_sequence
+        )
+
+
+def _insert_turns(turns):
+    """寫入對話記錄，回傳失敗筆數；整批失敗時逐筆寫入，主鍵衝突的記錄改配新 id 重試一次"""
+    try:
+        db.session.execute(insert(InterviewTurn), turns)
+        db.session.commit()
+        return 0
+    except IntegrityError:
+        db.session.rollback()
+
+    failed = 0
+    for turn in turns:
+        for retry in (False, True):
+            try:
+                db.session.execute(insert(InterviewTurn), [turn])
+                db.session.commit()
+                break
+            except IntegrityError as e:
+                db.session.rollback()
+                # 只有 id 已被其他程序使用時才改配新 id，其他完整性錯誤直接記為失敗
+                if retry or db.session.get(InterviewTurn, turn["id"]) is None:
+                    failed += 1
+                    print(f"❌ 對話記錄寫入失敗（id {turn['id']}）: {e}")
+                    break
+                previous = turn["id"]
+                turn["id"] = allocate_turn_id()
+                print(f"⚠️ 對話記錄 id {previous} 與其他程序衝突，改用 {turn['id']}")
+    return failed
+
+
+class TurnJournal:
+    """對話記錄的延遲寫入日誌 - 背景執行緒以群組提交批次寫入資料庫"""
+
+    _STOP = object()
+
+    def __init__(
+        self, flask_app, batch_size=50, flush_interval_ms=200, max_pending=10000
+    ):
+        self.app = flask_app
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(1, flush_interval_ms) / 1000.0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {"enqueued": 0, "written": 0, "failed": 0, "batches": 0}
+
+    def _ensure_writer(self):
+        """延遲啟動寫入執行緒；fork 後的子程序會重新建立自己的執行緒"""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 之後父程序的佇列與執行緒都不可用
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._thread = None
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="turn-journal-writer", daemon=True
+                )
+                self._thread.start()
+
+    def enqueue(self, record):
+        """加入一筆對話記錄，佇列滿時阻塞以形成背壓"""
+        self._ensure_writer()
+        self._queue.put(record)
+        with self._lock:
+            self._stats["enqueued"] += 1
+
+    def _run(self):
+        """寫入迴圈：湊滿 batch_size 筆或等待 flush_interval 後提交一次"""
+        pending_queue = self._queue
+        while True:
+            item = pending_queue.get()
+            if item is self._STOP:
+                pending_queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = pending_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                pending_queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        """以單一交易寫入整批記錄"""
+        try:
+            with self.app.app_context():
+                failed = _insert_turns(batch)
+            with self._lock:
+                self._stats["written"] += len(batch) - failed
+                self._stats["failed"] += failed
+                self._stats["batches"] += 1
+        except Exception as e:
+            with self.app.app_context():
+                db.session.rollback()
+            with self._lock:
+                self._stats["failed"] += len(batch)
+            print(f"❌ 對話記錄批次寫入失敗（{len(batch)} 筆）: {e}")
+
+    def flush(self):
+        """等待目前佇列中的記錄全部寫入"""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout=5.0):
+        """停止寫入執行緒並寫出剩餘記錄"""
+        if self._pid != os.getpid() or not (self._thread and self._thread.is_alive()):
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        """回傳寫入統計"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+
+def warm_up_fast_agent():
+    """在背景預熱 Fast Agent 橋接，第一個請求不必等待 server.py 載入"""
+    if FAST_AGENT_AVAILABLE and app.config["FAST_AGENT_WARMUP"]:
+        threading.Thread(
+            target=fast_agent_registry.warm_up, name="fast-agent-warmup", daemon=True
+        ).start()
+
+
+# 全域對話記錄日誌實例（INTERVIEW_WRITE_BEHIND=1 時啟用）
+turn_journal = None
+if app.config["INTERVIEW_WRITE_BEHIND"]:
+    turn_journal = TurnJournal(
+        app,
+        batch_size=app.config["INTERVIEW_JOURNAL_BATCH_SIZE"],
+        flush_interval_ms=app.config["INTERVIEW_JOURNAL_FLUSH_MS"],
+    )
+    atexit.register(turn_journal.close)
+
+
 # Fast Agent 橋接函數已移至 fast_agent_bridge.py
 
 
+# 分頁游標（履歷列表與對話歷史共用）
+def _encode_cursor(*values):
+    """將排序鍵編碼為不透明的分頁游標"""
+    raw = json.dumps(list(values), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor, size=2):
+    """解碼分頁游標，格式錯誤時拋出 ValueError"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"無效的分頁游標: {cursor}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"無效的分頁游標: {cursor}")
+    return values
+
+
+def _parse_resume_date(value):
+    """解析履歷中的 YYYY-MM-DD 日期"""
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
+def _resume_user_row(data):
+    """從履歷 JSON 取出 user 表欄位"""
+    if not isinstance(data, dict):
+        raise ValueError("履歷必須是 JSON 物件")
+    if not data.get("name"):
+        raise ValueError("缺少必填欄位 name")
+    return {
+        "name": data.get("name"),
+        "desired_position": data.get("desired_position"),
+        "desired_field": data.get("desired_field"),
+        "desired_location": data.get("desired_location"),
+        "introduction": data.get("introduction"),
+        "keywords": data.get("keywords"),
+    }
+
+
+def _resume_experience_rows(data, user_id=None):
+    """從履歷 JSON 取出 work_experience 表的多筆資料"""
+    rows = []
+    for exp_data in data.get("work_experiences") or []:
+        if not exp_data.get("company_name"):
+            raise ValueError("工作經驗缺少必填欄位 company_name")
+        rows.append(
+            {
+                "user_id": user_id,
+                "company_name": exp_data.get("company_name"),
+                "industry_type": exp_data.get("industry_type"),
+                "work_location": exp_data.get("work_location"),
+                "position_title": exp_data.get("position_title"),
+                "position_category_1": exp_data.get("position_category_1"),
+                "position_category_2": exp_data.get("position_category_2"),
+                "start_date": _parse_resume_date(exp_data.get("start_date")),
+                "end_date": _parse_resume_date(exp_data.get("end_date")),
+                "job_description": exp_data.get("job_description"),
+                "job_skills": exp_data.get("job_skills"),
+                "salary": exp_data.get("salary"),
+                "salary_type": exp_data.get("salary_type"),
+                "management_responsibility": exp_data.get(
+                    "management_responsibility"
+                ),
+            }
+        )
+    return rows
+
+
+def _resume_skill_rows(data, user_id=None):
+    """從履歷 JSON 取出 skill 表的多筆資料"""
+    rows = []
+    for skill_data in data.get("skills") or []:
+        if not skill_data.get("skill_name"):
+            raise ValueError("技能缺少必填欄位 skill_name")
+        rows.append(
+            {
+                "user_id": user_id,
+                "skill_name": skill_data.get("skill_name"),
+                "skill_description": skill_data.get("skill_description"),
+            }
+        )
+    return rows
+
+
+def _insert_resume_chunk(prepared):
+    """以單一交易批次寫入一組已驗證的履歷，回傳依序對應的 user id"""
+    created_at = datetime.utcnow()
+    user_rows = [dict(user_row, created_at=created_at) for user_row, _, _ in prepared]
+    # RETURNING 搭配 sort_by_parameter_order，確保 id 與輸入順序一致
+    user_ids = (
+        db.session.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True), user_rows
+        )
+        .scalars()
+        .all()
+    )
+
+    experience_rows = []
+    skill_rows = []
+    for user_id, (_, experiences, skills) in zip(user_ids, prepared):
+        experience_rows.extend(
+            dict(row, user_id=user_id, created_at=created_at) for row in experiences
+        )
+        skill_rows.extend(
+            dict(row, user_id=user_id, created_at=created_at) for row in skills
+        )
+    if experience_rows:
+        db.session.execute(insert(WorkExperience), experience_rows)
+    if skill_rows:
+        db.session.execute(insert(Skill), skill_rows)
+    db.session.commit()
+    return user_ids
+
+
+def bulk_import_resumes(records, chunk_size=500):
+    """批次匯入履歷 - 每 chunk_size 筆一個交易，回傳逐筆結果"""
+    results = []
+    inserted = 0
+    started = time.perf_counter()
+
+    for chunk_start in range(0, len(records), chunk_size):
+        chunk = records[chunk_start : chunk_start + chunk_size]
+        prepared = []
+        indexes = []
+        for offset, data in enumerate(chunk):
+            index = chunk_start + offset
+            try:
+                if isinstance(data, Exception):
+                    raise data
+                prepared.append(
+                    (
+                        _resume_user_row(data),
+                        _resume_experience_rows(data),
+                        _resume_skill_rows(data),
+                    )
+                )
+                indexes.append(index)
+            except Exception as e:
+                results.append({"index": index, "success": False, "error": str(e)})
+
+        if not prepared:
+            continue
+        try:
+            user_ids = _insert_resume_chunk(prepared)
+            for index, user_id in zip(indexes, user_ids):
+                results.append({"index": index, "success": True, "user_id": user_id})
+            inserted += len(user_ids)
+        except Exception as e:
+            # 整批失敗時逐筆重試，找出真正有問題的記錄
+            db.session.rollback()
+            print(f"⚠️ 第 {chunk_start} 筆起的批次寫入失敗，改為逐筆重試: {e}")
+            for index, item in zip(indexes, prepared):
+                try:
+                    (user_id,) = _insert_resume_chunk([item])
+                    results.append(
+                        {"index": index, "success": True, "user_id": user_id}
+                    )
+                    inserted += 1
+                except Exception as item_error:
+                    db.session.rollback()
+                    results.append(
+                        {"index": index, "success": False, "error": str(item_error)}
+                    )
+
+    elapsed = time.perf_counter() - started
+    results.sort(key=lambda item: item["index"])
+    return {
+        "total": len(records),
+        "inserted": inserted,
+        "failed": len(records) - inserted,
+        "elapsed_seconds": round(elapsed, 4),
+        "resumes_per_second": round(inserted / elapsed, 1) if elapsed else None,
+        "results": results,
+    }
+
+
+def parse_ndjson_resumes(text):
+    """解析 NDJSON 履歷，無法解析的行以例外物件保留位置，交由逐筆報告"""
+    records = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            records.append(ValueError(f"第 {line_number} 行不是有效的 JSON: {e}"))
+    return records
+
+
+# 履歷列表：可選欄位與分頁大小
+USER_LIST_FIELDS = (
+    "id",
+    "name",
+    "desired_position",
+    "desired_field",
+    "desired_location",
+    "introduction",
+    "keywords",
+    "created_at",
+)
+USER_LIST_DEFAULT_FIELDS = ("id", "name", "desired_position", "created_at")
+USER_LIST_DEFAULT_LIMIT = 50
+USER_LIST_MAX_LIMIT = 200
+
+
 # API資源類別
 class UserAPI(Resource):
     def post(self):
@@ -197,56 +919,15 @@ class UserAPI(Resource):
             data = request.get_json()
 
             # 創建用戶
-            user = User(
-                name=data.get("name"),
-                desired_position=data.get("desired_position"),
-                desired_field=data.get("desired_field"),
-                desired_location=data.get("desired_location"),
-                introduction=data.get("introduction"),
-                keywords=data.get("keywords"),
-            )
-
+            user = User(**_resume_user_row(data))
             db.session.add(user)
             db.session.flush()  # 取得user.id
 
-            # 創建工作經驗
-            work_experiences = data.get("work_experiences", [])
-            for exp_data in work_experiences:
-                experience = WorkExperience(
-                    user_id=user.id,
-                    company_name=exp_data.get("company_name"),
-                    industry_type=exp_data.get("industry_type"),
-                    work_location=exp_data.get("work_location"),
-                    position_title=exp_data.get("position_title"),
-                    position_category_1=exp_data.get("position_category_1"),
-                    position_category_2=exp_data.get("position_category_2"),
-                    start_date=(
-                        datetime.strptime(exp_data.get("start_date"), "%Y-%m-%d").date()
-                        if exp_data.get("start_date")
-                        else None
-                    ),
-                    end_date=(
-                        datetime.strptime(exp_data.get("end_date"), "%Y-%m-%d").date()
-                        if exp_data.get("end_date")
-                        else None
-                    ),
-                    job_description=exp_data.get("job_description"),
-                    job_skills=exp_data.get("job_skills"),
-                    salary=exp_data.get("salary"),
-                    salary_type=exp_data.get("salary_type"),
-                    management_responsibility=exp_data.get("management_responsibility"),
-                )
-                db.session.add(experience)
-
-            # 創建技能
-            skills = data.get("skills", [])
-            for skill_data in skills:
-                skill = Skill(
-                    user_id=user.id,
-                    skill_name=skill_data.get("skill_name"),
-                    skill_description=skill_data.get("skill_description"),
-                )
-                db.session.add(skill)
+            # 創建工作經驗與技能
+            for row in _resume_experience_rows(data, user.id):
+                db.session.add(WorkExperience(**row))
+            for row in _resume_skill_rows(data, user.id):
+                db.session.add(Skill(**row))
 
             db.session.commit()
 
@@ -260,79 +941,222 @@ class UserAPI(Resource):
         """取得用戶履歷資料"""
         try:
             if user_id:
-                user = User.query.get_or_404(user_id)
-                work_experiences = [
-                    {
-                        "id": exp.id,
-                        "company_name": exp.company_name,
-                        "industry_type": exp.industry_type,
-                        "work_location": exp.work_location,
-                        "position_title": exp.position_title,
-                        "position_category_1": exp.position_category_1,
-                        "position_category_2": exp.position_category_2,
-                        "start_date": (
-                            exp.start_date.strftime("%Y-%m-%d")
-                            if exp.start_date
-                            else None
-                        ),
-                        "end_date": (
-                            exp.end_date.strftime("%Y-%m-%d") if exp.end_date else None
-                        ),
-                        "job_description": exp.job_description,
-                        "job_skills": exp.job_skills,
-                        "salary": exp.salary,
-                        "salary_type": exp.salary_type,
-                        "management_responsibility": exp.management_responsibility,
-                    }
-                    for exp in user.work_experiences
-                ]
+                return self._get_user(user_id)
+            return self._list_users()
+        except ValueError as e:
+            return {"success": False, "message": str(e)}, 400
+        except Exception as e:
+            return {"success": False, "message": f"取得履歷資料失敗: {str(e)}"}, 400
 
-                skills = [
-                    {
-                        "id": skill.id,
-                        "skill_name": skill.skill_name,
-                        "skill_description": skill.skill_description,
-                    }
-                    for skill in user.skills
-                ]
+    def _resume_etag(self, user_id):
+        """以單一查詢計算履歷版本標記，不需載入關聯資料；用戶不存在時回傳 None"""
 
-                return {
-                    "success": True,
-                    "data": {
-                        "id": user.id,
-                        "name": user.name,
-                        "desired_position": user.desired_position,
-                        "desired_field": user.desired_field,
-                        "desired_location": user.desired_location,
-                        "introduction": user.introduction,
-                        "keywords": user.keywords,
-                        "work_experiences": work_experiences,
-                        "skills": skills,
-                    },
-                }
+        def child_stats(model):
+            """關聯資料的 (筆數, 最大 id) 純量子查詢"""
+            return tuple(
+                select(aggregate(model.id))
+                .where(model.user_id == user_id)
+                .scalar_subquery()
+                for aggregate in (func.count, func.max)
+            )
+
+        row = db.session.execute(
+            select(
+                User.id,
+                User.created_at,
+                *child_stats(WorkExperience),
+                *child_stats(Skill),
+            ).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        # 履歷建立後不會修改（沒有更新 API），建立時間與關聯資料的數量、最大 id 即足以辨識版本
+        fingerprint = "|".join(str(value) for value in row)
+        return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+    def _get_user(self, user_id):
+        """取得單一用戶的完整履歷，支援 ETag / If-None-Match"""
+        etag = self._resume_etag(user_id)
+        if etag is None:
+            return {"success": False, "message": "找不到此用戶履歷"}, 404
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+        # 以 selectin 一次載入工作經驗與技能，避免逐筆延遲查詢
+        user = db.session.get(
+            User,
+            user_id,
+            options=[selectinload(User.work_experiences), selectinload(User.skills)],
+        )
+
+        work_experiences = [
+            {
+                "id": exp.id,
+                "company_name": exp.company_name,
+                "industry_type": exp.industry_type,
+                "work_location": exp.work_location,
+                "position_title": exp.position_title,
+                "position_category_1": exp.position_category_1,
+                "position_category_2": exp.position_category_2,
+                "start_date": (
+                    exp.start_date.strftime("%Y-%m-%d") if exp.start_date else None
+                ),
+                "end_date": (
+                    exp.end_date.strftime("%Y-%m-%d") if exp.end_date else None
+                ),
+                "job_description": exp.job_description,
+                "job_skills": exp.job_skills,
+                "salary": exp.salary,
+                "salary_type": exp.salary_type,
+                "management_responsibility": exp.management_responsibility,
+            }
+            for exp in user.work_experiences
+        ]
+
+        skills = [
+            {
+                "id": skill.id,
+                "skill_name": skill.skill_name,
+                "skill_description": skill.skill_description,
+            }
+            for skill in user.skills
+        ]
+
+        return (
+            {
+                "success": True,
+                "data": {
+                    "id": user.id,
+                    "name": user.name,
+                    "desired_position": user.desired_position,
+                    "desired_field": user.desired_field,
+                    "desired_location": user.desired_location,
+                    "introduction": user.introduction,
+                    "keywords": user.keywords,
+                    "work_experiences": work_experiences,
+                    "skills": skills,
+                },
+            },
+            200,
+            {"ETag": f'"{etag}"'},
+        )
+
+    def _list_users(self):
+        """分頁列出履歷 - 依 id 游標分頁，只查詢 fields 指定的欄位"""
+        fields = request.args.get("fields")
+        if fields:
+            selected = [field.strip() for field in fields.split(",") if field.strip()]
+            unknown = [field for field in selected if field not in USER_LIST_FIELDS]
+            if unknown:
+                raise ValueError(f"不支援的欄位: {', '.join(unknown)}")
+        else:
+            selected = list(USER_LIST_DEFAULT_FIELDS)
+        if "id" not in selected:
+            selected.insert(0, "id")
+
+        statement = select(*[getattr(User, field) for field in selected]).order_by(
+            User.id
+        )
+        cursor = request.args.get("cursor")
+        if cursor:
+            (last_id,) = _decode_cursor(cursor, size=1)
+            statement = statement.where(User.id > int(last_id))
+
+        limit = _parse_limit_arg(USER_LIST_DEFAULT_LIMIT, USER_LIST_MAX_LIMIT)
+        rows = db.session.execute(statement.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        data = []
+        for row in rows:
+            item = {}
+            for field in selected:
+                value = getattr(row, field)
+                if isinstance(value, datetime):
+                    value = value.strftime("%Y-%m-%d %H:%M:%S")
+                item[field] = value
+            data.append(item)
+
+        return {
+            "success": True,
+            "data": data,
+            "next_cursor": _encode_cursor(rows[-1].id) if has_more else None,
+            "has_more": has_more,
+        }
+
+
+class UserBulkAPI(Resource):
+    def post(self):
+        """批次建立履歷 - 接受 JSON 陣列或 NDJSON"""
+        try:
+            if request.mimetype == "application/x-ndjson":
+                records = parse_ndjson_resumes(request.get_data(as_text=True))
             else:
-                users = User.query.all()
-                return {
-                    "success": True,
-                    "data": [
-                        {
-                            "id": user.id,
-                            "name": user.name,
-                            "desired_position": user.desired_position,
-                            "created_at": user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                        }
-                        for user in users
-                    ],
-                }
+                records = request.get_json()
+                if not isinstance(records, list):
+                    return {"success": False, "message": "請提供履歷 JSON 陣列"}, 400
+
+            chunk_size = max(1, int(request.args.get("chunk_size", 500)))
+            report = bulk_import_resumes(records, chunk_size=chunk_size)
+            return {"success": report["failed"] == 0, **report}
+
         except Exception as e:
-            return {"success": False, "message": f"取得履歷資料失敗: {str(e)}"}, 400
+            db.session.rollback()
+            return {"success": False, "message": f"批次建立履歷失敗: {str(e)}"}, 400
+
+
+class BackgroundLoop:
+    """在背景執行緒執行的事件迴圈，讓同步的 Flask 請求也能使用非同步面試流程"""
+
+    def __init__(self, name="interview-loop"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+
+    def _ensure_loop(self):
+        """第一次使用時才啟動（gunicorn 預先載入後 fork 的工作程序需各自建立）"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                threading.Thread(
+                    target=self._loop.run_forever, name=self.name, daemon=True
+                ).start()
+            return self._loop
+
+    def run(self, coroutine):
+        """在背景事件迴圈執行協程，並等待結果"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+# 全域面試事件迴圈實例（同步 API 共用）
+INTERVIEW_LOOP = BackgroundLoop()
+
+# 本則訊息的評分，由回答分析處理器設定，寫入對話記錄時讀取
+TURN_SCORE = contextvars.ContextVar("turn_score", default=None)
+
+
+def _write_turn_record(turn_record):
+    """同步寫入單筆對話記錄（在執行緒池執行，不阻塞事件迴圈）"""
+    with app.app_context():
+        try:
+            failed = _insert_turns([turn_record])
+        except Exception:
+            db.session.rollback()
+            raise
+        if failed:
+            raise RuntimeError(f"對話記錄寫入失敗（id {turn_record['id']}）")
 
 
 class InterviewAPI(Resource):
-    # 類級別的靜態變數，確保狀態在請求之間保持
-    session_states = {}
+    # 類級別的靜態變數，確保狀態在請求之間保持（分段鎖容器，多執行緒安全）
+    session_states = SessionStore()
     # 用戶當前問題存儲 - 結構: {user_id: {"question": str, "standard_answer": str, "question_data": dict}}
-    user_current_questions = {}
+    user_current_questions = SessionStore()
+    # 用戶目前的面試場次 - 結構: {user_id: (session_id, 下一個 turn_index)}
+    user_sessions = SessionStore()
 
     def __init__(self):
         # 初始化狀態管理
@@ -341,24 +1165,45 @@ class InterviewAPI(Resource):
 
     def _get_user_state(self, user_id):
         """獲取用戶的當前狀態"""
-        if user_id not in InterviewAPI.session_states:
-            InterviewAPI.session_states[user_id] = InterviewState.WAITING
-        return InterviewAPI.session_states[user_id]
+        return InterviewAPI.session_states.setdefault(user_id, InterviewState.WAITING)
 
     def _set_user_state(self, user_id, state):
         """設置用戶的狀態"""
-        InterviewAPI.session_states[user_id] = state
+        InterviewAPI.session_states.set(user_id, state)
+        print(f"🔄 用戶 {user_id} 狀態變更為: {state.value}")
+
+    def _compare_and_set_user_state(self, user_id, expected_state, state):
+        """只有在狀態仍為 expected_state 時才轉換，避免併發請求互相覆蓋"""
+        if not InterviewAPI.session_states.compare_and_set(
+            user_id, expected_state, state
+        ):
+            return False
         print(f"🔄 用戶 {user_id} 狀態變更為: {state.value}")
+        return True
+
+    def _next_turn(self, user_id):
+        """配置本則訊息所屬的面試場次與序號，回傳 (session_id, turn_index)"""
+
+        def advance(current):
+            if current is None:
+                return format(allocate_turn_id(), "x"), 1
+            return current[0], current[1] + 1
+
+        session_id, next_index = InterviewAPI.user_sessions.update(user_id, advance)
+        return session_id, next_index - 1
 
     def _set_user_current_question(
         self, user_id, question, standard_answer, question_data=None
     ):
         """設置用戶當前問題"""
-        InterviewAPI.user_current_questions[user_id] = {
-            "question": question,
-            "standard_answer": standard_answer,
-            "question_data": question_data,
-        }
+        InterviewAPI.user_current_questions.set(
+            user_id,
+            {
+                "question": question,
+                "standard_answer": standard_answer,
+                "question_data": question_data,
+            },
+        )
         print(f"📝 用戶 {user_id} 當前問題已設置: {question[:50]}...")
 
     def _get_user_current_question(self, user_id):
@@ -379,10 +1224,10 @@ class InterviewAPI(Resource):
                         question_text = line.replace("問題：", "").strip()
                         break
 
-                # 由於這裡只有顯示文本，我們需要直接調用 MCP 獲取完整數據
-                from server import get_random_question as mcp_get_random_question
+                # 由於這裡只有顯示文本，我們需要直接調用面試服務獲取完整數據
+                from interview_service import get_random_question
 
-                mcp_result = mcp_get_random_question()
+                mcp_result = get_random_question()
                 if mcp_result.get("status") == "success":
                     return mcp_result["question"], mcp_result["standard_answer"]
 
@@ -395,208 +1240,124 @@ class InterviewAPI(Resource):
 
     def _transition_state(self, user_id, user_message):
         """根據用戶訊息判斷是否需要狀態轉換"""
-        lower_message = user_message.lower()
-        current_state = self._get_user_state(user_id)
-
-        # 從 WAITING 轉換到 INTRO（按下開始面試按鈕）
-        if current_state == InterviewState.WAITING:
-            start_keywords = [
-                "開始面試",
-                "開始",
-                "start_interview",
-                "開始練習",
-                "準備好了",
-                "可以開始了",
-            ]
-            if any(keyword in lower_message for keyword in start_keywords):
-                self._set_user_state(user_id, InterviewState.INTRO)
-                return True
-
-        # 從 INTRO 轉換到 INTRO_ANALYSIS（完成自我介紹）
-        elif current_state == InterviewState.INTRO:
-            intro_complete_keywords = [
-                "介紹完了",
-                "介紹完畢",
-                "自我介紹完成",
-                "就這樣",
-                "結束了",
-                "完成了",
-                "說完了",
-            ]
-            if any(keyword in lower_message for keyword in intro_complete_keywords):
-                self._set_user_state(user_id, InterviewState.INTRO_ANALYSIS)
-                return True
-
-        # 從 INTRO_ANALYSIS 自動轉換到 QUESTIONING（分析完成後）
-        elif current_state == InterviewState.INTRO_ANALYSIS:
-            # 這個轉換通常由系統自動觸發，不需要用戶訊息
-            pass
-
-        # 從 QUESTIONING 轉換到 COMPLETED（用戶要求退出）
-        elif current_state == InterviewState.QUESTIONING:
-            exit_keywords = ["退出", "結束", "完成", "不想繼續", "停止"]
-            if any(keyword in lower_message for keyword in exit_keywords):
-                self._set_user_state(user_id, InterviewState.COMPLETED)
-                return True
-
-        # 重新開始的情況
-        restart_keywords = ["重新開始", "重新來過", "重新面試", "重來"]
-        if any(keyword in lower_message for keyword in restart_keywords):
-            self._set_user_state(user_id, InterviewState.WAITING)
-            return True
-
-        return False
+        from_state, transition = INTERVIEW_FLOW.advance(self, user_id, user_message)
+        return transition is not None and transition.target != from_state
 
     def post(self):
-        """處理面試對話 - 整合狀態控制與 Fast Agent"""
+        """處理面試對話 - 整合狀態控制與 Fast Agent（同步包裝，實際流程見 handle_turn）"""
         try:
             data = request.get_json()
-            user_message = data.get("message", "")
-            user_id = data.get("user_id", "default_user")
+            return INTERVIEW_LOOP.run(
+                self.handle_turn(
+                    data.get("user_id", "default_user"),
+                    data.get("message", ""),
+                    bool(data.get("include_next_question")),
+                )
+            )
+        except Exception as e:
+            return {"success": False, "message": f"處理面試對話失敗: {str(e)}"}, 400
 
+    async def handle_turn(self, user_id, user_message, include_next_question=False):
+        """非同步面試流程：處理一則訊息並寫入對話記錄，回傳回應內容（失敗時附狀態碼）"""
+        try:
             print(f"🔍 收到用戶訊息: '{user_message}'")
             print(f"🔍 FAST_AGENT_AVAILABLE: {FAST_AGENT_AVAILABLE}")
 
-            # 獲取當前狀態
-            current_state = self._get_user_state(user_id)
-            print(f"🎯 當前狀態: {current_state.value}")
-
-            # 檢查狀態轉換
-            state_changed = self._transition_state(user_id, user_message)
-            if state_changed:
-                current_state = self._get_user_state(user_id)
-                print(f"🔄 狀態已轉換為: {current_state.value}")
+            # 訊息屬於收到當下的面試場次（重新開始的訊息仍歸入舊場次）
+            session_id, turn_index = self._next_turn(user_id)
+            TURN_SCORE.set(None)
 
             # 根據狀態選擇處理方式
-            if FAST_AGENT_AVAILABLE:
+            next_question = timings = None
+            if (
+                FAST_AGENT_AVAILABLE
+                and include_next_question
+                and self._is_answer_turn(user_id, user_message)
+            ):
+                print("✅ 同時分析回答並準備下一題")
+                (
+                    current_state,
+                    ai_response,
+                    next_question,
+                    timings,
+                ) = await self._process_answer_with_next_question(
+                    user_id, user_message
+                )
+            elif FAST_AGENT_AVAILABLE:
                 print("✅ 使用狀態控制的 Fast Agent 處理")
-                ai_response = self._process_with_state_controlled_agent(
-                    user_message, current_state
+                (
+                    current_state,
+                    ai_response,
+                ) = await self._process_with_state_controlled_agent(
+                    user_id, user_message
                 )
             else:
                 print("⚠️ 回退到狀態控制的 mock 處理")
+                self._transition_state(user_id, user_message)
+                current_state = self._get_user_state(user_id)
                 ai_response = self._generate_state_controlled_mock_response(
                     user_message, current_state
                 )
 
             print(f"📤 回應: {ai_response[:100]}...")
 
-            # 儲存對話記錄（包含狀態信息）
-            session_data = {
-                "user_message": user_message,
-                "ai_response": ai_response,
-                "current_state": current_state.value,
-                "timestamp": datetime.utcnow().isoformat(),
-            }
-
-            interview_session = InterviewSession(
-                user_id=user_id, session_data=str(session_data)
+            agent_used = (
+                "state_controlled_fast_agent"
+                if FAST_AGENT_AVAILABLE
+                else "state_controlled_mock"
             )
-            db.session.add(interview_session)
-            db.session.commit()
 
-            return {
+            # 儲存對話記錄（id 先行配置，啟用延遲寫入時不需等待提交即可回應）
+            turn_record = {
+                "id": allocate_turn_id(),
+                "session_id": session_id,
+                "user_id": str(user_id),
+                "state": current_state.value,
+                "turn_index": turn_index,
+                "score": TURN_SCORE.get(),
+                "created_at": datetime.utcnow(),
+                "payload": {
+                    "user_message": user_message,
+                    "ai_response": ai_response,
+                    "agent_used": agent_used,
+                },
+            }
+            if next_question is not None:
+                turn_record["payload"]["next_question"] = next_question
+            if turn_journal is not None:
+                turn_journal.enqueue(turn_record)
+            else:
+                await asyncio.to_thread(_write_turn_record, turn_record)
+
+            response = {
                 "success": True,
                 "response": ai_response,
-                "session_id": interview_session.id,
+                "session_id": str(turn_record["id"]),
+                "interview_session_id": session_id,
+                "turn_index": turn_index,
                 "current_state": current_state.value,
-                "agent_used": (
-                    "state_controlled_fast_agent"
-                    if FAST_AGENT_AVAILABLE
-                    else "state_controlled_mock"
-                ),
+                "agent_used": agent_used,
             }
+            if include_next_question:
+                response["next_question"] = next_question
+                response["timings"] = timings
+            return response
 
         except Exception as e:
-            db.session.rollback()
             return {"success": False, "message": f"處理面試對話失敗: {str(e)}"}, 400
 
-    def _process_with_state_controlled_agent(
-        self, user_message, current_state, interview_data=None
-    ):
-        """使用狀態控制的 Fast Agent 處理用戶訊息"""
+    async def _process_with_state_controlled_agent(self, user_id, user_message):
+        """使用狀態控制的 Fast Agent 處理用戶訊息，回傳 (處理後狀態, 回應)"""
         try:
-            print(
-                f"🔍 開始狀態控制處理: '{user_message}' (狀態: {current_state.value})"
-            )
-
-            # 根據狀態獲取系統提示詞和可用工具
-            system_prompt = get_system_prompt(current_state)
-            available_tools = get_available_tools(current_state)
-
-            print(f"🎯 系統提示詞: {system_prompt[:100]}...")
-            print(f"🛠️ 可用工具: {available_tools}")
-
-            # 檢查是否有面試數據且用戶要求退出/總結（任何狀態下都可以）
-            lower_message = user_message.lower()
-            exit_keywords = ["退出", "結束", "完成", "不想繼續", "停止"]
-            if interview_data and any(
-                keyword in lower_message for keyword in exit_keywords
-            ):
-                # 強制進入完成狀態並生成總結
-                user_id = "default_user"
-                self._set_user_state(user_id, InterviewState.COMPLETED)
-                return self._process_completed_state(
-                    user_message, system_prompt, interview_data
-                )
-
-            # 根據狀態選擇處理策略
-            if current_state == InterviewState.WAITING:
-                return self._process_waiting_state(user_message, system_prompt)
-            elif current_state == InterviewState.INTRO:
-                return self._process_intro_state(user_message, system_prompt)
-            elif current_state == InterviewState.INTRO_ANALYSIS:
-                return self._process_intro_analysis_state(user_message, system_prompt)
-            elif current_state == InterviewState.QUESTIONING:
-                return self._process_questioning_state(user_message, system_prompt)
-            elif current_state == InterviewState.COMPLETED:
-                return self._process_completed_state(
-                    user_message, system_prompt, interview_data
-                )
-            else:
-                return self._default_response(user_message)
-
+            print(f"🔍 開始狀態控制處理: '{user_message}' (用戶: {user_id})")
+            return await INTERVIEW_FLOW.dispatch_async(self, user_id, user_message)
         except Exception as e:
             print(f"❌ 狀態控制處理失敗: {e}")
-            return f"處理失敗: {str(e)}"
+            return self._get_user_state(user_id), f"處理失敗: {str(e)}"
 
-    def _process_waiting_state(self, user_message, system_prompt):
+    def _process_waiting_state(self, user_id, user_message, system_prompt):
         """處理等待開始階段的訊息"""
-        try:
-            # 檢查是否為開始面試的關鍵字
-            lower_message = user_message.lower()
-            start_keywords = [
-                "開始面試",
-                "開始",
-                "start_interview",
-                "開始練習",
-                "準備好了",
-                "可以開始了",
-            ]
-
-            if any(keyword in lower_message for keyword in start_keywords):
-                return """
-🎯 面試開始！
-
-歡迎參加智能面試系統！接下來我們將進行以下流程：
-
-1️⃣ **自我介紹階段**：請進行完整的自我介紹
-2️⃣ **自我介紹分析**：我會分析您的介紹並給出建議  
-3️⃣ **面試問答**：進行技術或行為面試問題
-4️⃣ **總結建議**：給出最終的面試表現總結
-
-現在請開始您的自我介紹。請盡量包含以下要素：
-- 開場簡介（身份與專業定位）
-- 學經歷概述  
-- 核心技能與強項
-- 代表成果
-- 與職缺的連結
-- 結語與期待
-
-請開始您的自我介紹：
-                """
-            else:
-                return f"""
+        return f"""
 👋 您好！歡迎使用智能面試系統！
 
 我是您的AI面試官，準備為您提供專業的模擬面試體驗。
@@ -610,20 +1371,11 @@ class InterviewAPI(Resource):
 
 您說：「{user_message}」
                 """
-        except Exception as e:
-            return f"處理等待階段訊息失敗: {str(e)}"
-
-    def _process_intro_state(self, user_message, system_prompt):
-        """處理自我介紹階段的訊息"""
-        try:
-            lower_message = user_message.lower()
-
-            # 特殊處理：如果是「開始面試」訊息，返回歡迎和指導訊息
-            start_keywords = ["開始面試", "start_interview"]
-            if any(keyword in lower_message for keyword in start_keywords):
-                # 不清除自我介紹內容，因為用戶可能已經開始介紹了
 
-                return """
+    def _process_interview_start(self, user_id, user_message, system_prompt):
+        """處理開始面試的訊息 - 返回歡迎和指導訊息"""
+        # 不清除自我介紹內容，因為用戶可能已經開始介紹了
+        return """
 🎯 面試開始！
 
 歡迎參加智能面試系統！接下來我們將進行以下流程：
@@ -644,26 +1396,12 @@ class InterviewAPI(Resource):
 請開始您的自我介紹：
                 """
 
-            # 檢查是否為結束自我介紹的關鍵字
-            intro_end_keywords = [
-                "介紹完了",
-                "介紹完畢",
-                "自我介紹完成",
-                "就這樣",
-                "結束了",
-                "完成了",
-                "說完了",
-                "介紹結束",
-            ]
-            if any(keyword in lower_message for keyword in intro_end_keywords):
-                # 觸發狀態轉換到自我介紹分析階段
-                user_id = "default_user"  # 這裡應該從請求中獲取
-                self._set_user_state(user_id, InterviewState.INTRO_ANALYSIS)
-                # 直接調用分析階段的處理
-                return self._process_intro_analysis_state(user_message, system_prompt)
+    def _process_intro_state(self, user_id, user_message, system_prompt):
+        """處理自我介紹階段的訊息"""
+        try:
             # 不論內容為何都呼叫 intro_collector
             result = call_fast_agent_function(
-                "intro_collector", user_message=user_message
+                "intro_collector", user_message=user_message, user_id=user_id
             )
             if result.get("success"):
                 return "✅ 已記錄您的自我介紹內容。請繼續介紹，或說「介紹完了」來開始面試。"
@@ -672,45 +1410,36 @@ class InterviewAPI(Resource):
         except Exception as e:
             return f"處理自我介紹失敗: {str(e)}"
 
-    def _process_questioning_state(self, user_message, system_prompt):
-        """處理面試提問階段的訊息"""
+    def _process_question_request(self, user_id, user_message, system_prompt):
+        """處理前端自動發出的「請給我問題」請求"""
         try:
-            lower_message = user_message.lower()
-
-            # 檢查是否為退出關鍵字
-            exit_keywords = ["退出", "結束", "完成", "不想繼續", "停止"]
-            if any(keyword in lower_message for keyword in exit_keywords):
-                # 用戶要求退出，轉換到完成階段
-                user_id = "default_user"  # 這裡應該從請求中獲取
-                self._set_user_state(user_id, InterviewState.COMPLETED)
-                return self._process_completed_state(user_message, system_prompt, None)
+            # 清除舊的問題數據，為新問題做準備
+            print(f"🔄 清除用戶 {user_id} 的舊問題數據，準備新問題")
 
-            # 檢查是否為自動請求問題（前端發出的精確請求）
-            if user_message.strip() == "請給我問題":
-                # 前端自動請求下一題 - 需要先檢查是否有待分析的答案
-                user_id = "default_user"  # 這裡應該從請求中獲取
+            result = call_fast_agent_function("get_question", user_id=user_id)
+            return self._apply_question_result(user_id, result)
+        except Exception as e:
+            return f"處理面試回答失敗: {str(e)}"
 
-                # 清除舊的問題數據，為新問題做準備
-                print(f"🔄 清除用戶 {user_id} 的舊問題數據，準備新問題")
+    def _apply_question_result(self, user_id, result):
+        """將取得的問題設為用戶當前問題，回傳顯示給用戶的內容"""
+        if not result.get("success"):
+            return f"獲取問題失敗: {result.get('error', '未知錯誤')}"
 
-                result = call_fast_agent_function("get_question")
-                if result.get("success"):
-                    # 從新的問題數據結構中獲取信息
-                    question_data = result.get("question_data", {})
-                    question_text = question_data.get("question", "問題獲取失敗")
-                    standard_answer = question_data.get(
-                        "standard_answer", "標準答案未提供"
-                    )
+        # 從新的問題數據結構中獲取信息
+        question_data = result.get("question_data", {})
+        question_text = question_data.get("question", "問題獲取失敗")
+        standard_answer = question_data.get("standard_answer", "標準答案未提供")
 
-                    # 存儲當前問題數據，包含完整的問題信息
-                    self._set_user_current_question(
-                        user_id, question_text, standard_answer, question_data
-                    )
+        # 存儲當前問題數據，包含完整的問題信息
+        self._set_user_current_question(
+            user_id, question_text, standard_answer, question_data
+        )
 
-                    print(f"✅ 新問題已設置: {question_text[:50]}...")
-                    print(f"📝 標準答案已設置: {standard_answer[:50]}...")
+        print(f"✅ 新問題已設置: {question_text[:50]}...")
+        print(f"📝 標準答案已設置: {standard_answer[:50]}...")
 
-                    return f"""
+        return f"""
 🎯 **面試問題**
 
 {result["result"]}
@@ -718,71 +1447,128 @@ class InterviewAPI(Resource):
 ---
 
 💡 **提示**: 請仔細回答上述問題。除非您說「退出」，否則我們會在您回答後繼續下一題。
-                    """
-                else:
-                    return f"獲取問題失敗: {result.get('error', '未知錯誤')}"
-            else:
-                # 用戶的回答，使用 analyze_answer 工具分析
-                user_id = "default_user"  # 這裡應該從請求中獲取
-                current_question_data = self._get_user_current_question(user_id)
+                """
 
-                if current_question_data:
-                    print(
-                        f"📊 分析用戶回答對應問題: {current_question_data['question'][:50]}..."
-                    )
+    def _is_answer_turn(self, user_id, user_message):
+        """判斷此訊息是否為面試問答階段的回答（不會觸發狀態轉換）"""
+        state = self._get_user_state(user_id)
+        return (
+            state == InterviewState.QUESTIONING
+            and INTERVIEW_FLOW.match(state, user_message.strip().lower()) is None
+        )
 
-                    # 傳遞完整的問題上下文
-                    result = call_fast_agent_function(
-                        "analyze_answer",
-                        user_answer=user_message,
-                        question=current_question_data["question"],
-                        standard_answer=current_question_data["standard_answer"],
-                    )
+    async def _process_answer_with_next_question(self, user_id, user_message):
+        """同時分析回答並選出下一題，回傳 (處理後狀態, 分析回應, 下一題, 各步驟耗時)"""
+        started = time.perf_counter()
+
+        async def fetch_next_question():
+            fetch_started = time.perf_counter()
+            # 題目確定採用後才記錄為已出題
+            result = await call_fast_agent_function_async(
+                "get_question", user_id=user_id, record=False
+            )
+            return result, time.perf_counter() - fetch_started
+
+        # 下一題在另一個工作中取得；分析在目前的工作進行（評分寫入 TURN_SCORE）
+        next_task = asyncio.create_task(fetch_next_question())
+        current_state, ai_response = await self._process_with_state_controlled_agent(
+            user_id, user_message
+        )
+        analysis_seconds = time.perf_counter() - started
+
+        try:
+            next_result, next_seconds = await next_task
+        except Exception as e:
+            next_result, next_seconds = {"success": False, "error": str(e)}, 0.0
+
+        # 分析已讀取過當前問題，此時才替換為下一題；取得失敗時回傳 None，
+        # 前端會改為自行請求下一題
+        next_question = None
+        if not next_result.get("success"):
+            print(f"⚠️ 取得下一題失敗: {next_result.get('error', '未知錯誤')}")
+        elif current_state == InterviewState.QUESTIONING:
+            next_question = self._apply_question_result(user_id, next_result)
+            call_fast_agent_function(
+                "record_served_question",
+                user_id=user_id,
+                question_result=next_result,
+            )
+
+        timings = {
+            "analysis_ms": round(analysis_seconds * 1000, 1),
+            "next_question_ms": round(next_seconds * 1000, 1),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return current_state, ai_response, next_question, timings
+
+    async def _process_questioning_state(self, user_id, user_message, system_prompt):
+        """處理面試提問階段的訊息 - 用戶的回答，使用 analyze_answer 工具分析"""
+        try:
+            current_question_data = self._get_user_current_question(user_id)
+
+            if current_question_data:
+                print(
+                    f"📊 分析用戶回答對應問題: {current_question_data['question'][:50]}..."
+                )
 
-                    if result.get("success"):
-                        # 分析成功後，保持問題數據直到下一題被請求
-                        print(f"✅ 答案分析完成，問題數據保持不變")
+                # 傳遞完整的問題上下文，評分由橋接模組記錄到評分帳本
+                question_data = current_question_data.get("question_data") or {}
+                result = await call_fast_agent_function_async(
+                    "analyze_answer",
+                    user_answer=user_message,
+                    question=current_question_data["question"],
+                    standard_answer=current_question_data["standard_answer"],
+                    user_id=user_id,
+                    question_id=question_data.get("question_id"),
+                    category=question_data.get("category"),
+                )
+
+                if result.get("success"):
+                    TURN_SCORE.set(result.get("score"))
+                    # 分析成功後，保持問題數據直到下一題被請求
+                    print(f"✅ 答案分析完成，問題數據保持不變")
 
-                        response = f"""
+                    response = f"""
 {result["result"]}
 
 ---
 
 💡 **提示**: 請等待系統準備下一題...
-                        """
-                        return response
-                    else:
-                        return f"分析回答失敗: {result.get('error', '未知錯誤')}"
+                    """
+                    return response
                 else:
-                    # 沒有當前問題數據，嘗試進行基礎分析
-                    print(f"⚠️ 警告：沒有找到對應的問題數據，進行基礎分析")
-                    result = call_fast_agent_function(
-                        "analyze_answer", user_answer=user_message
-                    )
+                    return f"分析回答失敗: {result.get('error', '未知錯誤')}"
+            else:
+                # 沒有當前問題數據，嘗試進行基礎分析
+                print(f"⚠️ 警告：沒有找到對應的問題數據，進行基礎分析")
+                result = await call_fast_agent_function_async(
+                    "analyze_answer", user_answer=user_message, user_id=user_id
+                )
 
-                    if result.get("success"):
-                        response = f"""
+                if result.get("success"):
+                    TURN_SCORE.set(result.get("score"))
+                    response = f"""
 {result["result"]}
 
 ---
 
 ⚠️ **注意**: 無法找到對應的問題，這可能導致分析不夠準確。
 💡 **提示**: 請等待系統準備下一題...
-                        """
-                        return response
-                    else:
-                        return f"分析回答失敗: {result.get('error', '未知錯誤')}"
+                    """
+                    return response
+                else:
+                    return f"分析回答失敗: {result.get('error', '未知錯誤')}"
 
         except Exception as e:
             return f"處理面試回答失敗: {str(e)}"
 
-    def _process_intro_analysis_state(self, user_message, system_prompt):
+    async def _process_intro_analysis_state(self, user_id, user_message, system_prompt):
         """處理自我介紹分析階段"""
         try:
             # 獲取收集到的完整自我介紹內容
             from fast_agent_bridge import get_collected_intro
 
-            collected_intro = get_collected_intro("default_user")
+            collected_intro = get_collected_intro(user_id)
 
             # 如果沒有收集到內容，使用當前訊息
             intro_content = collected_intro if collected_intro else user_message
@@ -790,13 +1576,16 @@ class InterviewAPI(Resource):
             print(f"📊 準備分析自我介紹: {intro_content[:100]}...")
 
             # 分析完整的自我介紹內容
-            result = call_fast_agent_function(
-                "analyze_intro", user_message=intro_content
+            result = await call_fast_agent_function_async(
+                "analyze_intro", user_message=intro_content, user_id=user_id
             )
             if result.get("success"):
                 # 分析完成後自動轉換到面試階段
-                user_id = "default_user"  # 這裡應該從請求中獲取
-                self._set_user_state(user_id, InterviewState.QUESTIONING)
+                self._compare_and_set_user_state(
+                    user_id, InterviewState.INTRO_ANALYSIS, InterviewState.QUESTIONING
+                )
+                # 用戶閱讀分析結果時，背景先準備第一題
+                call_fast_agent_function("prefetch_question", user_id=user_id)
 
                 # 只返回分析結果，不包含面試問題
                 return f"""
@@ -815,20 +1604,12 @@ class InterviewAPI(Resource):
         except Exception as e:
             return f"處理自我介紹分析失敗: {str(e)}"
 
-    def _process_completed_state(
-        self, user_message, system_prompt, interview_data=None
-    ):
-        """處理面試完成階段"""
-        try:
-            lower_message = user_message.lower()
-
-            # 檢查是否為重新開始的請求
-            restart_keywords = ["重新開始", "再來一次", "重新面試", "開始新的面試"]
-            if any(keyword in lower_message for keyword in restart_keywords):
-                # 重置狀態到等待階段
-                user_id = "default_user"
-                self._set_user_state(user_id, InterviewState.WAITING)
-                return """
+    def _process_restart(self, user_id, user_message, system_prompt):
+        """處理重新開始的請求"""
+        # 下一則訊息開始新的面試場次，並清除上一場的自我介紹與評分
+        InterviewAPI.user_sessions.pop(user_id)
+        call_fast_agent_function("reset_interview", user_id=user_id)
+        return """
 🔄 **重新開始面試**
 
 系統已重置，歡迎再次使用智能面試系統！
@@ -836,18 +1617,19 @@ class InterviewAPI(Resource):
 請點擊「開始面試」或輸入「開始面試」來開始新的面試流程。
                 """
 
-            # 如果面試已經完成，不要重複生成總結
-            # 檢查是否是第一次進入完成階段（通過檢查用戶訊息是否為退出相關）
-            exit_keywords = ["退出", "結束", "完成", "不想繼續", "停止"]
-            if any(keyword in lower_message for keyword in exit_keywords):
-                # 第一次進入完成階段，生成總結
-                result = call_fast_agent_function(
-                    "generate_final_summary",
-                    user_message=user_message,
-                    interview_data=interview_data,
-                )
-                if result.get("success"):
-                    return f"""
+    def _process_final_summary(
+        self, user_id, user_message, system_prompt, interview_data=None
+    ):
+        """處理退出請求 - 生成面試總結"""
+        try:
+            result = call_fast_agent_function(
+                "generate_final_summary",
+                user_message=user_message,
+                interview_data=interview_data,
+                user_id=user_id,
+            )
+            if result.get("success"):
+                return f"""
 🎉 **面試完成！**
 
 {result["result"]}
@@ -857,9 +1639,9 @@ class InterviewAPI(Resource):
 感謝您參與本次模擬面試！希望這次經驗對您的求職之路有所幫助。
 
 如需重新開始，請說「重新開始」。
-                    """
-                else:
-                    return f"""
+                """
+            else:
+                return f"""
 🎉 **面試完成！**
 
 感謝您參與本次智能面試系統的模擬面試！
@@ -870,10 +1652,13 @@ class InterviewAPI(Resource):
 3. 多進行模擬面試練習
 
 如需重新開始，請說「重新開始」。
-                    """
-            else:
-                # 面試已經完成，提示用戶選項
-                return """
+                """
+        except Exception as e:
+            return f"處理面試完成階段失敗: {str(e)}"
+
+    def _process_completed_state(self, user_id, user_message, system_prompt):
+        """處理面試完成階段 - 面試已經完成，提示用戶選項"""
+        return """
 ✅ **面試已完成**
 
 您的面試總結已經生成完畢。
@@ -885,9 +1670,6 @@ class InterviewAPI(Resource):
 如需重新開始面試，請說「重新開始」。
                 """
 
-        except Exception as e:
-            return f"處理面試完成階段失敗: {str(e)}"
-
     def _get_first_question(self):
         """獲取第一個面試問題"""
         try:
@@ -1511,6 +2293,288 @@ class InterviewAPI(Resource):
             return random.choice(mock_responses)
 
 
+# 面試流程狀態機：狀態、轉換、守衛條件與處理器集中宣告於此
+INTERVIEW_FLOW = InterviewFlow(
+    {
+        InterviewState.WAITING: StateSpec(
+            STATE_PROMPTS[InterviewState.WAITING],
+            STATE_TOOLS[InterviewState.WAITING],
+            handler=InterviewAPI._process_waiting_state,
+            transitions=[
+                Transition(
+                    START_MATCHER,
+                    InterviewState.INTRO,
+                    InterviewAPI._process_interview_start,
+                ),
+            ],
+        ),
+        InterviewState.INTRO: StateSpec(
+            STATE_PROMPTS[InterviewState.INTRO],
+            STATE_TOOLS[InterviewState.INTRO],
+            handler=InterviewAPI._process_intro_state,
+            transitions=[
+                Transition(
+                    START_ANNOUNCE_MATCHER,
+                    InterviewState.INTRO,
+                    InterviewAPI._process_interview_start,
+                ),
+                Transition(INTRO_DONE_MATCHER, InterviewState.INTRO_ANALYSIS),
+            ],
+        ),
+        InterviewState.INTRO_ANALYSIS: StateSpec(
+            STATE_PROMPTS[InterviewState.INTRO_ANALYSIS],
+            STATE_TOOLS[InterviewState.INTRO_ANALYSIS],
+            handler=InterviewAPI._process_intro_analysis_state,
+        ),
+        InterviewState.QUESTIONING: StateSpec(
+            STATE_PROMPTS[InterviewState.QUESTIONING],
+            STATE_TOOLS[InterviewState.QUESTIONING],
+            handler=InterviewAPI._process_questioning_state,
+            transitions=[
+                Transition(
+                    EXIT_MATCHER,
+                    InterviewState.COMPLETED,
+                    InterviewAPI._process_final_summary,
+                ),
+                Transition(
+                    QUESTION_REQUEST_MATCHER,
+                    InterviewState.QUESTIONING,
+                    InterviewAPI._process_question_request,
+                ),
+            ],
+        ),
+        InterviewState.COMPLETED: StateSpec(
+            STATE_PROMPTS[InterviewState.COMPLETED],
+            STATE_TOOLS[InterviewState.COMPLETED],
+            handler=InterviewAPI._process_completed_state,
+            transitions=[
+                Transition(
+                    EXIT_MATCHER,
+                    InterviewState.COMPLETED,
+                    InterviewAPI._process_final_summary,
+                ),
+            ],
+        ),
+    },
+    global_transitions=[
+        Transition(
+            RESTART_MATCHER, InterviewState.WAITING, InterviewAPI._process_restart
+        ),
+    ],
+)
+
+
+class InterviewFlowMetricsAPI(Resource):
+    def get(self):
+        """取得面試狀態機的轉換計數與耗時"""
+        return {
+            "success": True,
+            "transitions": INTERVIEW_FLOW.stats(),
+            "journal": turn_journal.stats() if turn_journal is not None else None,
+        }
+
+
+# 對話歷史查詢：可選欄位、分頁上限與串流批次大小
+HISTORY_FIELDS = (
+    "id",
+    "session_id",
+    "user_id",
+    "state",
+    "turn_index",
+    "score",
+    "created_at",
+    "payload",
+)
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 500
+HISTORY_STREAM_BATCH = 500
+
+
+def _parse_datetime_arg(name):
+    """解析 ISO 格式的時間查詢參數"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"{name} 必須是 ISO 格式時間: {value}") from e
+
+
+def _parse_limit_arg(default=HISTORY_DEFAULT_LIMIT, maximum=HISTORY_MAX_LIMIT):
+    """解析分頁大小，限制在 1 ~ maximum"""
+    try:
+        limit = int(request.args.get("limit", default))
+    except ValueError as e:
+        raise ValueError("limit 必須是整數") from e
+    return max(1, min(limit, maximum))
+
+
+def _parse_fields_arg(required):
+    """解析 fields 參數，回傳要查詢的欄位名稱（一律包含分頁所需欄位）"""
+    fields = request.args.get("fields")
+    if not fields:
+        return list(HISTORY_FIELDS)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in HISTORY_FIELDS]
+    if unknown:
+        raise ValueError(f"不支援的欄位: {', '.join(unknown)}")
+    for field in required:
+        if field not in selected:
+            selected.append(field)
+    return selected
+
+
+def _serialize_turn_row(row, fields):
+    """將查詢結果列轉換為 JSON 可序列化的字典"""
+    item = {}
+    for field in fields:
+        value = getattr(row, field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif field == "id":
+            # 對話記錄 id 超過 2^53，以字串輸出避免前端失去精度（同 allocate_turn_id）
+            value = str(value)
+        item[field] = value
+    return item
+
+
+def _stream_ndjson(statement, fields):
+    """以 NDJSON 串流查詢結果，伺服器端游標分批讀取，不會一次載入所有列"""
+
+    def generate():
+        result = db.session.execute(
+            statement.execution_options(yield_per=HISTORY_STREAM_BATCH)
+        )
+        for row in result:
+            yield json.dumps(
+                _serialize_turn_row(row, fields), ensure_ascii=False
+            ) + "\n"
+
+    return Response(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+
+
+class InterviewHistoryAPI(Resource):
+    def get(self):
+        """查詢用戶對話歷史 - 依 (user_id, created_at, id) 游標分頁"""
+        try:
+            user_id = request.args.get("user_id")
+            if not user_id:
+                return {"success": False, "message": "缺少 user_id 參數"}, 400
+
+            fields = _parse_fields_arg(required=("id", "created_at"))
+            since = _parse_datetime_arg("since")
+            until = _parse_datetime_arg("until")
+            descending = request.args.get("order", "asc").lower() == "desc"
+
+            columns = [getattr(InterviewTurn, field) for field in fields]
+            statement = select(*columns).where(InterviewTurn.user_id == user_id)
+
+            states = request.args.get("state")
+            if states:
+                statement = statement.where(
+                    InterviewTurn.state.in_(
+                        [state.strip() for state in states.split(",") if state.strip()]
+                    )
+                )
+            if since:
+                statement = statement.where(InterviewTurn.created_at >= since)
+            if until:
+                statement = statement.where(InterviewTurn.created_at < until)
+
+            sort_key = tuple_(InterviewTurn.created_at, InterviewTurn.id)
+            if descending:
+                statement = statement.order_by(
+                    InterviewTurn.created_at.desc(), InterviewTurn.id.desc()
+                )
+            else:
+                statement = statement.order_by(
+                    InterviewTurn.created_at, InterviewTurn.id
+                )
+
+            # 匯出全部記錄時改用串流，不分頁
+            if request.args.get("format") == "ndjson":
+                return _stream_ndjson(statement, fields)
+
+            cursor = request.args.get("cursor")
+            if cursor:
+                created_at, turn_id = _decode_cursor(cursor)
+                position = (datetime.fromisoformat(created_at), int(turn_id))
+                statement = statement.where(
+                    sort_key < position if descending else sort_key > position
+                )
+
+            limit = _parse_limit_arg()
+            rows = db.session.execute(statement.limit(limit + 1)).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                next_cursor = _encode_cursor(last.created_at.isoformat(), last.id)
+
+            return {
+                "success": True,
+                "turns": [_serialize_turn_row(row, fields) for row in rows],
+                "next_cursor": next_cursor,
+                "has_more": has_more,
+            }
+
+        except ValueError as e:
+            return {"success": False, "message": str(e)}, 400
+        except Exception as e:
+            return {"success": False, "message": f"查詢對話歷史失敗: {str(e)}"}, 500
+
+
+class InterviewTranscriptAPI(Resource):
+    def get(self, session_id):
+        """取得單場面試的完整逐字稿 - 依 (session_id, turn_index) 游標分頁"""
+        try:
+            fields = _parse_fields_arg(required=("id", "turn_index"))
+            columns = [getattr(InterviewTurn, field) for field in fields]
+            statement = (
+                select(*columns)
+                .where(InterviewTurn.session_id == session_id)
+                .order_by(InterviewTurn.turn_index, InterviewTurn.id)
+            )
+
+            if request.args.get("format") == "ndjson":
+                return _stream_ndjson(statement, fields)
+
+            cursor = request.args.get("cursor")
+            if cursor:
+                turn_index, turn_id = _decode_cursor(cursor)
+                statement = statement.where(
+                    tuple_(InterviewTurn.turn_index, InterviewTurn.id)
+                    > (int(turn_index), int(turn_id))
+                )
+
+            limit = _parse_limit_arg()
+            rows = db.session.execute(statement.limit(limit + 1)).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            return {
+                "success": True,
+                "session_id": session_id,
+                "turns": [_serialize_turn_row(row, fields) for row in rows],
+                "next_cursor": (
+                    _encode_cursor(rows[-1].turn_index, rows[-1].id)
+                    if has_more
+                    else None
+                ),
+                "has_more": has_more,
+            }
+
+        except ValueError as e:
+            return {"success": False, "message": str(e)}, 400
+        except Exception as e:
+            return {"success": False, "message": f"查詢逐字稿失敗: {str(e)}"}, 500
+
+
 # 新增 Fast Agent API 端點
 class FastAgentAPI(Resource):
     def post(self):
@@ -1526,17 +2590,29 @@ class FastAgentAPI(Resource):
             # 調用 Fast Agent 函數
             result = call_fast_agent_function(function_name, **arguments)
 
-            return {
+            response = {
                 "success": result.get("success", False),
                 "result": result.get("result", ""),
                 "error": result.get("error", ""),
                 "agent": "fast_agent",
             }
+            # 批次抽題另外回傳結構化的題目清單
+            if "questions" in result:
+                response["questions"] = result["questions"]
+            return response
 
         except Exception as e:
             return {"success": False, "message": f"Fast Agent API 失敗: {str(e)}"}, 400
 
 
+class FastAgentMetricsAPI(Resource):
+    def get(self):
+        """取得各 Fast Agent 函數的呼叫次數、錯誤次數與延遲分佈"""
+        if not FAST_AGENT_AVAILABLE:
+            return {"success": False, "message": "Fast Agent 橋接模組不可用"}, 503
+        return {"success": True, **fast_agent_registry.metrics()}
+
+
 class FileUploadAPI(Resource):
     def post(self):
         """處理檔案上傳 (履歷檔案)"""
@@ -1905,8 +2981,15 @@ class SpeechAPI(Resource):
 
 # 註冊API路由
 api.add_resource(UserAPI, "/api/users", "/api/users/<int:user_id>")
+api.add_resource(UserBulkAPI, "/api/users/bulk")
 api.add_resource(InterviewAPI, "/api/interview")
+api.add_resource(InterviewFlowMetricsAPI, "/api/interview/metrics")
+api.add_resource(InterviewHistoryAPI, "/api/interview/history")
+api.add_resource(
+    InterviewTranscriptAPI, "/api/interview/history/<string:session_id>"
+)
 api.add_resource(FastAgentAPI, "/api/fast-agent")  # 新增 Fast Agent API
+api.add_resource(FastAgentMetricsAPI, "/api/fast-agent/metrics")
 api.add_resource(FileUploadAPI, "/api/upload")
 api.add_resource(AvatarAPI, "/api/avatar/control")  # 虛擬人控制
 api.add_resource(TTSEngine, "/api/tts/generate")  # 文字轉語音
@@ -1938,4 +3021,5 @@ def test():
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
+    warm_up_fast_agent()
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -0,0 +1,324 @@
+"""
+虛擬面試顧問 - 非同步入口（ASGI）
+使用方式: uvicorn asgi:application --app-dir virtual_interviewer（或 python run.py --asgi）
+
+面試對話在單一事件迴圈上處理：等待 LLM 回應的請求不佔用執行緒，
+同一個程序可同時保持數千個進行中的面試請求。其餘路由（頁面、靜態檔案、
+/api/fast-agent、/api/users 等）轉交 Flask 應用程式在執行緒池中處理，
+因此本程序可單獨提供完整的網站，前端不需要區分兩個伺服器。
+
+面試狀態、評分帳本與預取題目保存在程序記憶體中，本程序與 Gunicorn（app:app）各有一份，
+只有資料庫中的對話記錄表是共用的。兩者是擇一部署的入口：所有流量必須送往同一個伺服器，
+同時對兩者發送會把同一場面試拆成兩份狀態。
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import (
+    INTERVIEW_FLOW,
+    FastAgentMetricsAPI,
+    InterviewAPI,
+    app,
+    db,
+    turn_journal,
+    warm_up_fast_agent,
+)
+
+# 單一請求主體的上限（位元組）
+MAX_REQUEST_BYTES = int(os.environ.get("INTERVIEWER_MAX_REQUEST_BYTES", 1024 * 1024))
+# 轉交 Flask 的請求主體上限（檔案與語音上傳）；超過 1 MB 的部分暫存於磁碟
+MAX_UPLOAD_BYTES = int(
+    os.environ.get("INTERVIEWER_MAX_UPLOAD_BYTES", 32 * 1024 * 1024)
+)
+# Flask 回應在佇列中等待送出的區塊數上限，避免大型回應整份留在記憶體
+WSGI_QUEUE_CHUNKS = 16
+# 同步步驟（資料庫查詢、題目抽選）使用的執行緒數；LLM 呼叫不佔用執行緒
+ASYNC_THREADS = int(os.environ.get("INTERVIEWER_ASYNC_THREADS", "32"))
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+    (b"access-control-allow-headers", b"Content-Type"),
+]
+
+
+class RequestError(Exception):
+    """請求格式錯誤，附帶 HTTP 狀態碼"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ClientDisconnected(Exception):
+    """用戶端已中斷，停止產生 Flask 回應"""
+
+
+class InterviewASGIApp:
+    """不依賴框架的 ASGI 應用程式：面試對話與監控端點非同步處理，其餘轉交 Flask"""
+
+    def __init__(self):
+        self.interview_api = InterviewAPI()
+        self.in_flight = 0
+        self.handled = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        """啟動時建立資料庫表格並設定執行緒池，關閉時寫出尚未寫入的對話記錄"""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    asyncio.get_running_loop().set_default_executor(
+                        ThreadPoolExecutor(
+                            max_workers=ASYNC_THREADS,
+                            thread_name_prefix="interview-step",
+                        )
+                    )
+                    await asyncio.to_thread(self._create_database)
+                    warm_up_fast_agent()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                print("✅ 非同步面試 API 已啟動")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if turn_journal is not None:
+                    await asyncio.to_thread(turn_journal.flush)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _create_database(self):
+        with app.app_context():
+            db.create_all()
+
+    async def _http(self, scope, receive, send):
+        method = scope["method"]
+        path = scope["path"].rstrip("/") or "/"
+        try:
+            if method == "OPTIONS":
+                await self._send(send, 204, None)
+            elif path == "/api/interview" and method == "POST":
+                await self._interview(receive, send)
+            elif path == "/api/interview/metrics" and method == "GET":
+                await self._send_json(
+                    send,
+                    200,
+                    {
+                        "success": True,
+                        "transitions": INTERVIEW_FLOW.stats(),
+                        "journal": (
+                            turn_journal.stats() if turn_journal is not None else None
+                        ),
+                        "in_flight": self.in_flight,
+                        "handled": self.handled,
+                    },
+                )
+            elif path == "/api/fast-agent/metrics" and method == "GET":
+                result = FastAgentMetricsAPI().get()
+                body, status = result if isinstance(result, tuple) else (result, 200)
+                await self._send_json(send, status, body)
+            elif path == "/health" and method == "GET":
+                await self._send_json(
+                    send, 200, {"status": "ok", "in_flight": self.in_flight}
+                )
+            else:
+                await self._wsgi(scope, receive, send)
+        except RequestError as e:
+            await self._send_json(send, e.status, {"success": False, "message": str(e)})
+
+    async def _interview(self, receive, send):
+        """POST /api/interview - 與 Flask 版本相同的請求與回應格式"""
+        data = await self._read_json(receive)
+        self.in_flight += 1
+        try:
+            result = await self.interview_api.handle_turn(
+                data.get("user_id", "default_user"),
+                data.get("message", ""),
+                bool(data.get("include_next_question")),
+            )
+        finally:
+            self.in_flight -= 1
+            self.handled += 1
+
+        body, status = result if isinstance(result, tuple) else (result, 200)
+        await self._send_json(send, status, body)
+
+    async def _wsgi(self, scope, receive, send):
+        """在執行緒池中執行 Flask 應用程式，回應區塊依序轉送（支援串流回應）"""
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_REQUEST_BYTES)
+        try:
+            size = await self._read_body(receive, body, MAX_UPLOAD_BYTES)
+            body.seek(0)
+            environ = self._wsgi_environ(scope, body, size)
+            loop = asyncio.get_running_loop()
+            queue = asyncio.Queue(maxsize=WSGI_QUEUE_CHUNKS)
+            aborted = threading.Event()
+            worker = loop.run_in_executor(
+                None, self._run_wsgi, environ, loop, queue, aborted
+            )
+            try:
+                while True:
+                    message = await queue.get()
+                    if message is None:
+                        break
+                    await send(message)
+            finally:
+                # 用戶端中斷時通知執行緒停止產生回應，並清空佇列讓它不再阻塞
+                aborted.set()
+                while not queue.empty():
+                    queue.get_nowait()
+                await worker
+        finally:
+            body.close()
+
+    @staticmethod
+    def _run_wsgi(environ, loop, queue, aborted):
+        """（執行緒中）呼叫 Flask，將回應轉為 ASGI 訊息放入佇列"""
+        response = {"start": None, "sent": False}
+
+        def put(message):
+            if aborted.is_set():
+                raise ClientDisconnected()
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        def write(data):
+            if not response["sent"]:
+                response["sent"] = True
+                put(response["start"])
+            if data:
+                put({"type": "http.response.body", "body": data, "more_body": True})
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and response["sent"]:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["start"] = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [
+                    (name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in headers
+                ],
+            }
+            return write
+
+        try:
+            result = app.wsgi_app(environ, start_response)
+            try:
+                for chunk in result:
+                    if chunk:
+                        write(chunk)
+                write(b"")
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+            put({"type": "http.response.body", "body": b""})
+        except ClientDisconnected:
+            pass
+        except Exception as e:
+            print(f"❌ Flask 請求處理失敗: {e}")
+            if not response["sent"] and not aborted.is_set():
+                body = json.dumps(
+                    {"success": False, "message": "伺服器內部錯誤"}, ensure_ascii=False
+                ).encode("utf-8")
+                response["start"] = {
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": [
+                        (b"content-type", b"application/json; charset=utf-8"),
+                        (b"content-length", str(len(body)).encode()),
+                    ],
+                }
+                write(body)
+                put({"type": "http.response.body", "body": b""})
+        finally:
+            if not aborted.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+
+    @staticmethod
+    def _wsgi_environ(scope, body, size):
+        """由 ASGI scope 建立 WSGI environ"""
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client")
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+            "PATH_INFO": scope["path"].encode().decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": str(server[0]),
+            "SERVER_PORT": str(server[1] or 80),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0] if client else "",
+            "CONTENT_LENGTH": str(size),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name == "CONTENT_LENGTH":
+                continue
+            if name != "CONTENT_TYPE":
+                name = f"HTTP_{name}"
+            environ[name] = f"{environ[name]},{value}" if name in environ else value
+        return environ
+
+    async def _read_body(self, receive, body, limit):
+        """將請求主體寫入 body，返回位元組數"""
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise RequestError(400, "連線已中斷")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                raise RequestError(413, "請求內容過大")
+            body.write(chunk)
+            if not message.get("more_body"):
+                return size
+
+    async def _read_json(self, receive):
+        """讀取並解析 JSON 請求主體"""
+        body = io.BytesIO()
+        await self._read_body(receive, body, MAX_REQUEST_BYTES)
+        try:
+            data = json.loads(body.getvalue() or b"{}")
+        except ValueError:
+            raise RequestError(400, "請求內容不是有效的 JSON")
+        if not isinstance(data, dict):
+            raise RequestError(400, "請求內容必須是 JSON 物件")
+        return data
+
+    async def _send_json(self, send, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        await self._send(send, status, body)
+
+    async def _send(self, send, status, body):
+        headers = list(CORS_HEADERS)
+        if body is not None:
+            headers.append((b"content-type", b"application/json; charset=utf-8"))
+        headers.append((b"content-length", str(len(body or b"")).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body or b""})
+
+
+# 全域 ASGI 應用程式實例
+application = InterviewASGIApp()
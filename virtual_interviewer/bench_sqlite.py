@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+SQLite 寫入併發基準測試
+比較 SQLAlchemy 預設設定與 sqlite_profile 正式環境設定在多執行緒寫入下的吞吐量與鎖定錯誤
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlite_profile import PRODUCTION_PRAGMAS, apply_pragmas
+
+# 與 interview_turn 相同的欄位與索引，模擬每則對話寫入一列
+SCHEMA = """
+CREATE TABLE interview_turn (
+    id INTEGER PRIMARY KEY,
+    session_id VARCHAR(32) NOT NULL,
+    user_id VARCHAR(100) NOT NULL,
+    state VARCHAR(32) NOT NULL,
+    turn_index INTEGER NOT NULL,
+    score FLOAT,
+    created_at DATETIME NOT NULL,
+    payload JSON
+);
+CREATE INDEX ix_interview_turn_user_created ON interview_turn (user_id, created_at, id);
+CREATE INDEX ix_interview_turn_state_created ON interview_turn (state, created_at);
+CREATE INDEX ix_interview_turn_session_index ON interview_turn (session_id, turn_index);
+"""
+
+INSERT_SQL = (
+    "INSERT INTO interview_turn "
+    "(session_id, user_id, state, turn_index, score, created_at, payload) "
+    "VALUES (?, ?, ?, ?, ?, datetime('now'), ?)"
+)
+
+
+def with_busy_timeout(pragmas, timeout):
+    """以相同的鎖等待時間取代設定中的 busy_timeout，兩組設定才能公平比較"""
+    return [(name, value) for name, value in pragmas if name != "busy_timeout"] + [
+        ("busy_timeout", str(int(timeout * 1000)))
+    ]
+
+
+def run_profile(name, pragmas, threads, writes, timeout):
+    """以指定設定執行一輪寫入測試，回傳統計結果"""
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_sqlite_"), "bench.db")
+    pragmas = with_busy_timeout(pragmas, timeout)
+    setup = sqlite3.connect(path)
+    apply_pragmas(setup, pragmas)
+    setup.executescript(SCHEMA)
+    setup.close()
+
+    lock_errors = []
+    latencies = []
+    stats_lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def writer(worker_id):
+        # sqlite3 的 timeout 參數與 busy_timeout 是同一個設定，兩者一致
+        conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        apply_pragmas(conn, pragmas)
+        local_latencies = []
+        local_errors = 0
+        barrier.wait()
+        for i in range(writes):
+            started = time.perf_counter()
+            try:
+                conn.execute(
+                    INSERT_SQL,
+                    (
+                        f"s{worker_id}",
+                        f"user_{worker_id}",
+                        "questioning",
+                        i,
+                        float(i % 100),
+                        '{"user_message": "bench", "ai_response": "ok"}',
+                    ),
+                )
+                conn.commit()  # 每則訊息一次提交，與 InterviewAPI 同步寫入路徑相同
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                if "locked" not in str(e):
+                    raise
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+        conn.close()
+        with stats_lock:
+            latencies.extend(local_latencies)
+            lock_errors.append(local_errors)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    committed = len(latencies)
+    return {
+        "name": name,
+        "committed": committed,
+        "lock_errors": sum(lock_errors),
+        "elapsed": elapsed,
+        "writes_per_sec": committed / elapsed if elapsed else 0.0,
+        "p50_ms": latencies[committed // 2] * 1000 if committed else 0.0,
+        "p99_ms": latencies[int(committed * 0.99)] * 1000 if committed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 寫入併發基準測試")
+    parser.add_argument("--threads", type=int, default=8, help="寫入執行緒數")
+    parser.add_argument("--writes", type=int, default=500, help="每個執行緒寫入筆數")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=5.0,
+        help="兩組設定共用的鎖等待秒數（busy_timeout）",
+    )
+    args = parser.parse_args()
+
+    print("🧪 SQLite 寫入併發基準測試")
+    print(f"📊 {args.threads} 個執行緒 × 每個 {args.writes} 筆，每筆獨立提交")
+    print(f"⏱️ 鎖等待時間（busy_timeout）: 兩組設定皆為 {args.timeout * 1000:.0f}ms")
+    print("=" * 60)
+
+    results = [
+        run_profile("預設設定", (), args.threads, args.writes, args.timeout),
+        run_profile(
+            "正式環境設定", PRODUCTION_PRAGMAS, args.threads, args.writes, args.timeout
+        ),
+    ]
+    for result in results:
+        print(
+            f"{result['name']}: {result['writes_per_sec']:.0f} 筆/秒, "
+            f"成功 {result['committed']} 筆, 鎖定錯誤 {result['lock_errors']} 次, "
+            f"p50 {result['p50_ms']:.2f}ms, p99 {result['p99_ms']:.2f}ms"
+        )
+
+    baseline, tuned = results
+    if baseline["writes_per_sec"]:
+        speedup = tuned["writes_per_sec"] / baseline["writes_per_sec"]
+        print(f"🚀 吞吐量提升: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+虛擬面試顧問 - Gunicorn 正式環境設定
+使用方式: gunicorn -c gunicorn.conf.py app:app（或 python run.py --production）
+
+平滑重載: kill -HUP $(cat $INTERVIEWER_PIDFILE) 會以新的工作程序逐一替換舊的；
+因為啟用 preload_app，程式碼更新需以 USR2 啟動新的主程序後再對舊主程序送出 TERM。
+面試狀態保存在工作程序記憶體中，任何替換工作程序的操作都會清除進行中的面試。
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("INTERVIEWER_BIND", "0.0.0.0:5000")
+# 面試狀態保存在工作程序的記憶體中：對話階段、目前題目、評分帳本、自我介紹、
+# 總結草稿與預取題目都不跨程序共用。多個工作程序時同一用戶的請求可能落在不同程序，
+# 看到的是各自獨立的面試，因此預設 1 個程序、以執行緒擴展
+workers = int(os.environ.get("INTERVIEWER_WORKERS", "1"))
+threads = int(
+    os.environ.get("INTERVIEWER_THREADS", str(max(4, multiprocessing.cpu_count() * 2)))
+)
+worker_class = "gthread"
+
+# 在主程序載入應用程式，工作程序以 fork 共用已載入的模組
+preload_app = True
+# 處理 N 個請求後回收工作程序（0 為不回收）。回收會清除該程序中所有進行中的面試，
+# 在面試狀態移出程序之前預設不啟用
+max_requests = int(os.environ.get("INTERVIEWER_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.environ.get("INTERVIEWER_MAX_REQUESTS_JITTER", "100"))
+
+# LLM 分析可能耗時數十秒
+timeout = int(os.environ.get("INTERVIEWER_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("INTERVIEWER_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("INTERVIEWER_KEEPALIVE", "5"))
+
+pidfile = os.environ.get("INTERVIEWER_PIDFILE") or None
+accesslog = os.environ.get("INTERVIEWER_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("INTERVIEWER_LOG_LEVEL", "info")
+proc_name = "virtual_interviewer"
+
+
+def on_starting(server):
+    """只在主程序建立資料庫表格一次，再釋放連線避免被工作程序繼承"""
+    from app import app, db
+
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+    server.log.info("✅ 資料庫初始化成功")
+
+
+def post_fork(server, worker):
+    """工作程序不可沿用主程序的資料庫連線，改由各自的連線池重新建立"""
+    from app import app, db, warm_up_fast_agent
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # MongoDB 連線不可跨 fork 共用，因此在工作程序中才預熱
+    warm_up_fast_agent()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+批次匯入履歷
+從 JSON 陣列或 NDJSON 檔案匯入多份履歷，例如整個培訓班或 HR 批次資料
+"""
+
+import argparse
+import json
+import sys
+
+from app import app, bulk_import_resumes, db, parse_ndjson_resumes
+
+
+def load_records(path):
+    """讀取履歷檔案，'-' 代表標準輸入；.ndjson/.jsonl 或非陣列內容視為 NDJSON"""
+    if path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+
+    if path.endswith((".ndjson", ".jsonl")) or not text.lstrip().startswith("["):
+        return parse_ndjson_resumes(text)
+    records = json.loads(text)
+    if not isinstance(records, list):
+        raise ValueError("JSON 檔案必須是履歷陣列")
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批次匯入履歷")
+    parser.add_argument("path", help="履歷檔案（JSON 陣列或 NDJSON），'-' 代表標準輸入")
+    parser.add_argument("--chunk-size", type=int, default=500, help="每個交易的履歷數")
+    parser.add_argument("--report", help="將逐筆結果寫入指定的 JSON 檔案")
+    args = parser.parse_args()
+
+    try:
+        records = load_records(args.path)
+    except Exception as e:
+        print(f"❌ 讀取履歷檔案失敗: {e}")
+        sys.exit(1)
+
+    print(f"📥 準備匯入 {len(records)} 份履歷（每批 {args.chunk_size} 份）")
+    with app.app_context():
+        db.create_all()
+        report = bulk_import_resumes(records, chunk_size=max(1, args.chunk_size))
+
+    print(
+        f"✅ 匯入完成：成功 {report['inserted']} 份，失敗 {report['failed']} 份，"
+        f"耗時 {report['elapsed_seconds']} 秒（{report['resumes_per_second']} 份/秒）"
+    )
+    for item in report["results"]:
+        if not item["success"]:
+            print(f"  ❌ 第 {item['index']} 份: {item['error']}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 逐筆結果已寫入 {args.report}")
+
+    sys.exit(0 if report["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
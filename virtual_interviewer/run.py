@@ -4,10 +4,11 @@
 Virtual Interview Consultant - Startup Script
 """
 
+import argparse
 import os
 import sys
 
-from app import app, db
+from app import app, db, migrate_legacy_sessions, warm_up_fast_agent
 
 
 def create_database():
@@ -35,8 +36,123 @@ def check_requirements():
         print("請執行: pip install -r requirements.txt")
         return False
 
+def migrate_sessions():
+    """將舊版對話記錄轉換為新的對話記錄表"""
+    try:
+        with app.app_context():
+            db.create_all()
+            migrate_legacy_sessions()
+    except Exception as e:
+        print(f"❌ 對話記錄遷移失敗: {e}")
+        return False
+    return True
+
+def run_production(args):
+    """以 Gunicorn 正式環境模式啟動（多執行緒、預先載入）"""
+    overrides = {
+        "INTERVIEWER_BIND": args.bind,
+        "INTERVIEWER_WORKERS": args.workers,
+        "INTERVIEWER_THREADS": args.threads,
+        "INTERVIEWER_MAX_REQUESTS": args.max_requests,
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            os.environ[key] = str(value)
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        # Gunicorn 不支援 Windows；改用關閉除錯器與重載器的多執行緒伺服器
+        print("⚠️ 未安裝 Gunicorn（pip install gunicorn），改用多執行緒內建伺服器")
+        if not create_database():
+            sys.exit(1)
+        warm_up_fast_agent()
+        bind = os.environ.get("INTERVIEWER_BIND", "0.0.0.0:5000")
+        host, _, port = bind.rpartition(":")
+        app.run(host=host, port=int(port), debug=False, threaded=True)
+        return
+
+    print("🚀 以 Gunicorn 正式環境模式啟動虛擬面試顧問...")
+    # 以 exec 取代目前程序，Gunicorn 主程序直接接收 HUP/TERM 等訊號
+    os.execv(
+        sys.executable,
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            os.path.join(base_dir, "gunicorn.conf.py"),
+            "--chdir",
+            base_dir,
+            "app:app",
+        ],
+    )
+
+
+def run_asgi(args):
+    """以 Uvicorn 啟動完整網站（面試對話在事件迴圈上多工處理，其餘路由轉交 Flask）"""
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ 未安裝 Uvicorn，請執行: pip install uvicorn")
+        sys.exit(1)
+
+    bind = args.bind or os.environ.get("INTERVIEWER_ASGI_BIND", "0.0.0.0:5001")
+    host, _, port = bind.rpartition(":")
+    print(f"🚀 虛擬面試顧問（非同步）啟動中: http://{host}:{port}")
+    uvicorn.run(
+        "asgi:application",
+        host=host,
+        port=int(port),
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        timeout_graceful_shutdown=int(
+            os.environ.get("INTERVIEWER_GRACEFUL_TIMEOUT", "30")
+        ),
+    )
+
+
 def main():
     """主啟動函數"""
+    parser = argparse.ArgumentParser(description="虛擬面試顧問")
+    parser.add_argument(
+        "--migrate-sessions",
+        action="store_true",
+        help="將舊版 interview_session 記錄遷移至 interview_turn 後結束",
+    )
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="以 Gunicorn 正式環境模式啟動（關閉除錯器與自動重載）",
+    )
+    parser.add_argument(
+        "--asgi",
+        action="store_true",
+        help="以 Uvicorn 啟動非同步面試 API（只提供 /api/interview）",
+    )
+    parser.add_argument(
+        "--bind", help="監聽位址（正式環境預設 0.0.0.0:5000，ASGI 預設 0.0.0.0:5001）"
+    )
+    parser.add_argument("--workers", type=int, help="正式環境工作程序數（預設 1）")
+    parser.add_argument("--threads", type=int, help="每個工作程序的執行緒數")
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        help="工作程序處理多少請求後回收（預設 0 不回收；回收會清除進行中的面試）",
+    )
+    args = parser.parse_args()
+
+    if args.migrate_sessions:
+        sys.exit(0 if migrate_sessions() else 1)
+
+    if args.production:
+        run_production(args)
+        return
+
+    if args.asgi:
+        run_asgi(args)
+        return
+
     print("🚀 虛擬面試顧問啟動中...")
     print("=" * 50)
     
@@ -47,6 +163,7 @@ def main():
     # 初始化資料庫
     if not create_database():
         sys.exit(1)
+    warm_up_fast_agent()
     
     # 啟動應用
     print(f"🌐 應用程式將在 http://localhost:5000 啟動")
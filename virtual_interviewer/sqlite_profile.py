@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+SQLite 儲存設定檔
+以連線事件套用 PRAGMA，讓多執行緒服務下的寫入不再互相阻塞或出現 "database is locked"
+"""
+
+import os
+
+# 正式環境設定：WAL 讓讀寫互不阻塞，NORMAL 在 WAL 下僅於檢查點同步磁碟
+PRODUCTION_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", "5000"),  # 毫秒，等待其他連線釋放寫入鎖
+    ("mmap_size", "268435456"),  # 256MB 記憶體映射讀取
+    ("cache_size", "-65536"),  # 負值代表 KiB，約 64MB 頁面快取
+    ("temp_store", "MEMORY"),
+)
+
+
+def apply_pragmas(dbapi_connection, pragmas=PRODUCTION_PRAGMAS):
+    """對一條 sqlite3 連線套用 PRAGMA 設定"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def is_sqlite_uri(uri):
+    """判斷資料庫連線字串是否為 SQLite"""
+    return uri.startswith("sqlite")
+
+
+def is_memory_uri(uri):
+    """判斷是否為記憶體內 SQLite 資料庫（不適用 WAL 與連線池設定）"""
+    return uri in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in uri
+
+
+def engine_options(uri):
+    """產生適合多執行緒服務的 SQLAlchemy 引擎參數"""
+    if not is_sqlite_uri(uri) or is_memory_uri(uri):
+        return {}
+    return {
+        # 連線由連線池在執行緒間傳遞，需關閉 sqlite3 的同執行緒檢查
+        "connect_args": {"check_same_thread": False, "timeout": 5},
+        "pool_size": int(os.environ.get("SQLITE_POOL_SIZE", "10")),
+        "max_overflow": int(os.environ.get("SQLITE_MAX_OVERFLOW", "20")),
+        "pool_timeout": 10,
+    }
+
+
+def install(engine):
+    """在 SQLAlchemy 引擎上註冊連線事件，每條新連線都套用正式環境設定"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection)
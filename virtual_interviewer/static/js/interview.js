@@ -183,6 +183,11 @@ const InterviewManager = {
             user_id: currentUserId || 'default_user'
         };
 
+        // 面試問答階段：分析回答的同時由後端準備下一題，省去一次請求
+        if (currentStage === 'questioning' && autoNextQuestion) {
+            requestData.include_next_question = true;
+        }
+
         // 如果是面試完成階段，傳遞面試數據
         if (currentStage === 'completed' || message.includes('結束') || message.includes('完成')) {
             requestData.interview_data = {
@@ -221,9 +226,18 @@ const InterviewManager = {
                         clearTimeout(this._autoNextQuestionTimer);
                     }
 
+                    const nextQuestion = response.next_question;
+                    if (response.timings) {
+                        console.log('⏱️ 分析與下一題耗時:', response.timings);
+                    }
+
                     this._autoNextQuestionTimer = setTimeout(() => {
                         console.log('⏰ 自動獲取下一題計時器觸發');
-                        this._autoGetNextQuestion();
+                        if (nextQuestion) {
+                            this._showNextQuestion(nextQuestion);
+                        } else {
+                            this._autoGetNextQuestion();
+                        }
                         this._autoNextQuestionTimer = null;
                     }, 5000);
                 }
@@ -264,6 +278,23 @@ const InterviewManager = {
         return analysisKeywords.some(keyword => response.includes(keyword));
     },
 
+    /**
+     * 顯示後端隨分析結果一併回傳的下一題
+     */
+    _showNextQuestion: function (question) {
+        this.displayMessage(question, 'ai');
+
+        // 儲存對話記錄（與自動請求下一題的格式一致）
+        chatHistory.push({
+            user: '請給我問題',
+            ai: question,
+            timestamp: new Date().toISOString(),
+            tool_used: 'backend_api',
+            stage: currentStage
+        });
+        this.saveChatHistory();
+    },
+
     /**
      * 自動獲取下一題
      */